@@ -0,0 +1,139 @@
+# app/cli.py
+"""Maintenance commands, e.g. ``python -m app.cli rebuild-summaries --verify``"""
+import argparse
+import sys
+from datetime import date
+
+from app.database.db_handler import db
+
+
+def _migrate(args):
+    from app.database.migrations import current_version, migrate
+    versions = migrate(target=args.target)
+    print(f"Schema at version {current_version()} ({len(versions)} migration(s) applied)")
+    return 0
+
+
+def _rebuild_summaries(args):
+    from app.services.report_service import ReportService
+    report = ReportService.rebuild_summaries(verify_only=args.verify)
+    drift = 0
+    for table, mismatches in report.items():
+        drift += len(mismatches)
+        print(f"{table}: {'OK' if not mismatches else f'{len(mismatches)} row(s) differ'}")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+    if drift and not args.verify:
+        print("Summary tables rebuilt from books and loans")
+    # --verify exits non-zero on drift so it can run from cron or CI
+    return 1 if drift and args.verify else 0
+
+
+def _reconcile_fines(args):
+    from app.services.fine_service import FineService
+    report = FineService.reconcile_balances(verify_only=args.verify)
+    for check, mismatches in report.items():
+        print(f"{check}: {'OK' if not mismatches else f'{len(mismatches)} difference(s)'}")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+    if report['member_balances'] and not args.verify:
+        print("Member balances rebuilt from the fine ledger")
+    # Ledger/loan differences need a person to look at them, so they always fail
+    return 1 if report['loans'] or (report['member_balances'] and args.verify) else 0
+
+
+def _prune_changes(args):
+    from app.services.change_feed import ChangeFeed
+    print(f"Deleted {ChangeFeed.prune(days=args.days)} change feed row(s) older than {args.days} day(s)")
+    return 0
+
+
+def _import_books(args):
+    from app.services.import_service import ImportService
+
+    def progress(result):
+        print(f"{result['read']} record(s) read, {result['added']} added, {result['merged']} merged, "
+              f"{result['failed']} failed ({result['rows_per_second']:.0f} rows/s)")
+
+    result = ImportService.import_books(args.path, fmt=args.format, added_by=args.added_by,
+                                        chunk_size=args.chunk_size, progress=progress)
+    for position, message in result['errors']:
+        print(f"  record {position}: {message}")
+    if result['failed'] > len(result['errors']):
+        print(f"  ... and {result['failed'] - len(result['errors'])} more")
+    print(f"Imported {result['copies']} copies in {result['seconds']:.1f}s")
+    return 1 if result['failed'] else 0
+
+
+def _export(args):
+    from app.services.report_service import ReportService
+    result = ReportService.export(args.report, args.format, args.path, batch_size=args.batch_size,
+                                  progress=lambda rows: print(f"{rows} row(s) written", end="\r", flush=True))
+    if 'error' in result:
+        print(f"Export failed: {result['error']}")
+        return 1
+    print(f"Exported {result['rows']} row(s) to {result['path']} in {result['seconds']:.1f}s")
+    return 0
+
+
+def _sweep_overdue(args):
+    from app.services.loan_service import LoanService
+    result = LoanService.sweep_overdue(as_of=args.as_of)
+    return 1 if 'error' in result else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Library database maintenance")
+    parser.add_argument("--query-stats", metavar="PATH", help="write per-query timings of the command to a JSON file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_cmd = commands.add_parser("migrate", help="apply pending schema migrations")
+    migrate_cmd.add_argument("--target", type=int, help="stop at this migration version")
+    migrate_cmd.set_defaults(func=_migrate)
+
+    rebuild_cmd = commands.add_parser("rebuild-summaries",
+                                      help="recompute the circulation summary tables from books and loans")
+    rebuild_cmd.add_argument("--verify", action="store_true", help="only report differences, change nothing")
+    rebuild_cmd.set_defaults(func=_rebuild_summaries)
+
+    reconcile_cmd = commands.add_parser("reconcile-fines",
+                                        help="recompute member balances from the fine ledger")
+    reconcile_cmd.add_argument("--verify", action="store_true", help="only report differences, change nothing")
+    reconcile_cmd.set_defaults(func=_reconcile_fines)
+
+    prune_cmd = commands.add_parser("prune-changes", help="delete old rows from the change feed")
+    prune_cmd.add_argument("--days", type=int, default=7, help="keep this many days (default 7)")
+    prune_cmd.set_defaults(func=_prune_changes)
+
+    import_cmd = commands.add_parser("import-books", help="import a vendor CSV, MARC21 or MARCXML file")
+    import_cmd.add_argument("path", help="file to import")
+    import_cmd.add_argument("--format", choices=("csv", "marc", "marcxml"),
+                            help="file format (default: from the file extension)")
+    import_cmd.add_argument("--chunk-size", type=int, default=2000, help="records per transaction (default 2000)")
+    import_cmd.add_argument("--added-by", type=int, help="user_id recorded as adding new books")
+    import_cmd.set_defaults(func=_import_books)
+
+    export_cmd = commands.add_parser("export", help="write a report to a CSV, XLSX or Parquet file")
+    export_cmd.add_argument("report", choices=("catalogue", "active_loans", "fine_history", "member_history"))
+    export_cmd.add_argument("path", help="file to write")
+    export_cmd.add_argument("--format", choices=("csv", "xlsx", "parquet"),
+                            help="file format (default: from the file extension)")
+    export_cmd.add_argument("--batch-size", type=int, default=5000, help="rows fetched at a time (default 5000)")
+    export_cmd.set_defaults(func=_export)
+
+    sweep_cmd = commands.add_parser("sweep-overdue",
+                                    help="mark loans past due as overdue and accrue their fines")
+    sweep_cmd.add_argument("--as-of", type=date.fromisoformat, help="sweep as of this date (YYYY-MM-DD)")
+    sweep_cmd.set_defaults(func=_sweep_overdue)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    finally:
+        if args.query_stats:
+            db.dump_stats(args.query_stats)
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
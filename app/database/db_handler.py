@@ -1,57 +1,389 @@
 # app/database/db_handler.py
+import json
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+
+from app.database.pool import ConnectionPool
+from app.database.query_stats import QueryStats
+from app.database.statement_cache import StatementCache, StatementStats
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '',
+    'database': 'library_management'
+}
+
+# Query instrumentation; the slow-query log stays off until given a file
+DIAGNOSTICS_CONFIG = {
+    'enabled': True,
+    'slow_query_ms': 500,
+    'slow_query_log': None,
+}
+
+# Prepared statements kept open per pooled connection; 0 turns prepare=True into a plain cursor
+STATEMENT_CACHE_SIZE = 64
+
+# Client errors that mean the connection is dead. The statement may still have run: "Lost
+# connection" (2013) can arrive after the server executed and committed it
+DISCONNECT_ERRORS = (errorcode.CR_SERVER_GONE_ERROR, errorcode.CR_SERVER_LOST)
+
+
+def is_disconnect(error):
+    """True for "MySQL server has gone away" / "Lost connection" errors"""
+    return getattr(error, 'errno', None) in DISCONNECT_ERRORS
+
+
+def _row_builder(row_factory, columns):
+    """Function turning a row tuple into a ``row_factory`` row, or None to keep the tuple"""
+    if row_factory is tuple:
+        return None
+    if row_factory is dict:
+        return lambda row: dict(zip(columns, row))
+    if row_factory is namedtuple:
+        return namedtuple('Row', columns, rename=True)._make
+    return row_factory(columns)
+
+
+def _batches(cursor, query, params, batch_size, row_factory, stats):
+    # Timed while the database works, not while the consumer handles a batch
+    started = time.perf_counter()
+    elapsed = 0.0
+    rows_read = 0
+    error = False
+    try:
+        cursor.execute(query, params or ())
+        build = _row_builder(row_factory, tuple(cursor.column_names))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            elapsed += time.perf_counter() - started
+            if not rows:
+                return
+            rows_read += len(rows)
+            yield rows if build is None else list(map(build, rows))
+            started = time.perf_counter()
+    except Exception:
+        elapsed += time.perf_counter() - started
+        error = True
+        raise
+    finally:
+        stats.record(query, elapsed, rows_read, params, error=error)
+
+
+class Transaction:
+    """One connection and cursor held for the length of a ``db.transaction()`` block"""
+
+    def __init__(self, connection, stats, statements=None):
+        self.connection = connection
+        self.cursor = connection.cursor(dictionary=True)
+        self.stats = stats
+        self.statements = statements
+        self._last_cursor = self.cursor
+        self._savepoints = 0
+
+    def _cursor_for(self, query, prepared):
+        """The query text and cursor to run it on: a cached prepared one if asked and enabled"""
+        if prepared and self.statements is not None:
+            return self.statements.get(query)
+        return query, self.cursor
+
+    def _run(self, query, params, prepared):
+        query, cursor = self._cursor_for(query, prepared)
+        try:
+            cursor.execute(query, params or ())
+        except Error:
+            if cursor is not self.cursor:
+                self.statements.discard(query)
+            raise
+        self._last_cursor = cursor
+        return cursor
+
+    def execute(self, query, params=None, prepared=False):
+        """Run a statement and return the number of affected rows"""
+        with self.stats.measure(query, params) as measurement:
+            cursor = self._run(query, params, prepared)
+            measurement.rows = cursor.rowcount
+        return cursor.rowcount
+
+    def executemany(self, query, seq_params):
+        """Run a statement once per parameter tuple, batched by the driver"""
+        with self.stats.measure(query) as measurement:
+            self.cursor.executemany(query, seq_params)
+            measurement.rows = self.cursor.rowcount
+        self._last_cursor = self.cursor
+        return self.cursor.rowcount
+
+    def fetch(self, query, params=None, prepared=False):
+        """Run a query and return all rows as dicts"""
+        with self.stats.measure(query, params) as measurement:
+            rows = self._run(query, params, prepared).fetchall()
+            measurement.rows = len(rows)
+        return rows
+
+    def fetch_one(self, query, params=None, prepared=False):
+        """Run a query and return the first row, or None"""
+        rows = self.fetch(query, params, prepared)
+        return rows[0] if rows else None
+
+    @property
+    def lastrowid(self):
+        return self._last_cursor.lastrowid
+
+    @contextmanager
+    def savepoint(self):
+        """Nested block that rolls back to its savepoint on error"""
+        self._savepoints += 1
+        name = f"sp_{self._savepoints}"
+        self.cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield self
+        except BaseException:
+            self.cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise
+        else:
+            self.cursor.execute(f"RELEASE SAVEPOINT {name}")
+
+    def close(self):
+        try:
+            self.cursor.close()
+        except Error:
+            pass
 
 
 class DBHandler:
-    def __init__(self):
-        self.connection = None
-        self.connect()
+    def __init__(self, min_size=2, max_size=10, timeout=30.0, connection_factory=None,
+                 statement_cache_size=STATEMENT_CACHE_SIZE, **connect_args):
+        self.pool = None
+        self._local = threading.local()  # Per-thread active transaction
+        self.stats = QueryStats(**DIAGNOSTICS_CONFIG)
+        self.statement_stats = StatementStats()
+        self.configure(min_size=min_size, max_size=max_size, timeout=timeout,
+                       connection_factory=connection_factory, statement_cache_size=statement_cache_size,
+                       **connect_args)
+
+    def configure(self, min_size=2, max_size=10, timeout=30.0, connection_factory=None,
+                  statement_cache_size=STATEMENT_CACHE_SIZE, **connect_args):
+        """(Re)build the connection pool; idle connections of the old pool are closed"""
+        self.connect_args = {**DB_CONFIG, **connect_args}
+        self.statement_cache_size = statement_cache_size
+        old_pool = self.pool
+        self.pool = ConnectionPool(
+            connection_factory or self.connect,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout
+        )
+        if old_pool:
+            old_pool.close()
 
     def connect(self):
-        """Establish database connection"""
+        """Open a new raw database connection for the pool"""
         try:
-            self.connection = mysql.connector.connect(
-                host='localhost',
-                user='root',
-                password='',
-                database='library_management'
-            )
+            # Autocommit so pooled reads never sit on a stale snapshot;
+            # transaction() opens explicit transactions when atomicity matters
+            connection = mysql.connector.connect(autocommit=True, **self.connect_args)
             print("Database connection established")
+            return connection
         except Error as e:
             print(f"Error connecting to MySQL: {e}")
             raise
 
-    def execute_query(self, query, params=None, fetch=False):
-        """Execute a SQL query"""
-        cursor = None
-        try:
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
+    def execute_query(self, query, params=None, fetch=False, prepared=False):
+        """Execute a SQL query.
 
+        ``prepared=True`` runs it as a server-side prepared statement kept
+        open on the connection (see StatementCache): worth it for short
+        statements run over and over with different parameters.
+        """
+        tx = self.current_transaction()
+        if tx is not None:
+            # Inside a transaction: share its connection and let errors reach its rollback
             if fetch:
-                return cursor.fetchall()
-            else:
-                self.connection.commit()
-                if cursor.rowcount > 0:
-                    return True
+                return tx.fetch(query, params, prepared)
+            return tx.execute(query, params, prepared) > 0
+
+        for attempt in range(2):
+            entry = self.pool.acquire()
+            statements = self._statements(entry) if prepared else None
+            cursor = None
+            discard = False
+            try:
+                if statements is not None:
+                    query, cursor = statements.get(query)
+                else:
+                    cursor = entry.connection.cursor(dictionary=True)
+                with self.stats.measure(query, params) as measurement:
+                    cursor.execute(query, params or ())
+                    if fetch:
+                        rows = cursor.fetchall()
+                        measurement.rows = len(rows)
+                    else:
+                        entry.connection.commit()
+                        measurement.rows = cursor.rowcount
+
+                if fetch:
+                    return rows
+                else:
+                    if cursor.rowcount > 0:
+                        return True
+                    return False
+
+            except Error as e:
+                if statements is not None:
+                    statements.discard(query)
+                    cursor = None
+                if is_disconnect(e):
+                    # The connection died under us; drop it. Only a read is safe to run again on a
+                    # fresh one: a write may already be committed, and repeating it would apply it twice
+                    discard = True
+                    if attempt == 0 and fetch:
+                        print(f"Database connection lost ({e}), reconnecting")
+                        continue
+                print(f"Error executing query: {e}")
+                if not discard:
+                    entry.connection.rollback()
                 return False
+            finally:
+                # Cached prepared cursors stay open for the next call on this connection
+                if cursor and statements is None:
+                    try:
+                        cursor.close()
+                    except Error:
+                        discard = True
+                self.pool.release(entry, discard=discard)
+
+    def _statements(self, entry):
+        """The prepared-statement cache of a pooled connection, created on first use; None when disabled"""
+        if not self.statement_cache_size:
+            return None
+        if entry.statements is None:
+            entry.statements = StatementCache(entry.connection, self.statement_cache_size, self.statement_stats)
+        return entry.statements
 
+    def stream(self, query, params=None, batch_size=1000, row_factory=dict):
+        """Run a query and yield its rows in lists of up to ``batch_size``.
+
+        ``row_factory`` shapes each row: ``dict`` (the default), ``tuple``
+        (the cheapest, in SELECT order) or ``collections.namedtuple``. Any
+        other callable is given the column names and must return a function
+        building one row from its tuple, e.g. to fill an index or a model.
+
+        Outside a transaction the rows come from an unbuffered cursor on a
+        connection of its own, so memory stays bounded however many rows
+        the query returns. Errors are raised, not printed: a consumer must
+        not mistake a failed read for a short one.
+        """
+        tx = self.current_transaction()
+        if tx is not None:
+            # The caller may run statements between batches, which an unbuffered result would block
+            cursor = tx.connection.cursor(buffered=True)
+            try:
+                yield from _batches(cursor, query, params, batch_size, row_factory, self.stats)
+            finally:
+                cursor.close()
+            return
+
+        entry = self.pool.acquire()
+        cursor = None
+        discard = False
+        finished = False
+        try:
+            cursor = entry.connection.cursor(buffered=False)
+            yield from _batches(cursor, query, params, batch_size, row_factory, self.stats)
+            finished = True
         except Error as e:
-            print(f"Error executing query: {e}")
-            self.connection.rollback()
-            return False
+            discard = is_disconnect(e)
+            print(f"Error streaming query: {e}")
+            raise
         finally:
             if cursor:
-                cursor.close()
+                try:
+                    cursor.close()
+                except Error:
+                    discard = True
+            # Rows left unread by an abandoned stream would block the next query on this connection
+            self.pool.release(entry, discard=discard or not finished)
+
+    def current_transaction(self):
+        """The transaction open on this thread, if any"""
+        return getattr(self._local, 'transaction', None)
+
+    @contextmanager
+    def transaction(self):
+        """Run a block on one connection and commit it once.
+
+        Any exception rolls the whole block back and is re-raised. Nested
+        ``transaction()`` blocks on the same thread become savepoints of the
+        outer transaction, so service methods can be composed freely.
+        """
+        tx = self.current_transaction()
+        if tx is not None:
+            with tx.savepoint():
+                yield tx
+            return
+
+        entry = self.pool.acquire()
+        discard = False
+        tx = None
+        try:
+            entry.connection.start_transaction()
+            tx = Transaction(entry.connection, self.stats, self._statements(entry))
+            self._local.transaction = tx
+            yield tx
+            entry.connection.commit()
+        except BaseException as e:
+            discard = isinstance(e, Error) and is_disconnect(e)
+            if not discard:
+                try:
+                    entry.connection.rollback()
+                except Error:
+                    discard = True
+            raise
+        finally:
+            self._local.transaction = None
+            if tx:
+                tx.close()
+            self.pool.release(entry, discard=discard)
+
+    def ping(self):
+        """Check that the database is reachable"""
+        try:
+            with self.pool.connection(timeout=5) as connection:
+                return connection.is_connected()
+        except Exception:
+            return False
+
+    def pool_stats(self):
+        """Pool utilisation and checkout wait-time statistics"""
+        return self.pool.stats()
+
+    def statement_cache_stats(self):
+        """Prepared-statement cache hits, misses and evictions summed over all connections"""
+        return {**self.statement_stats.snapshot(), 'capacity': self.statement_cache_size}
+
+    def dump_stats(self, path=None, sort='total_ms', limit=None):
+        """Query, pool and prepared-statement statistics; written as JSON to ``path`` if given"""
+        report = {
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'pool': self.pool_stats(),
+            'statements': self.statement_cache_stats(),
+            'queries': self.stats.snapshot(sort=sort, limit=limit),
+        }
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, default=str)
+        return report
 
     def close(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("Database connection closed")
+        """Close all pooled database connections"""
+        self.pool.close()
+        print("Database connection closed")
 
 
 # Singleton instance
 db = DBHandler()
-
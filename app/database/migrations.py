@@ -0,0 +1,245 @@
+# app/database/migrations.py
+"""Versioned schema migrations.
+
+Each migration runs once, in order, and is recorded in ``schema_migrations``.
+Apply pending migrations with ``python -m app.database.migrations``.
+"""
+from mysql.connector import Error, errorcode
+
+from app.database.db_handler import db
+
+# (version, description, statements). A statement given as ('mysql', sql)
+# only runs against MySQL and is skipped on the SQLite stand-in.
+MIGRATIONS = [
+    (1, "Indexes for the hot loan, book and member queries", [
+        # get_active_loans(member_id) and per-member open loan checks
+        "CREATE INDEX idx_loans_member_return ON loans (member_id, return_date)",
+        # get_active_loans(): return_date IS NULL, overdue scans by due_date
+        "CREATE INDEX idx_loans_return_due ON loans (return_date, due_date)",
+        # get_loans_with_fines(): filter and ORDER BY fine_status, due_date
+        "CREATE INDEX idx_loans_fine_status_due ON loans (fine_status, due_date)",
+        # get_member_loan_history(): WHERE member_id ORDER BY issue_date
+        "CREATE INDEX idx_loans_member_issue ON loans (member_id, issue_date)",
+        # add_book() ISBN existence check; also enforces one row per ISBN
+        "CREATE UNIQUE INDEX uq_books_isbn ON books (isbn)",
+        # get_all_books()/get_available_books() ORDER BY title
+        "CREATE INDEX idx_books_title ON books (title)",
+        # get_all_members()/search_members() ORDER BY last_name, first_name
+        "CREATE INDEX idx_members_name ON members (last_name, first_name)",
+    ]),
+    (2, "FULLTEXT index for catalogue search", [
+        # BookService.search_books(): relevance-ranked MATCH ... AGAINST
+        ('mysql', "ALTER TABLE books ADD FULLTEXT INDEX ft_books_search (title, author, publisher, category)"),
+    ]),
+    (3, "Circulation summary tables maintained by the loan and fine services", [
+        # One row per category ('' for uncategorised books)
+        """
+        CREATE TABLE category_summary (
+            category VARCHAR(100) NOT NULL PRIMARY KEY,
+            titles INT NOT NULL DEFAULT 0,
+            copies INT NOT NULL DEFAULT 0,
+            on_loan INT NOT NULL DEFAULT 0,
+            overdue INT NOT NULL DEFAULT 0,
+            pending_fines DECIMAL(12, 2) NOT NULL DEFAULT 0
+        )
+        """,
+        # One row per day with circulation activity
+        """
+        CREATE TABLE daily_circulation (
+            day DATE NOT NULL PRIMARY KEY,
+            issued INT NOT NULL DEFAULT 0,
+            returned INT NOT NULL DEFAULT 0,
+            fines_assessed DECIMAL(12, 2) NOT NULL DEFAULT 0
+        )
+        """,
+        # Backfill from the raw tables; ReportService.rebuild_summaries() re-checks later
+        "DELETE FROM category_summary",
+        "DELETE FROM daily_circulation",
+        """
+        INSERT INTO category_summary (category, titles, copies, on_loan, overdue, pending_fines)
+        SELECT COALESCE(b.category, ''), COUNT(*), SUM(b.total_copies),
+               COALESCE(SUM(l.on_loan), 0), COALESCE(SUM(l.overdue), 0), COALESCE(SUM(l.pending_fines), 0)
+        FROM books b
+        LEFT JOIN (
+            SELECT book_id,
+                   SUM(CASE WHEN return_date IS NULL THEN 1 ELSE 0 END) AS on_loan,
+                   SUM(CASE WHEN return_date IS NULL AND loan_status = 'overdue' THEN 1 ELSE 0 END) AS overdue,
+                   SUM(CASE WHEN fine_status = 'pending' THEN fine_amount ELSE 0 END) AS pending_fines
+            FROM loans
+            GROUP BY book_id
+        ) l ON l.book_id = b.book_id
+        GROUP BY COALESCE(b.category, '')
+        """,
+        """
+        INSERT INTO daily_circulation (day, issued, returned, fines_assessed)
+        SELECT day, SUM(issued), SUM(returned), SUM(fines)
+        FROM (
+            SELECT DATE(issue_date) AS day, 1 AS issued, 0 AS returned, 0 AS fines
+            FROM loans WHERE issue_date IS NOT NULL
+            UNION ALL
+            SELECT DATE(return_date), 0, 1, fine_amount
+            FROM loans WHERE return_date IS NOT NULL
+        ) events
+        GROUP BY day
+        """,
+    ]),
+    (4, "Membership type for per-type fine rates", [
+        # FinePolicy(membership_rates=...) charges e.g. students or staff differently
+        "ALTER TABLE members ADD COLUMN membership_type VARCHAR(20) NOT NULL DEFAULT 'standard'",
+    ]),
+    (5, "Append-only fine ledger and per-member balances", [
+        # One row per assessment (+), payment (-) or waiver (-); never updated or deleted
+        ('mysql', """
+        CREATE TABLE fine_transactions (
+            txn_id INT AUTO_INCREMENT PRIMARY KEY,
+            loan_id INT NOT NULL,
+            member_id INT NOT NULL,
+            txn_type VARCHAR(10) NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            recorded_by INT NULL
+        )
+        """),
+        ('sqlite', """
+        CREATE TABLE fine_transactions (
+            txn_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            loan_id INTEGER NOT NULL,
+            member_id INTEGER NOT NULL,
+            txn_type VARCHAR(10) NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            recorded_by INTEGER NULL
+        )
+        """),
+        # Outstanding amount per loan when posting payments
+        "CREATE INDEX idx_fine_txn_loan ON fine_transactions (loan_id)",
+        # A member's statement in posting order
+        "CREATE INDEX idx_fine_txn_member ON fine_transactions (member_id, txn_id)",
+        # Sum of the member's ledger rows, kept current by FineService
+        """
+        CREATE TABLE member_balances (
+            member_id INT NOT NULL PRIMARY KEY,
+            balance DECIMAL(12, 2) NOT NULL DEFAULT 0
+        )
+        """,
+        # Backfill from the fines already on loans; FineService.reconcile_balances() re-checks later
+        "DELETE FROM fine_transactions",
+        "DELETE FROM member_balances",
+        """
+        INSERT INTO fine_transactions (loan_id, member_id, txn_type, amount, created_at)
+        SELECT loan_id, member_id, 'assess', fine_amount, COALESCE(return_date, due_date)
+        FROM loans WHERE fine_amount > 0 AND fine_status IN ('pending', 'paid')
+        """,
+        """
+        INSERT INTO fine_transactions (loan_id, member_id, txn_type, amount, created_at)
+        SELECT loan_id, member_id, 'payment', -fine_amount, COALESCE(return_date, due_date)
+        FROM loans WHERE fine_amount > 0 AND fine_status = 'paid'
+        """,
+        """
+        INSERT INTO member_balances (member_id, balance)
+        SELECT member_id, SUM(amount) FROM fine_transactions GROUP BY member_id
+        """,
+    ]),
+    (6, "Change feed polled by open windows on every desk", [
+        # One row per book, loan or member changed, written in the changing transaction
+        ('mysql', """
+        CREATE TABLE change_log (
+            change_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            entity VARCHAR(10) NOT NULL,
+            entity_id INT NOT NULL,
+            action VARCHAR(10) NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        ('sqlite', """
+        CREATE TABLE change_log (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity VARCHAR(10) NOT NULL,
+            entity_id INTEGER NOT NULL,
+            action VARCHAR(10) NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        # ChangeFeed.prune(): delete by age
+        "CREATE INDEX idx_change_log_changed_at ON change_log (changed_at)",
+    ]),
+    (7, "daily_circulation rolled up from loans instead of written by every checkout", [
+        # ReportService.roll_up_circulation(): recent issues; returns use idx_loans_return_due
+        "CREATE INDEX idx_loans_issue_date ON loans (issue_date)",
+    ]),
+    (8, "Library-wide pending fines total", [
+        # One row, moved with category_summary.pending_fines so the total is a single read
+        """
+        CREATE TABLE library_totals (
+            id INT NOT NULL PRIMARY KEY,
+            pending_fines DECIMAL(12, 2) NOT NULL DEFAULT 0
+        )
+        """,
+        "DELETE FROM library_totals",
+        "INSERT INTO library_totals (id, pending_fines) SELECT 1, COALESCE(SUM(pending_fines), 0) FROM category_summary",
+    ]),
+]
+
+# Re-running a half-applied migration must not trip over what already exists
+ALREADY_APPLIED_ERRORS = (errorcode.ER_DUP_KEYNAME, errorcode.ER_DUP_FIELDNAME, errorcode.ER_TABLE_EXISTS_ERROR)
+
+
+def _dialect(handler):
+    with handler.pool.connection() as connection:
+        return getattr(connection, 'dialect', 'mysql')
+
+
+def _ensure_migrations_table(handler):
+    with handler.transaction() as tx:
+        tx.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+
+def current_version(handler=db):
+    """Highest applied migration version, 0 for a fresh database"""
+    _ensure_migrations_table(handler)
+    result = handler.execute_query("SELECT MAX(version) AS version FROM schema_migrations", fetch=True)
+    return (result[0]['version'] or 0) if result else 0
+
+
+def migrate(handler=db, target=None):
+    """Apply pending migrations up to ``target`` (default: latest); returns versions applied"""
+    applied = []
+    version_now = current_version(handler)
+    dialect = _dialect(handler)
+
+    for version, description, statements in MIGRATIONS:
+        if version <= version_now or (target is not None and version > target):
+            continue
+
+        # DDL commits implicitly on MySQL, so each statement stands on its own
+        for statement in statements:
+            if isinstance(statement, tuple):
+                only_on, statement = statement
+                if only_on != dialect:
+                    continue
+            try:
+                with handler.transaction() as tx:
+                    tx.execute(statement)
+            except Error as e:
+                if getattr(e, 'errno', None) not in ALREADY_APPLIED_ERRORS:
+                    print(f"Migration {version} failed: {e}")
+                    raise
+
+        with handler.transaction() as tx:
+            tx.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                       (version, description))
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+
+    return applied
+
+
+if __name__ == "__main__":
+    versions = migrate()
+    print(f"Schema at version {current_version()} ({len(versions)} migration(s) applied)")
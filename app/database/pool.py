@@ -0,0 +1,227 @@
+# app/database/pool.py
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolError(Exception):
+    """Base class for connection pool failures"""
+
+
+class PoolTimeout(PoolError):
+    """No connection became free within the checkout timeout"""
+
+
+class PoolClosed(PoolError):
+    """The pool has been closed and hands out no more connections"""
+
+
+class PooledConnection:
+    """A raw DB-API connection plus the bookkeeping the pool keeps for it"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.checkouts = 0
+        self.statements = None  # DBHandler's prepared-statement cache, dropped with the connection
+
+
+def default_health_check(connection):
+    """Ping the server; mysql.connector's is_connected() does exactly that"""
+    return connection.is_connected()
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections.
+
+    Connections are opened lazily: the first checkout warms the pool up to
+    ``min_size`` and further connections are opened on demand up to
+    ``max_size``. Callers that find the pool exhausted wait up to ``timeout``
+    seconds for a connection to be returned.
+    """
+
+    def __init__(self, connection_factory, min_size=2, max_size=10, timeout=30.0,
+                 health_check=default_health_check, ping_interval=5.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if not 0 <= min_size <= max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self.connection_factory = connection_factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.ping_interval = ping_interval  # Skip the ping for connections used this recently
+
+        self._idle = deque()
+        self._size = 0  # Open connections, idle and checked out
+        self._cond = threading.Condition()
+        self._warmed_up = False
+        self._closed = False
+
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._failed_health_checks = 0
+
+    def acquire(self, timeout=None):
+        """Check a connection out of the pool"""
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        self._warm_up()
+
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosed("Connection pool is closed")
+                    if self._idle or self._size < self.max_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection free after {time.monotonic() - started:.1f}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()  # LIFO keeps the warmest connections busy
+                else:
+                    self._size += 1
+
+            if entry is None:
+                entry = self._open_reserved()
+            elif not self._is_healthy(entry):
+                self._close_entry(entry)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+                self._in_use += 1
+                self._peak_in_use = max(self._peak_in_use, self._in_use)
+            entry.checkouts += 1
+            return entry
+
+    def release(self, entry, discard=False):
+        """Return a connection; ``discard`` closes it instead of reusing it"""
+        with self._cond:
+            self._in_use -= 1
+        if discard or self._closed:
+            self._close_entry(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection for the duration of a ``with`` block"""
+        entry = self.acquire(timeout)
+        try:
+            yield entry.connection
+        except BaseException:
+            self.release(entry, discard=not self._is_healthy(entry, force=True))
+            raise
+        else:
+            self.release(entry)
+
+    def stats(self):
+        """Snapshot of pool size, utilisation and checkout wait times"""
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'utilisation': self._in_use / self.max_size,
+                'checkouts': self._checkouts,
+                'avg_wait_ms': (self._total_wait / self._checkouts * 1000) if self._checkouts else 0.0,
+                'max_wait_ms': self._max_wait * 1000,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'failed_health_checks': self._failed_health_checks,
+            }
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_entry(entry)
+
+    def _warm_up(self):
+        with self._cond:
+            if self._warmed_up or self._closed:
+                return
+            self._warmed_up = True
+            missing = max(self.min_size - self._size, 0)
+            self._size += missing
+
+        opened = []
+        try:
+            for _ in range(missing):
+                opened.append(self._open_reserved(reserved=False))
+                missing -= 1
+        finally:
+            with self._cond:
+                self._size -= missing  # Give back slots that never got a connection
+                self._idle.extend(opened)
+                self._cond.notify_all()
+
+    def _open_reserved(self, reserved=True):
+        """Open a connection for a slot already counted in ``_size``"""
+        try:
+            connection = self.connection_factory()
+        except Exception:
+            if reserved:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        return PooledConnection(connection)
+
+    def _is_healthy(self, entry, force=False):
+        if not force and time.monotonic() - entry.last_used < self.ping_interval:
+            return True
+        try:
+            healthy = bool(self.health_check(entry.connection))
+        except Exception:
+            healthy = False
+        if not healthy:
+            with self._cond:
+                self._failed_health_checks += 1
+        return healthy
+
+    def _close_entry(self, entry):
+        try:
+            entry.connection.close()
+        except Exception:
+            pass  # Already dead; nothing left to clean up
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
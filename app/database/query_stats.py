@@ -0,0 +1,226 @@
+# app/database/query_stats.py
+"""Per-query latency statistics and the slow-query log.
+
+DBHandler times every statement it runs and hands it to ``QueryStats``,
+which keys it by normalised SQL (literals and placeholders become ``?``,
+``IN (?, ?, ...)`` lists collapse) so every call of one query shares a
+latency histogram, row count and tally of the service methods calling it.
+Statements slower than ``slow_query_ms`` are written to the slow-query log
+file, if one is configured, in their normalised form: parameter values
+never reach the log.
+"""
+import bisect
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+# Histogram bucket upper bounds in milliseconds; one more bucket holds the rest
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+_NORMALISED_CACHE_SIZE = 2048
+
+slow_log = logging.getLogger('app.database.slow_queries')
+slow_log.propagate = False
+
+_INTERNAL = ('app.database', 'contextlib')
+_caller_names = {}  # code object -> "Class.method", or None for database-layer frames
+
+
+def normalize(query):
+    """The query with literals and placeholders as ``?`` and whitespace collapsed"""
+    query = _STRING.sub("?", query)
+    query = _NUMBER.sub("?", query)
+    query = _PLACEHOLDER.sub("?", query)
+    query = _LIST.sub("(?+)", query)
+    return _SPACE.sub(" ", query).strip()
+
+
+def _caller():
+    """``Class.method`` of the nearest frame outside the database layer"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        try:
+            name = _caller_names[code]
+        except KeyError:
+            module = frame.f_globals.get('__name__', '')
+            name = None
+            if not module.startswith(_INTERNAL):
+                name = getattr(code, 'co_qualname', code.co_name)
+                if '.' not in name:
+                    name = f"{module.rsplit('.', 1)[-1]}.{name}"
+            _caller_names[code] = name
+        if name is not None:
+            return name
+        frame = frame.f_back
+    return None
+
+
+class _QueryEntry:
+    __slots__ = ('calls', 'errors', 'total', 'min', 'max', 'rows', 'buckets', 'callers')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.callers = Counter()
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile, in ms"""
+        wanted = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max * 1000)
+        return self.max * 1000
+
+
+class _Measurement:
+    """Times one statement; the caller sets ``rows`` before the block ends"""
+    __slots__ = ('stats', 'query', 'params', 'started', 'rows')
+
+    def __init__(self, stats, query, params):
+        self.stats = stats
+        self.query = query
+        self.params = params
+        self.rows = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats.record(self.query, time.perf_counter() - self.started, self.rows, self.params,
+                          error=exc_type is not None)
+        return False
+
+
+class _NoMeasurement:
+    __slots__ = ('rows',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOT_MEASURED = _NoMeasurement()
+
+
+class QueryStats:
+    """Thread-safe latency histograms keyed by normalised SQL"""
+
+    def __init__(self, enabled=True, slow_query_ms=500, slow_query_log=None):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._normalised = {}
+        self._log_handler = None
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.configure(slow_query_log=slow_query_log)
+
+    def configure(self, enabled=None, slow_query_ms=None, slow_query_log=None):
+        """Change settings; ``slow_query_log`` is a file path, or False to stop logging"""
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_query_ms is not None:
+            self.slow_query_ms = slow_query_ms
+        if slow_query_log is not None:
+            if self._log_handler:
+                slow_log.removeHandler(self._log_handler)
+                self._log_handler.close()
+                self._log_handler = None
+            if slow_query_log:
+                self._log_handler = logging.FileHandler(slow_query_log, encoding='utf-8')
+                self._log_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                slow_log.addHandler(self._log_handler)
+                slow_log.setLevel(logging.INFO)
+
+    @property
+    def slow_query_log(self):
+        """Path of the slow-query log file, or None when it is off"""
+        return self._log_handler.baseFilename if self._log_handler else None
+
+    def measure(self, query, params=None):
+        """Context manager timing one statement"""
+        if not self.enabled:
+            return _NOT_MEASURED
+        return _Measurement(self, query, params)
+
+    def record(self, query, seconds, rows=None, params=None, error=False):
+        """Add one execution of ``query``"""
+        if not self.enabled:
+            return
+        key = self._normalised.get(query)
+        if key is None:
+            if len(self._normalised) >= _NORMALISED_CACHE_SIZE:
+                self._normalised.clear()
+            key = self._normalised[query] = normalize(query)
+        caller = _caller()
+        milliseconds = seconds * 1000
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _QueryEntry()
+            entry.calls += 1
+            entry.errors += error
+            entry.total += seconds
+            if entry.min is None or seconds < entry.min:
+                entry.min = seconds
+            if seconds > entry.max:
+                entry.max = seconds
+            if rows and rows > 0:
+                entry.rows += rows
+            entry.buckets[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+            entry.callers[caller] += 1
+
+        if self._log_handler and self.slow_query_ms is not None and milliseconds >= self.slow_query_ms:
+            # Normalised SQL only: the values in ``params`` are never written out
+            slow_log.info("%.1f ms rows=%s caller=%s params=%d redacted%s | %s", milliseconds,
+                          rows if rows is not None else '-', caller, len(params or ()),
+                          " ERROR" if error else "", key)
+
+    def snapshot(self, sort='total_ms', limit=None):
+        """Per-query statistics as dicts, slowest ``sort`` first"""
+        with self._lock:
+            items = list(self._entries.items())
+            queries = []
+            for key, entry in items:
+                queries.append({
+                    'query': key,
+                    'calls': entry.calls,
+                    'errors': entry.errors,
+                    'total_ms': round(entry.total * 1000, 3),
+                    'mean_ms': round(entry.total * 1000 / entry.calls, 3),
+                    'min_ms': round((entry.min or 0) * 1000, 3),
+                    'max_ms': round(entry.max * 1000, 3),
+                    'p50_ms': round(entry.percentile(0.5), 3),
+                    'p95_ms': round(entry.percentile(0.95), 3),
+                    'p99_ms': round(entry.percentile(0.99), 3),
+                    'rows': entry.rows,
+                    'callers': dict(entry.callers.most_common()),
+                    'histogram': {f"<={bound}ms": count for bound, count in zip(BUCKETS_MS, entry.buckets)}
+                                 | {f">{BUCKETS_MS[-1]}ms": entry.buckets[-1]},
+                })
+        queries.sort(key=lambda query: query[sort], reverse=True)
+        return queries[:limit] if limit else queries
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,252 @@
+# app/database/sqlite_backend.py
+"""SQLite stand-in for the MySQL server.
+
+Used by the stress tests and benchmarks when no MySQL server is available.
+The wrapper lets DBHandler and the services run unchanged: ``%s``
+placeholders, dictionary cursors, ``START TRANSACTION``/``FOR UPDATE`` and
+the MySQL functions the services call are translated on the fly, and
+sqlite3 errors are re-raised as the matching mysql.connector errors.
+"""
+import re
+import sqlite3
+from datetime import date, datetime
+
+from mysql.connector import errorcode, errors
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username VARCHAR(50) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        full_name VARCHAR(100) NOT NULL,
+        email VARCHAR(100),
+        role VARCHAR(20) DEFAULT 'librarian'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS books (
+        book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        isbn VARCHAR(20) NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        author VARCHAR(255) NOT NULL,
+        publisher VARCHAR(255),
+        publication_year INTEGER,
+        category VARCHAR(100),
+        total_copies INTEGER NOT NULL DEFAULT 1,
+        available_copies INTEGER NOT NULL DEFAULT 1,
+        shelf_location VARCHAR(50),
+        added_by INTEGER REFERENCES users(user_id),
+        added_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS members (
+        member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name VARCHAR(50) NOT NULL,
+        last_name VARCHAR(50) NOT NULL,
+        cnic VARCHAR(20),
+        email VARCHAR(100) UNIQUE,
+        phone VARCHAR(20) NOT NULL,
+        address TEXT NOT NULL,
+        city VARCHAR(50),
+        registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        membership_status VARCHAR(20) DEFAULT 'active',
+        registered_by INTEGER REFERENCES users(user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS loans (
+        loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER NOT NULL REFERENCES books(book_id),
+        member_id INTEGER NOT NULL REFERENCES members(member_id),
+        issue_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        due_date DATE NOT NULL,
+        return_date DATE NULL,
+        loan_status VARCHAR(20) DEFAULT 'issued',
+        fine_amount DECIMAL(10, 2) DEFAULT 0,
+        fine_status VARCHAR(20) DEFAULT 'none',
+        issued_by INTEGER NOT NULL REFERENCES users(user_id)
+    )
+    """,
+]
+
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+_ON_DUPLICATE_KEY = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_VALUES_COLUMN = re.compile(r'\bVALUES\((\w+)\)', re.IGNORECASE)
+
+
+def _to_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _datediff(first, second):
+    if first is None or second is None:
+        return None
+    return (_to_date(first) - _to_date(second)).days
+
+
+def _concat(*parts):
+    if any(part is None for part in parts):
+        return None
+    return ''.join(str(part) for part in parts)
+
+
+def _greatest(*values):
+    return None if any(v is None for v in values) else max(values)
+
+
+def _least(*values):
+    return None if any(v is None for v in values) else min(values)
+
+
+def _parse_timestamp(raw):
+    text = raw.decode()
+    return datetime.fromisoformat(text) if len(text) > 10 else datetime.fromisoformat(text + " 00:00:00")
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATE', lambda raw: date.fromisoformat(raw.decode()[:10]))
+sqlite3.register_converter('TIMESTAMP', _parse_timestamp)
+sqlite3.register_converter('DECIMAL', lambda raw: float(raw))
+
+
+def translate(query):
+    """Rewrite the MySQL dialect used by the services into SQLite"""
+    query = _FOR_UPDATE.sub('', query)
+    upsert = _ON_DUPLICATE_KEY.search(query)
+    if upsert:
+        # INSERT ... ON DUPLICATE KEY UPDATE c = c + VALUES(c) -> ON CONFLICT DO UPDATE SET c = c + excluded.c
+        updates = _VALUES_COLUMN.sub(r'excluded.\1', query[upsert.end():])
+        query = f"{query[:upsert.start()]}ON CONFLICT DO UPDATE SET{updates}"
+    return query.replace('%s', '?')
+
+
+def _map_error(error):
+    message = str(error)
+    if message.startswith('index') and message.endswith('already exists'):
+        return errors.ProgrammingError(msg=message, errno=errorcode.ER_DUP_KEYNAME)
+    if message.startswith('table') and message.endswith('already exists'):
+        return errors.ProgrammingError(msg=message, errno=errorcode.ER_TABLE_EXISTS_ERROR)
+    if message.startswith('duplicate column name'):
+        return errors.ProgrammingError(msg=message, errno=errorcode.ER_DUP_FIELDNAME)
+    if isinstance(error, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=str(error))
+    if isinstance(error, sqlite3.OperationalError):
+        return errors.OperationalError(msg=str(error))
+    return errors.DatabaseError(msg=str(error))
+
+
+class SQLiteCursor:
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.raw.cursor()
+        self._dictionary = dictionary
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query, params=()):
+        try:
+            self._cursor.execute(translate(query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+
+    def executemany(self, query, seq_params):
+        try:
+            self._cursor.executemany(translate(query), [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+        self.rowcount = self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection exposing the mysql.connector methods DBHandler uses"""
+
+    dialect = 'sqlite'
+
+    def __init__(self, path):
+        # Autocommit mode; transactions are opened explicitly like on MySQL
+        self.raw = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                   check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+        self.raw.execute("PRAGMA journal_mode=WAL")
+        self.raw.execute("PRAGMA synchronous=NORMAL")
+        self.raw.execute("PRAGMA foreign_keys=ON")
+        self.raw.create_function('DATEDIFF', 2, _datediff, deterministic=True)
+        self.raw.create_function('CONCAT', -1, _concat, deterministic=True)
+        self.raw.create_function('GREATEST', -1, _greatest, deterministic=True)
+        self.raw.create_function('LEAST', -1, _least, deterministic=True)
+        self.raw.create_function('NOW', 0, lambda: datetime.now().isoformat(' '))
+        self.raw.create_function('CURDATE', 0, lambda: date.today().isoformat())
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    def start_transaction(self):
+        # IMMEDIATE takes the write lock up front, like InnoDB row locks taken by FOR UPDATE
+        try:
+            self.raw.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.raw.close()
+
+
+def connection_factory(path):
+    """Factory for DBHandler(connection_factory=...) backed by a SQLite file"""
+    return lambda: SQLiteConnection(path)
+
+
+def create_schema(path):
+    """Create the library tables in a SQLite database file"""
+    connection = SQLiteConnection(path)
+    try:
+        for statement in SCHEMA:
+            connection.raw.execute(statement)
+    finally:
+        connection.close()
@@ -0,0 +1,89 @@
+# app/database/statement_cache.py
+"""Server-side prepared statements kept open per connection.
+
+A ``StatementCache`` belongs to one pooled connection and holds one
+prepared cursor (``cursor(prepared=True)``) per query text, so a point
+lookup run thousands of times a day is parsed and planned by the server
+once per connection instead of on every call. The least recently used
+statement is closed once the cache is full. Hit, miss and eviction counts
+from every connection's cache are summed in one ``StatementStats``.
+
+mysql.connector re-prepares unless it is given the very string object it
+prepared, so the cache runs each statement with the query text it stored.
+"""
+import threading
+from collections import OrderedDict
+
+from mysql.connector import Error
+
+
+class StatementStats:
+    """Hit, miss and eviction counters shared by the caches of one DBHandler"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def count(self, hits=0, misses=0, evictions=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+
+class StatementCache:
+    """LRU of prepared cursors for one connection; used by one thread at a time, like the connection"""
+
+    def __init__(self, connection, capacity, stats):
+        self.connection = connection
+        self.capacity = capacity
+        self.stats = stats
+        self._cursors = OrderedDict()  # query text -> (that same string, prepared cursor)
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def get(self, query):
+        """(query, cursor) for ``query``, preparing it on a miss; run the cursor with the returned query"""
+        cached = self._cursors.get(query)
+        if cached is not None:
+            self._cursors.move_to_end(query)
+            self.stats.count(hits=1)
+            return cached
+
+        cached = self._cursors[query] = (query, self.connection.cursor(prepared=True, dictionary=True))
+        evicted = 0
+        while len(self._cursors) > self.capacity:
+            old_query, (text, cursor) = self._cursors.popitem(last=False)
+            self._close(cursor)
+            evicted += 1
+        self.stats.count(misses=1, evictions=evicted)
+        return cached
+
+    def discard(self, query):
+        """Drop a statement whose last run failed; it is prepared afresh next time"""
+        cached = self._cursors.pop(query, None)
+        if cached is not None:
+            self._close(cached[1])
+
+    def close(self):
+        """Close every prepared statement"""
+        while self._cursors:
+            self._close(self._cursors.popitem()[1][1])
+
+    @staticmethod
+    def _close(cursor):
+        try:
+            cursor.close()  # Deallocates the statement on the server
+        except Error:
+            pass
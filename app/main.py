@@ -1,9 +1,14 @@
 # app/main.py
+import threading
 import tkinter as tk
+from app.services.loan_service import LoanService
 from app.views.login_view import LoginView
 from app.views.admin_panel_view import AdminPanelView
 from app.database.db_handler import db
 
+SWEEP_INTERVAL_MS = 60 * 60 * 1000  # Overdue sweep every hour while the app is open
+SLOW_QUERY_LOG = "slow_queries.log"  # Statements over db.stats.slow_query_ms, parameters redacted
+
 
 class LibraryManagementSystem:
     def __init__(self):
@@ -13,8 +18,16 @@ class LibraryManagementSystem:
         self.current_user = None
         self.admin_panel = None
 
+        db.stats.configure(slow_query_log=SLOW_QUERY_LOG)
+
+        self._sweep_overdue()
         self._show_login()
 
+    def _sweep_overdue(self):
+        # On a worker thread so a slow sweep never freezes the UI
+        threading.Thread(target=LoanService.sweep_overdue, daemon=True).start()
+        self.root.after(SWEEP_INTERVAL_MS, self._sweep_overdue)
+
     def _show_login(self):
         LoginView(self.root, self._on_login_success)
 
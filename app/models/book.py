@@ -1,8 +1,11 @@
 class Book:
-    def __init__(self, book_id, isbn, title, author, publisher, publication_year,
-                 category, total_copies, available_copies, shelf_location, added_by, added_on=None):
-        ...
+    # No per-instance __dict__: catalogue lists hold a Book per title
+    __slots__ = ('book_id', 'isbn', 'title', 'author', 'publisher', 'publication_year', 'category',
+                 'total_copies', 'available_copies', 'shelf_location', 'added_by', 'added_on', 'added_by_name')
 
+    def __init__(self, book_id, isbn, title, author, publisher, publication_year,
+                 category, total_copies, available_copies, shelf_location, added_by, added_on=None,
+                 added_by_name=None):
         self.book_id = book_id
         self.isbn = isbn
         self.title = title
@@ -14,6 +17,8 @@ class Book:
         self.available_copies = available_copies
         self.shelf_location = shelf_location
         self.added_by = added_by
+        self.added_on = added_on
+        self.added_by_name = added_by_name  # Filled in when loaded with a JOIN on users
 
     def to_dict(self):
-        return self.__dict__
+        return {field: getattr(self, field) for field in self.__slots__}
@@ -1,7 +1,7 @@
-from datetime import datetime, timedelta
-
-
 class Loan:
+    __slots__ = ('loan_id', 'book_id', 'member_id', 'issue_date', 'due_date', 'return_date', 'loan_status',
+                 'fine_amount', 'fine_status', 'issued_by')
+
     def __init__(self, loan_id=None, book_id=None, member_id=None, issue_date=None,
                  due_date=None, return_date=None, loan_status='issued',
                  fine_amount=0.0, fine_status='none', issued_by=None):
@@ -16,18 +16,11 @@ class Loan:
         self.fine_status = fine_status  # 'none', 'pending', 'paid'
         self.issued_by = issued_by
 
-    def calculate_fine(self, daily_rate=5.0):
-        """Calculate fine based on overdue days"""
-        if self.return_date and self.due_date:
-            return_date = self.return_date if isinstance(self.return_date, datetime) else datetime.strptime(
-                self.return_date, '%Y-%m-%d %H:%M:%S')
-            due_date = self.due_date if isinstance(self.due_date, datetime) else datetime.strptime(self.due_date,
-                                                                                                   '%Y-%m-%d %H:%M:%S')
-
-            if return_date > due_date:
-                days_overdue = (return_date - due_date).days
-                return days_overdue * daily_rate
-        return 0.0
+    def calculate_fine(self, policy, category=None, membership_type=None):
+        """Calculate fine based on overdue days under ``policy``, e.g. FineService.policy"""
+        if not (self.return_date and self.due_date):
+            return 0.0
+        return policy.fine(self.due_date, self.return_date, category, membership_type)
 
     def to_dict(self):
         return {
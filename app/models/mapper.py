@@ -0,0 +1,53 @@
+# app/models/mapper.py
+"""Build model objects straight from row tuples.
+
+``row_mapper(Book, columns)`` returns a function that turns one row tuple,
+laid out as ``columns``, into a Book. It is generated once per model and
+column layout as straight-line attribute stores by position, so no dict is
+built per row and ``__init__`` is not called. Model slots the row does not
+carry get their ``__init__`` default; row columns the model has no slot for
+are ignored.
+"""
+import inspect
+import threading
+
+_mappers = {}
+_lock = threading.Lock()
+
+
+def _generate(model, columns):
+    position = {}
+    for n, column in enumerate(columns):
+        position.setdefault(column, n)  # first one wins, like Book(**row) on a dict row
+    defaults = {name: parameter.default
+                for name, parameter in inspect.signature(model.__init__).parameters.items()
+                if parameter.default is not inspect.Parameter.empty}
+
+    namespace = {'new': object.__new__, 'model': model}
+    lines = ["def build(row):", "    obj = new(model)"]
+    for n, slot in enumerate(model.__slots__):
+        if slot in position:
+            lines.append(f"    obj.{slot} = row[{position[slot]}]")
+        else:
+            namespace[f"default_{n}"] = defaults.get(slot)
+            lines.append(f"    obj.{slot} = default_{n}")
+    lines.append("    return obj")
+    exec("\n".join(lines), namespace)
+    return namespace['build']
+
+
+def row_mapper(model, columns):
+    """Function building a ``model`` (a slotted class) from a row tuple laid out as ``columns``"""
+    key = (model, tuple(columns))
+    mapper = _mappers.get(key)
+    if mapper is None:
+        with _lock:
+            mapper = _mappers.get(key)
+            if mapper is None:
+                mapper = _mappers[key] = _generate(model, key[1])
+    return mapper
+
+
+def model_rows(model):
+    """``row_factory`` for db.stream that yields ``model`` objects"""
+    return lambda columns: row_mapper(model, columns)
@@ -1,7 +1,11 @@
 class Member:
+    __slots__ = ('member_id', 'first_name', 'last_name', 'cnic', 'email', 'phone', 'address', 'city',
+                 'registration_date', 'membership_status', 'registered_by', 'membership_type')
+
     def __init__(self, member_id=None, first_name=None, last_name=None, cnic=None,
                  email=None, phone=None, address=None, city=None,
-                 registration_date=None, membership_status='active', registered_by=None):
+                 registration_date=None, membership_status='active', registered_by=None,
+                 membership_type='standard'):
         self.member_id = member_id
         self.first_name = first_name
         self.last_name = last_name
@@ -13,6 +17,7 @@ class Member:
         self.registration_date = registration_date
         self.membership_status = membership_status
         self.registered_by = registered_by
+        self.membership_type = membership_type  # Selects the member's rate in the fine policy
 
     def to_dict(self):
         return {
@@ -27,7 +32,8 @@ class Member:
             'city': self.city,
             'registration_date': self.registration_date,
             'membership_status': self.membership_status,
-            'registered_by': self.registered_by
+            'registered_by': self.registered_by,
+            'membership_type': self.membership_type
         }
 
     @property
@@ -1,5 +1,7 @@
 # app/models/user.py
 class User:
+    __slots__ = ('user_id', 'username', 'password', 'full_name', 'email', 'role')
+
     def __init__(self, user_id=None, username=None, password=None, full_name=None, email=None, role=None):
         self.user_id = user_id
         self.username = username
@@ -1,5 +1,18 @@
+import re
 from app.models.book import Book #
 from app.database.db_handler import db #
+from app.services.catalogue_cache import BOOK_SELECT, catalogue
+from app.services.change_feed import ChangeFeed
+from app.services.report_service import ReportService, pending_fine_sql
+
+# Mirrors innodb_ft_min_token_size and the default InnoDB stopword list:
+# these words are not in the FULLTEXT index, so they must not be required terms
+FULLTEXT_MIN_WORD = 3
+FULLTEXT_STOPWORDS = frozenset("""
+    a about an are as at be by com de en for from how i in is it la of on or
+    that the this to was what when where who will with und www
+""".split())
+ISBN_PATTERN = re.compile(r'^[0-9Xx-]+$')
 
 
 class BookService:
@@ -23,7 +36,18 @@ class BookService:
             book_data['available_copies'], book_data.get('shelf_location'),
             book_data['added_by']
         )
-        return db.execute_query(query, values) #
+        try:
+            with db.transaction() as tx:
+                tx.execute(query, values)
+                book_id = tx.lastrowid
+                ReportService.adjust_category_summary(tx, {book_data.get('category'): {
+                    'titles': 1, 'copies': book_data['total_copies']}})
+                ChangeFeed.record(tx, 'book', [book_id], 'insert')
+            catalogue.refresh(book_id)
+            return True
+        except Exception as e:
+            print(f"Error adding book: {e}")
+            return False
 
     @staticmethod
     def update_book(book_data): #
@@ -47,27 +71,159 @@ class BookService:
             book_data['available_copies'], book_data.get('shelf_location'),
             book_data['book_id']
         )
-        return db.execute_query(query, values) #
+        # Open loans and pending fines follow the book if its category changes
+        loans_query = f"""
+            SELECT SUM(CASE WHEN return_date IS NULL THEN 1 ELSE 0 END) AS on_loan,
+                   SUM(CASE WHEN return_date IS NULL AND loan_status = 'overdue' THEN 1 ELSE 0 END) AS overdue,
+                   SUM({pending_fine_sql()}) AS pending_fines
+            FROM loans WHERE book_id = %s
+        """
+        try:
+            with db.transaction() as tx:
+                old = tx.fetch_one("SELECT category, total_copies FROM books WHERE book_id = %s FOR UPDATE",
+                                   (book_data['book_id'],))
+                if not old:
+                    return False
+                tx.execute(query, values)
+
+                old_category, new_category = old['category'] or '', book_data.get('category') or ''
+                if old_category == new_category:
+                    ReportService.adjust_category_summary(tx, {new_category: {
+                        'copies': book_data['total_copies'] - old['total_copies']}})
+                else:
+                    loans = tx.fetch_one(loans_query, (book_data['book_id'],))
+                    moved = {column: float(loans[column] or 0) for column in ('on_loan', 'overdue', 'pending_fines')}
+                    ReportService.adjust_category_summary(tx, {
+                        old_category: dict({column: -value for column, value in moved.items()},
+                                           titles=-1, copies=-old['total_copies']),
+                        new_category: dict(moved, titles=1, copies=book_data['total_copies']),
+                    })
+                ChangeFeed.record(tx, 'book', [book_data['book_id']])
+            catalogue.refresh(book_data['book_id'])
+            return True
+        except Exception as e:
+            print(f"Error updating book: {e}")
+            return False
 
     @staticmethod
     def get_all_books(): #
-        query = "SELECT * FROM books ORDER BY title" #
-        results = db.execute_query(query, fetch=True) #
-        return [Book(**row) for row in results] if results else [] #
+        return catalogue.books(model=Book) #
+
+    @staticmethod
+    def get_books_by_ids(book_ids):
+        """Current rows for the given books, e.g. to patch a list after a change"""
+        if not book_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(book_ids))
+        query = f"{BOOK_SELECT} WHERE b.book_id IN ({placeholders})"
+        results = db.execute_query(query, tuple(book_ids), fetch=True)
+        return [Book(**row) for row in results] if results else []
 
     @staticmethod
     def get_book_by_id(book_id): #
-        query = "SELECT * FROM books WHERE book_id = %s" #
-        result = db.execute_query(query, (book_id,), fetch=True) #
-        return Book(**result[0]) if result else None #
+        row = catalogue.book(book_id) #
+        return Book(**row) if row else None #
 
     @staticmethod
     def delete_book(book_id): #
         query = "DELETE FROM books WHERE book_id = %s" #
-        return db.execute_query(query, (book_id,)) #
+        try:
+            with db.transaction() as tx:
+                book = tx.fetch_one("SELECT category, total_copies FROM books WHERE book_id = %s FOR UPDATE",
+                                    (book_id,))
+                if not book:
+                    return False
+                tx.execute(query, (book_id,))
+                ReportService.adjust_category_summary(tx, {book['category']: {
+                    'titles': -1, 'copies': -book['total_copies']}})
+                ChangeFeed.record(tx, 'book', [book_id], 'delete')
+            catalogue.discard(book_id)
+            return True
+        except Exception as e:
+            print(f"Error deleting book: {e}")
+            return False
 
     @staticmethod
     def get_available_books():
-        query = "SELECT * FROM books WHERE available_copies > 0 ORDER BY title"
-        results = db.execute_query(query, fetch=True)
+        return catalogue.books(available_only=True, model=Book)
+
+    @staticmethod
+    def get_books_page(after_key=None, limit=200, available_only=False):
+        """One page of books in title order, starting after ``after_key``.
+
+        Keyset pagination: ``after_key`` is the (title, book_id) of the last
+        book on the previous page, see ``page_key``. Cost is the same for the
+        first page and the thousandth.
+        """
+        conditions = []
+        params = []
+        if after_key is not None:
+            title, book_id = after_key
+            conditions.append("(b.title > %s OR (b.title = %s AND b.book_id > %s))")
+            params += [title, title, book_id]
+        if available_only:
+            conditions.append("b.available_copies > 0")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = f"{BOOK_SELECT}{where} ORDER BY b.title, b.book_id LIMIT %s"
+        results = db.execute_query(query, tuple(params) + (limit,), fetch=True)
         return [Book(**row) for row in results] if results else []
+
+    @staticmethod
+    def page_key(book):
+        """Keyset position of a book for get_books_page(after_key=...)"""
+        return (book.title, book.book_id)
+
+    @staticmethod
+    def search_books(term, limit=50, offset=0, available_only=False):
+        """Relevance-ranked catalogue search backed by the books FULLTEXT index.
+
+        An ISBN or book ID matches exactly and is listed first; a scanned
+        full-length ISBN that hits returns just that book. Words shorter than
+        the FULLTEXT minimum fall back to an indexed title prefix match.
+        """
+        term = (term or "").strip()
+        availability = " AND b.available_copies > 0" if available_only else ""
+
+        if not term:
+            query = f"{BOOK_SELECT} WHERE 1 = 1{availability} ORDER BY b.title, b.book_id LIMIT %s OFFSET %s"
+            results = db.execute_query(query, (limit, offset), fetch=True)
+            return [Book(**row) for row in results] if results else []
+
+        # Exact hits head the result list and are excluded from the ranked part on every page,
+        # so offset-based paging neither repeats nor skips a book
+        exact = []
+        if ISBN_PATTERN.match(term):
+            query = f"{BOOK_SELECT} WHERE (b.isbn = %s OR b.book_id = %s){availability} ORDER BY b.book_id"
+            book_id = int(term) if term.isdigit() else 0
+            exact = db.execute_query(query, (term, book_id), fetch=True) or []
+            if exact and len(term) >= 10:
+                return [Book(**row) for row in exact[offset:offset + limit]]
+        head = exact[offset:offset + limit]
+        limit, offset = limit - len(head), max(offset - len(exact), 0)
+        if not limit:
+            return [Book(**row) for row in head]
+        if exact:
+            availability += f" AND b.book_id NOT IN ({', '.join(['%s'] * len(exact))})"
+        excluded = tuple(row['book_id'] for row in exact)
+
+        words = [w for w in re.split(r'[^\w]+', term) if w]
+        if words and all(len(w) < FULLTEXT_MIN_WORD for w in words):
+            query = f"{BOOK_SELECT} WHERE b.title LIKE %s{availability} ORDER BY b.title, b.book_id LIMIT %s OFFSET %s"
+            results = db.execute_query(query, (f"{term}%",) + excluded + (limit, offset), fetch=True) or []
+        elif words:
+            # Every indexed word must match; the trailing * gives search-as-you-type prefix matching
+            indexed = [w for w in words if len(w) >= FULLTEXT_MIN_WORD and w.lower() not in FULLTEXT_STOPWORDS]
+            against = " ".join(f"+{w}*" for w in indexed or words)
+            query = f"""
+                {BOOK_SELECT}
+                WHERE MATCH(b.title, b.author, b.publisher, b.category) AGAINST (%s IN BOOLEAN MODE){availability}
+                ORDER BY MATCH(b.title, b.author, b.publisher, b.category) AGAINST (%s IN BOOLEAN MODE) DESC,
+                         b.title, b.book_id
+                LIMIT %s OFFSET %s
+            """
+            results = db.execute_query(query, (against,) + excluded + (against, limit, offset), fetch=True) or []
+        else:
+            results = []
+
+        return [Book(**row) for row in head + results]
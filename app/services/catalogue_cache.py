@@ -0,0 +1,251 @@
+# app/services/catalogue_cache.py
+"""Process-wide in-memory copy of the books table.
+
+Every window lists, looks up and counts books far more often than books
+change, so BookService and ReportService answer catalogue reads from here.
+Rows are kept as compact tuples keyed by book_id with secondary maps by ISBN
+and category. The services that add, edit, delete, lend or return books patch
+the cache once their transaction has committed; changes made by other
+processes are picked up when the snapshot is older than ``max_age`` seconds.
+"""
+import threading
+import time
+
+from app.database.db_handler import db
+from app.models.mapper import row_mapper
+
+# Books with the adder's name resolved in the same query
+BOOK_SELECT = """
+    SELECT b.*, u.full_name AS added_by_name
+    FROM books b
+    LEFT JOIN users u ON u.user_id = b.added_by
+"""
+
+
+class _Index:
+    """Rows of one catalogue snapshot plus the maps that find them"""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.slot = {field: n for n, field in enumerate(fields)}
+        self.rows = {}  # book_id -> tuple of column values in ``fields`` order
+        self.by_isbn = {}
+        self.by_category = {}
+        self._ordered = None  # book_ids in title order, rebuilt lazily after a write
+
+    def put(self, row):
+        self.put_values(tuple(row.get(field) for field in self.fields))
+
+    def put_values(self, values):
+        """Add or replace a book from its column values in ``fields`` order"""
+        book_id = values[self.slot['book_id']]
+        self.remove(book_id)
+        self.rows[book_id] = values
+        self.by_isbn[values[self.slot['isbn']]] = book_id
+        self.by_category.setdefault(values[self.slot['category']] or '', set()).add(book_id)
+        self._ordered = None
+        return book_id
+
+    def remove(self, book_id):
+        values = self.rows.pop(book_id, None)
+        if values is None:
+            return False
+        self.by_isbn.pop(values[self.slot['isbn']], None)
+        category = values[self.slot['category']] or ''
+        self.by_category.get(category, set()).discard(book_id)
+        self._ordered = None
+        return True
+
+    def ordered(self):
+        if self._ordered is None:
+            title = self.slot['title']
+            self._ordered = sorted(self.rows, key=lambda book_id: ((self.rows[book_id][title] or '').casefold(),
+                                                                   book_id))
+        return self._ordered
+
+    def as_dict(self, book_id):
+        return dict(zip(self.fields, self.rows[book_id]))
+
+
+class CatalogueCache:
+    """Thread-safe cache of the whole catalogue, up to ``maxsize`` books.
+
+    A catalogue larger than ``maxsize`` is not kept: full listings then read
+    the table each time and only count as misses.
+    """
+
+    def __init__(self, maxsize=100000, max_age=300.0):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._index = None
+        self._loaded_at = None
+        self._generation = 0  # bumped by every write, so a load racing a write is not kept
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.invalidations = 0
+        self.expired = 0
+
+    def configure(self, maxsize=100000, max_age=300.0):
+        """Change the limits; the current snapshot is dropped"""
+        with self._lock:
+            self.maxsize = maxsize
+            self.max_age = max_age
+        self.invalidate()
+
+    def _fresh(self):
+        if self._index is None:
+            return False
+        if time.monotonic() - self._loaded_at > self.max_age:
+            self._index = None
+            self.expired += 1
+            return False
+        return True
+
+    def _snapshot(self):
+        """The cached index, loading it first if needed (a throwaway one if it cannot be kept)"""
+        with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._index
+            self.misses += 1
+            generation = self._generation
+
+        # Read the table outside the lock so lookups from other threads are not held up.
+        # Rows are streamed as tuples straight into the index; no dict is built per book.
+        indexes = []
+
+        def index_rows(fields):
+            indexes.append(_Index(fields))
+            return indexes[-1].put_values
+
+        loaded = 0
+        try:
+            for book_ids in db.stream(BOOK_SELECT, batch_size=5000, row_factory=index_rows):
+                loaded += len(book_ids)
+        except Exception as e:
+            print(f"Error loading the catalogue: {e}")
+            indexes, loaded = [], 0
+        index = indexes[-1] if indexes else _Index(('book_id', 'isbn', 'title', 'category', 'available_copies'))
+
+        with self._lock:
+            # An empty catalogue is cheap to re-read and not worth keeping
+            if generation == self._generation and 0 < loaded <= self.maxsize:
+                self._index = index
+                self._loaded_at = time.monotonic()
+        return index
+
+    # --- Reads --------------------------------------------------------------
+
+    def books(self, available_only=False, category=None, model=None):
+        """Books in title order, optionally only lendable ones or one category.
+
+        Rows are dicts, or ``model`` objects (e.g. Book) built straight from
+        the cached tuples.
+        """
+        index = self._snapshot()
+        with self._lock:
+            book_ids = index.ordered()
+            if category is not None:
+                wanted = index.by_category.get(category or '', set())
+                book_ids = [book_id for book_id in book_ids if book_id in wanted]
+            rows = [index.rows[book_id] for book_id in book_ids]
+        if available_only:
+            available = index.slot['available_copies']
+            rows = [values for values in rows if (values[available] or 0) > 0]
+        if model is not None:
+            return list(map(row_mapper(model, index.fields), rows))
+        return [dict(zip(index.fields, values)) for values in rows]
+
+    def book(self, book_id):
+        """One book row as a dict, or None"""
+        return self._lookup(lambda index: book_id if book_id in index.rows else None,
+                            " WHERE b.book_id = %s", book_id)
+
+    def book_by_isbn(self, isbn):
+        """The book with this ISBN as a dict, or None"""
+        return self._lookup(lambda index: index.by_isbn.get(isbn), " WHERE b.isbn = %s", isbn)
+
+    def _lookup(self, find, where, value):
+        with self._lock:
+            if self._fresh():
+                self.hits += 1
+                book_id = find(self._index)
+                return None if book_id is None else self._index.as_dict(book_id)
+            self.misses += 1
+        # No snapshot yet: answer this one lookup by primary or unique key rather than loading everything
+        result = db.execute_query(BOOK_SELECT + where, (value,), fetch=True, prepared=True)
+        return result[0] if result else None
+
+    # --- Writes (call after the transaction has committed) ------------------
+
+    def refresh(self, book_id, attempts=3):
+        """Re-read one book after it was added or edited"""
+        with self._lock:
+            self._generation += 1
+            if self._index is None:
+                return
+            generation = self._generation
+
+        for attempt in range(attempts):
+            # Read the row outside the lock; a write landing meanwhile may be newer, so read again
+            result = db.execute_query(BOOK_SELECT + " WHERE b.book_id = %s", (book_id,), fetch=True, prepared=True)
+            with self._lock:
+                if self._index is None:
+                    return
+                if generation == self._generation:
+                    if result:
+                        self._index.put(result[0])
+                    else:
+                        self._index.remove(book_id)
+                    self.patches += 1
+                    return
+                generation = self._generation
+        self.invalidate()  # Too busy to patch safely; the next read loads afresh
+
+    def discard(self, book_id):
+        """Forget a deleted book"""
+        with self._lock:
+            self._generation += 1
+            if self._index is not None:
+                self._index.remove(book_id)
+                self.patches += 1
+
+    def adjust_available(self, changes):
+        """Apply {book_id: delta} to available_copies after loans were issued or returned"""
+        with self._lock:
+            self._generation += 1
+            if self._index is None or not changes:
+                return
+            slot = self._index.slot['available_copies']
+            for book_id, delta in changes.items():
+                values = self._index.rows.get(book_id)
+                if values is None:
+                    # A book this snapshot never saw, e.g. added by another process: start over
+                    self._index = None
+                    self.invalidations += 1
+                    return
+                self._index.rows[book_id] = values[:slot] + ((values[slot] or 0) + delta,) + values[slot + 1:]
+            self.patches += 1
+
+    def invalidate(self):
+        """Drop the snapshot, e.g. after a bulk import"""
+        with self._lock:
+            self._generation += 1
+            if self._index is not None:
+                self._index = None
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            cached = self._index is not None
+            return {
+                'size': len(self._index.rows) if cached else 0, 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses, 'patches': self.patches,
+                'invalidations': self.invalidations, 'expired': self.expired,
+                'age': round(time.monotonic() - self._loaded_at, 1) if cached else None,
+            }
+
+
+catalogue = CatalogueCache()
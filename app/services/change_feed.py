@@ -0,0 +1,107 @@
+# app/services/change_feed.py
+"""Feed of changed books, loans and members for the open windows on every desk.
+
+Each service that changes a row also writes (entity, entity_id, action) to
+``change_log`` in the same transaction. Windows poll the feed through a
+ChangePoller and patch just the rows that changed instead of reloading.
+"""
+import time
+from datetime import datetime, timedelta
+
+from app.database.db_handler import db
+
+ENTITIES = ('book', 'loan', 'member')
+ACTIONS = ('insert', 'update', 'delete')
+
+
+class ChangeFeed:
+    @staticmethod
+    def record(tx, entity, entity_ids, action='update'):
+        """Log changes to ``entity_ids`` within ``tx``"""
+        rows = [(entity, entity_id, action) for entity_id in dict.fromkeys(entity_ids)]
+        if rows:
+            tx.executemany("INSERT INTO change_log (entity, entity_id, action) VALUES (%s, %s, %s)", rows)
+
+    @staticmethod
+    def record_select(tx, entity, id_query, params=(), action='update'):
+        """Log changes to every id returned by ``id_query`` within ``tx``, without fetching them"""
+        tx.execute(f"INSERT INTO change_log (entity, entity_id, action) SELECT %s, ids.id, %s FROM ({id_query}) ids",
+                   (entity, action) + tuple(params))
+
+    @staticmethod
+    def latest_id():
+        result = db.execute_query("SELECT MAX(change_id) AS change_id FROM change_log", fetch=True)
+        return (result[0]['change_id'] or 0) if result else 0
+
+    @staticmethod
+    def changes_since(change_id, limit=1000):
+        """Changes after ``change_id`` in feed order"""
+        query = """
+            SELECT change_id, entity, entity_id, action FROM change_log
+            WHERE change_id > %s ORDER BY change_id LIMIT %s
+        """
+        return db.execute_query(query, (change_id, limit), fetch=True) or []
+
+    @staticmethod
+    def changes_in(change_ids):
+        """Those of ``change_ids`` committed so far, in feed order"""
+        placeholders = ", ".join(["%s"] * len(change_ids))
+        query = f"""
+            SELECT change_id, entity, entity_id, action FROM change_log
+            WHERE change_id IN ({placeholders}) ORDER BY change_id
+        """
+        return db.execute_query(query, tuple(change_ids), fetch=True) or []
+
+    @staticmethod
+    def prune(days=7):
+        """Delete changes older than ``days``; no open window is that far behind"""
+        cutoff = datetime.now() - timedelta(days=days)
+        with db.transaction() as tx:
+            return tx.execute("DELETE FROM change_log WHERE changed_at < %s", (cutoff,))
+
+
+class ChangePoller:
+    """Reads the feed from where the previous poll stopped.
+
+    Ids are handed out when a transaction writes its change but only become
+    visible when it commits, so a slow transaction can commit an id below
+    one already read. Each poll reads the ids above the last one seen and
+    re-checks just the ids it skipped over, until they turn up or
+    ``gap_seconds`` pass (a rolled-back transaction's id never does). Only
+    the ``overlap`` ids below a committed one are tracked as such gaps.
+    """
+
+    def __init__(self, overlap=500, start_id=None, gap_seconds=60):
+        self.overlap = overlap
+        self.gap_seconds = gap_seconds
+        self.last_id = ChangeFeed.latest_id() if start_id is None else start_id
+        self._gaps = {}  # change_id skipped over -> when it was first missed
+        # Changes already committed when the poller starts are not news to its window; the rest may be
+        low = max(self.last_id - overlap, 0)
+        committed = {row['change_id'] for row in ChangeFeed.changes_since(low, overlap)}
+        now = time.monotonic()
+        for change_id in range(low + 1, self.last_id):
+            if change_id not in committed:
+                self._gaps[change_id] = now
+
+    def poll(self, limit=1000):
+        """{entity: {action: [entity_id, ...]}} for changes not returned before"""
+        rows = ChangeFeed.changes_since(self.last_id, limit)
+        if self._gaps:
+            rows = ChangeFeed.changes_in(list(self._gaps)) + rows
+        now = time.monotonic()
+        changes = {}
+        for row in rows:
+            change_id = row['change_id']
+            if change_id > self.last_id:
+                for gap in range(max(self.last_id + 1, change_id - self.overlap), change_id):
+                    self._gaps[gap] = now
+                self.last_id = change_id
+            else:
+                del self._gaps[change_id]
+            ids = changes.setdefault(row['entity'], {}).setdefault(row['action'], [])
+            if row['entity_id'] not in ids:
+                ids.append(row['entity_id'])
+        self._gaps = {change_id: missed for change_id, missed in self._gaps.items()
+                      if now - missed < self.gap_seconds}
+        return changes
@@ -0,0 +1,96 @@
+# app/services/export_writers.py
+"""File writers for ReportService.export, one per format.
+
+Each writer takes rows in batches and holds only the current batch, so an
+export of any size runs in bounded memory. XLSX and Parquet need openpyxl
+and pyarrow respectively; they are imported only when those formats are used.
+"""
+import csv
+import os
+
+# Worksheet rows are limited to 2**20; longer exports continue on a new sheet
+XLSX_MAX_ROWS = 1048576
+EXTENSIONS = {'.csv': 'csv', '.xlsx': 'xlsx', '.parquet': 'parquet'}
+
+
+def detect_format(path):
+    """Export format from a file name, e.g. 'xlsx' for loans.xlsx"""
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Unknown export format for {path}; expected one of {', '.join(sorted(EXTENSIONS))}")
+    return EXTENSIONS[extension]
+
+
+class CsvWriter:
+    def __init__(self, path, columns, title):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, kind in columns])
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxWriter:
+    def __init__(self, path, columns, title):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise RuntimeError("XLSX export needs openpyxl (pip install openpyxl)")
+        self.path = path
+        self.title = title
+        self.header = [name for name, kind in columns]
+        # Write-only workbooks spool rows to a temporary file instead of keeping cells in memory
+        self._book = Workbook(write_only=True)
+        self._sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self._sheets += 1
+        self._sheet = self._book.create_sheet(self.title if self._sheets == 1 else f"{self.title} {self._sheets}")
+        self._sheet.append(self.header)
+        self._rows = 1
+
+    def write(self, rows):
+        for row in rows:
+            if self._rows == XLSX_MAX_ROWS:
+                self._new_sheet()
+            self._sheet.append(row)
+            self._rows += 1
+
+    def close(self):
+        self._book.save(self.path)
+
+
+class ParquetWriter:
+    def __init__(self, path, columns, title):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(),
+                 'date': pa.date32(), 'datetime': pa.timestamp('s')}
+        self._pa = pa
+        self._columns = columns
+        self._schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        # One row group per batch
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        arrays = []
+        for n, (name, kind) in enumerate(self._columns):
+            values = [row[n] for row in rows]
+            if kind == 'float':
+                values = [None if value is None else float(value) for value in values]  # DECIMAL columns
+            arrays.append(self._pa.array(values, type=self._schema.field(name).type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'xlsx': XlsxWriter, 'parquet': ParquetWriter}
@@ -1,24 +1,254 @@
 
+from collections import defaultdict
+
 from app.database.db_handler import db
+from app.services.change_feed import ChangeFeed
+from app.services.fine_policy import FinePolicy
+from app.services.report_service import ReportService, pending_fine_sql
+
+# fine_status a loan ends in once a ledger entry of this type settles it
+SETTLED_STATUS = {'payment': 'paid', 'waiver': 'waived'}
 
 class FineService:
+    # Library-wide fine rules; every fine computed by the services goes through this
+    policy = FinePolicy(daily_rate=5.0)
+
+    @staticmethod
+    def set_policy(policy):
+        FineService.policy = policy
+
+    @staticmethod
+    def calculate_fines(due_dates, return_dates, categories=None, membership_types=None):
+        """Fines for many loans at once under the current policy, as a NumPy array"""
+        return FineService.policy.fines(due_dates, return_dates, categories, membership_types)
+
+    @staticmethod
+    def calculate_fine(due_date, return_date, category=None, membership_type=None):
+        """Fine for one loan under the current policy"""
+        return FineService.policy.fine(due_date, return_date, category, membership_type)
+
+    @staticmethod
+    def fine_sql(until, due_sql='due_date', category_sql=None, membership_sql=None):
+        """The current policy as an SQL expression plus params, for set-based UPDATEs"""
+        return FineService.policy.to_sql(until, due_sql, category_sql, membership_sql)
+
+    # --- Fine ledger ---------------------------------------------------------
+    # fine_transactions is append-only: assessments are positive, payments and
+    # waivers negative. member_balances holds each member's ledger sum and
+    # library_totals.pending_fines the library total, both updated in the
+    # same transaction as the ledger rows.
+
+    @staticmethod
+    def _post(tx, rows):
+        """Append (loan_id, member_id, txn_type, amount, recorded_by) rows and move member balances"""
+        if not rows:
+            return
+        tx.executemany("""
+            INSERT INTO fine_transactions (loan_id, member_id, txn_type, amount, recorded_by)
+            VALUES (%s, %s, %s, %s, %s)
+        """, rows)
+        balances = defaultdict(float)
+        for loan_id, member_id, txn_type, amount, recorded_by in rows:
+            balances[member_id] += amount
+        tx.executemany("""
+            INSERT INTO member_balances (member_id, balance) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE balance = balance + VALUES(balance)
+        """, [(member_id, round(amount, 2)) for member_id, amount in balances.items()])
+
+    @staticmethod
+    def record_assessments(tx, assessments, recorded_by=None):
+        """Post fines assessed at return, as [(loan_id, member_id, amount)], within ``tx``"""
+        FineService._post(tx, [
+            (loan_id, member_id, 'assess', round(float(amount), 2), recorded_by)
+            for loan_id, member_id, amount in assessments if amount and float(amount) > 0
+        ])
+
+    @staticmethod
+    def post_payments(payments, txn_type='payment', recorded_by=None):
+        """Post a batch of payments (or waivers) in one transaction.
+
+        ``payments`` is [(loan_id, amount)]; an amount of None settles the
+        whole outstanding fine and a smaller one is a partial payment. A loan
+        whose fine reaches zero becomes 'paid' ('waived' for waivers).
+        Returns {'posted': {loan_id: amount}, 'rejected': {loan_id: reason},
+        'total': amount}.
+        """
+        result = {'posted': {}, 'rejected': {}, 'total': 0.0}
+        payments = list(payments)
+        if not payments:
+            return result
+        if txn_type not in SETTLED_STATUS:
+            raise ValueError(f"Unknown fine transaction type: {txn_type}")
+
+        loan_ids = tuple(dict.fromkeys(loan_id for loan_id, amount in payments))
+        placeholders = ", ".join(["%s"] * len(loan_ids))
+        loans_query = f"""
+            SELECT l.loan_id, l.book_id, l.member_id, {pending_fine_sql('l')} AS outstanding
+            FROM loans l WHERE l.loan_id IN ({placeholders})
+            FOR UPDATE
+        """
+        try:
+            with db.transaction() as tx:
+                loans = {row['loan_id']: row for row in tx.fetch(loans_query, loan_ids)}
+                owed = {loan_id: round(float(row['outstanding'] or 0), 2) for loan_id, row in loans.items()}
+
+                rows, pending_change = [], defaultdict(float)
+                for loan_id, amount in payments:
+                    left = owed.get(loan_id, 0)
+                    amount = left if amount is None else round(float(amount), 2)
+                    if left <= 0:
+                        result['rejected'][loan_id] = "no outstanding fine"
+                        continue
+                    if amount <= 0 or amount > left:
+                        result['rejected'][loan_id] = f"amount must be between 0 and {left:.2f}"
+                        continue
+                    loan = loans[loan_id]
+                    owed[loan_id] = round(left - amount, 2)
+                    rows.append((loan_id, loan['member_id'], txn_type, -amount, recorded_by))
+                    pending_change[loan['book_id']] -= amount
+                    result['posted'][loan_id] = round(result['posted'].get(loan_id, 0) + amount, 2)
+
+                FineService._post(tx, rows)
+                settled = tuple(loan_id for loan_id in result['posted'] if owed[loan_id] <= 0)
+                if settled:
+                    settled_placeholders = ", ".join(["%s"] * len(settled))
+                    tx.execute(f"UPDATE loans SET fine_status = %s WHERE loan_id IN ({settled_placeholders})",
+                               (SETTLED_STATUS[txn_type],) + settled)
+                ReportService.adjust_books_summary(
+                    tx, {book_id: {'pending_fines': change} for book_id, change in pending_change.items()})
+                ChangeFeed.record(tx, 'loan', result['posted'])
+            result['total'] = round(sum(result['posted'].values()), 2)
+        except Exception as e:
+            print(f"Error posting fine {txn_type}s: {e}")
+            result = {'posted': {}, 'rejected': {}, 'total': 0.0, 'error': str(e)}
+        return result
+
+    @staticmethod
+    def pay_fine(loan_id, amount=None, recorded_by=None):
+        """Pay all (or ``amount`` of) a loan's outstanding fine"""
+        return loan_id in FineService.post_payments([(loan_id, amount)], 'payment', recorded_by)['posted']
+
+    @staticmethod
+    def waive_fine(loan_id, amount=None, recorded_by=None):
+        """Waive all (or ``amount`` of) a loan's outstanding fine"""
+        return loan_id in FineService.post_payments([(loan_id, amount)], 'waiver', recorded_by)['posted']
+
     @staticmethod
     def mark_fine_as_paid(loan_id):
-        """Update fine status to paid"""
+        """Settle a loan's outstanding fine in full"""
+        return FineService.pay_fine(loan_id)
+
+    @staticmethod
+    def get_member_balance(member_id):
+        """What a member owes across all loans, from member_balances"""
+        result = db.execute_query("SELECT balance FROM member_balances WHERE member_id = %s",
+                                  (member_id,), fetch=True)
+        return float(result[0]['balance']) if result else 0.0
+
+    @staticmethod
+    def get_member_statement(member_id):
+        """A member's ledger entries in posting order"""
         query = """
-            UPDATE loans SET
-            fine_status = 'paid'
-            WHERE loan_id = %s AND fine_amount > 0
+            SELECT ft.*, b.title
+            FROM fine_transactions ft
+            JOIN loans l ON ft.loan_id = l.loan_id
+            JOIN books b ON l.book_id = b.book_id
+            WHERE ft.member_id = %s
+            ORDER BY ft.txn_id
+        """
+        return db.execute_query(query, (member_id,), fetch=True) or []
+
+    @staticmethod
+    def reconcile_balances(verify_only=False):
+        """Recompute member balances from the ledger and check it against loans.
+
+        Returns {'member_balances': [mismatch, ...], 'loans': [mismatch, ...]}.
+        Unless ``verify_only``, member_balances is rewritten when it differs;
+        loans whose ledger disagrees with their fine are only reported.
         """
-        return db.execute_query(query, (loan_id,))
+        report = {}
+        with db.transaction() as tx:
+            expected = {row['member_id']: round(float(row['balance']), 2) for row in tx.fetch(
+                "SELECT member_id, SUM(amount) AS balance FROM fine_transactions GROUP BY member_id")}
+            stored = {row['member_id']: round(float(row['balance']), 2) for row in tx.fetch(
+                "SELECT member_id, balance FROM member_balances FOR UPDATE")}
+            report['member_balances'] = [
+                f"member {member_id}: stored {stored.get(member_id)}, expected {expected.get(member_id)}"
+                for member_id in sorted(set(expected) | set(stored))
+                if expected.get(member_id, 0) != stored.get(member_id, 0)
+            ]
+
+            loans = tx.fetch(f"""
+                SELECT l.loan_id, {pending_fine_sql('l')} AS outstanding,
+                       (SELECT COALESCE(SUM(ft.amount), 0) FROM fine_transactions ft
+                        WHERE ft.loan_id = l.loan_id) AS ledger
+                FROM loans l WHERE l.fine_amount > 0 AND l.fine_status <> 'none'
+            """)
+            report['loans'] = [
+                f"loan {row['loan_id']}: outstanding {round(float(row['outstanding']), 2)}, "
+                f"ledger {round(float(row['ledger']), 2)}"
+                for row in loans if round(float(row['outstanding']), 2) != round(float(row['ledger']), 2)
+            ]
+
+            if not verify_only and report['member_balances']:
+                tx.execute("DELETE FROM member_balances")
+                tx.executemany("INSERT INTO member_balances (member_id, balance) VALUES (%s, %s)",
+                               list(expected.items()))
+        return report
 
     @staticmethod
     def get_total_pending_fines():
         """Get sum of all pending fines"""
-        query = "SELECT SUM(fine_amount) AS total FROM loans WHERE fine_status = 'pending'"
+        query = "SELECT pending_fines AS total FROM library_totals WHERE id = 1"
         result = db.execute_query(query, fetch=True)
         return result[0]['total'] if result and result[0]['total'] else 0.0
 
+    @staticmethod
+    def query_fines(status=None, search=None, limit=200, after_key=None):
+        """One page of fines with their book title and member name.
+
+        ``status`` is 'pending', 'paid' or 'waived' (None or 'all' for any) and
+        ``search`` narrows to a loan ID or a title/member name match. Pages
+        follow the (fine_status, due_date) index; ``after_key`` is the
+        page_key of the last fine on the previous page.
+        """
+        query = f"""
+            SELECT l.loan_id, l.book_id, l.member_id, l.due_date, l.return_date,
+                   l.fine_amount, l.fine_status, {pending_fine_sql('l')} AS outstanding,
+                   b.title AS book_title,
+                   CONCAT(m.first_name, ' ', m.last_name) AS member_name
+            FROM loans l
+            JOIN books b ON l.book_id = b.book_id
+            JOIN members m ON l.member_id = m.member_id
+            WHERE l.fine_amount > 0
+        """
+        status = (status or 'all').lower()
+        if status == 'all':
+            query += " AND l.fine_status IN ('paid', 'pending', 'waived')"
+            params = ()
+        else:
+            query += " AND l.fine_status = %s"
+            params = (status,)
+        if search:
+            pattern = f"%{search}%"
+            query += """ AND (b.title LIKE %s OR CONCAT(m.first_name, ' ', m.last_name) LIKE %s
+                              OR l.loan_id = %s)"""
+            params += (pattern, pattern, search)
+        if after_key is not None:
+            fine_status, due_date, loan_id = after_key
+            query += """ AND (l.fine_status > %s OR (l.fine_status = %s AND
+                              (l.due_date > %s OR (l.due_date = %s AND l.loan_id > %s))))"""
+            params += (fine_status, fine_status, due_date, due_date, loan_id)
+        query += " ORDER BY l.fine_status, l.due_date, l.loan_id LIMIT %s"
+
+        results = db.execute_query(query, params + (limit,), fetch=True)
+        return results if results else []
+
+    @staticmethod
+    def page_key(fine):
+        """Keyset position of a fine row for query_fines(after_key=...)"""
+        return (fine['fine_status'], fine['due_date'], fine['loan_id'])
+
     @staticmethod
     def get_member_fines(member_id):
         """Get all fines for a specific member"""
@@ -0,0 +1,324 @@
+# app/services/import_service.py
+"""Bulk catalogue import from vendor CSV, MARC21 and MARCXML files.
+
+Records are read lazily, one at a time, so a file of any size is imported in
+constant memory. Every ``chunk_size`` records are validated together and
+upserted with one executemany in one transaction: a new ISBN becomes a book
+and a known ISBN gains the imported copies. A record that fails validation
+or the database is reported with its position and does not stop the import.
+"""
+import csv
+import os
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from contextlib import nullcontext
+
+from app.database.db_handler import db
+from app.services.book_service import ISBN_PATTERN
+from app.services.catalogue_cache import catalogue
+from app.services.change_feed import ChangeFeed
+from app.services.report_service import ReportService
+
+# Longest value each books column takes
+MAX_LENGTHS = {'isbn': 20, 'title': 255, 'author': 255, 'publisher': 255, 'category': 100, 'shelf_location': 50}
+
+# CSV headers accepted for each books column (compared lower-cased, spaces as underscores)
+CSV_COLUMNS = {
+    'isbn': ('isbn', 'isbn13', 'isbn_13', 'isbn10', 'isbn_10'),
+    'title': ('title',),
+    'author': ('author', 'authors'),
+    'publisher': ('publisher',),
+    'publication_year': ('publication_year', 'year', 'pub_year'),
+    'category': ('category', 'subject', 'genre'),
+    'total_copies': ('total_copies', 'copies', 'quantity', 'qty'),
+    'shelf_location': ('shelf_location', 'shelf', 'location', 'call_number'),
+}
+
+MARC_RECORD_END = b'\x1d'
+MARC_FIELD_END = '\x1e'
+MARC_SUBFIELD = '\x1f'
+MARCXML_NS = '{http://www.loc.gov/MARC21/slim}'
+
+UPSERT_QUERY = """
+    INSERT INTO books
+    (isbn, title, author, publisher, publication_year, category,
+    total_copies, available_copies, shelf_location, added_by)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE total_copies = total_copies + VALUES(total_copies),
+                            available_copies = available_copies + VALUES(available_copies)
+"""
+
+
+def _opened(source, mode):
+    """``source`` as an open file: paths are opened (and closed), file objects passed through"""
+    if hasattr(source, 'read'):
+        return nullcontext(source)
+    if 'b' in mode:
+        return open(source, mode)
+    return open(source, mode, newline='', encoding='utf-8-sig')
+
+
+# --- Readers: yield (position, record) with record a dict or the parse error --
+
+def read_csv(source):
+    """Rows of a CSV file with a header line; position is the line number"""
+    with _opened(source, 'r') as f:
+        reader = csv.DictReader(f)
+        headers = {(header or '').strip().lower().replace(' ', '_'): header for header in reader.fieldnames or ()}
+        columns = {}
+        for column, aliases in CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in headers:
+                    columns[column] = headers[alias]
+                    break
+        for row in reader:
+            yield reader.line_num, {column: row.get(header) for column, header in columns.items()}
+
+
+def _marc_book(fields):
+    """Books columns from {tag: [subfields, ...]}, each subfields a list of (code, value)"""
+    def first(tags, code):
+        for tag in tags:
+            for subfields in fields.get(tag, ()):
+                for subfield_code, value in subfields:
+                    if subfield_code == code and value.strip():
+                        return value.strip()
+        return None
+
+    def trim(value, punctuation=' /:;,.'):
+        # ISBD punctuation separating the parts of a MARC field
+        return value.rstrip(punctuation) if value else value
+
+    isbn = first(('020',), 'a')
+    title = trim(first(('245',), 'a'))
+    subtitle = trim(first(('245',), 'b'))
+    year = first(('264', '260'), 'c')
+    holdings = fields.get('852', ())
+    return {
+        'isbn': isbn.split()[0] if isbn else None,  # "0131103628 (pbk.)"
+        'title': f"{title}: {subtitle}" if title and subtitle else title,
+        'author': trim(first(('100', '110', '700'), 'a')),
+        'publisher': trim(first(('264', '260'), 'b')),
+        'publication_year': ''.join(c for c in year if c.isdigit())[:4] if year else None,
+        'category': trim(first(('650',), 'a')),
+        'total_copies': len(holdings) or 1,  # one 852 holdings field per copy
+        'shelf_location': first(('852',), 'h'),
+    }
+
+
+def _marc21_fields(data):
+    """{tag: [subfields]} from one ISO 2709 record"""
+    leader = data[:24].decode('ascii')
+    base = int(leader[12:17])
+    # Leader/09 'a' is Unicode; MARC-8 records are read as Latin-1, exact for their ASCII text
+    encoding = 'utf-8' if leader[9] == 'a' else 'latin-1'
+    directory = data[24:base - 1]
+    if len(directory) % 12:
+        raise ValueError("malformed MARC directory")
+
+    fields = defaultdict(list)
+    for n in range(0, len(directory), 12):
+        entry = directory[n:n + 12].decode('ascii')
+        tag, length, start = entry[:3], int(entry[3:7]), int(entry[7:12])
+        value = data[base + start:base + start + length].decode(encoding, errors='replace').rstrip(MARC_FIELD_END)
+        if tag < '010':
+            continue  # control fields carry no bibliographic columns we import
+        # Skip the two indicators; each subfield starts with its code
+        fields[tag].append([(part[0], part[1:]) for part in value[2:].split(MARC_SUBFIELD) if part])
+    return fields
+
+
+def read_marc21(source):
+    """Records of a binary MARC21 (ISO 2709) file; position is the record number"""
+    with _opened(source, 'rb') as f:
+        position = 0
+        while True:
+            length = f.read(5)
+            if not length.strip():
+                return
+            position += 1
+            if not length.isdigit():
+                # Without a record length the rest of the file cannot be framed
+                yield position, ValueError(f"bad record length {length!r}; stopped reading")
+                return
+            data = length + f.read(int(length) - 5)
+            try:
+                if not data.endswith(MARC_RECORD_END):
+                    raise ValueError("record does not end where its leader says")
+                yield position, _marc_book(_marc21_fields(data))
+            except (ValueError, UnicodeDecodeError) as e:
+                yield position, e
+
+
+def read_marcxml(source):
+    """Records of a MARCXML collection; position is the record number"""
+    position = 0
+    with _opened(source, 'rb') as f:
+        for event, element in ET.iterparse(f, events=('end',)):
+            if element.tag not in (MARCXML_NS + 'record', 'record'):
+                continue
+            position += 1
+            fields = defaultdict(list)
+            for datafield in element:
+                if datafield.tag.endswith('datafield'):
+                    fields[datafield.get('tag')].append(
+                        [(subfield.get('code'), subfield.text or '') for subfield in datafield])
+            yield position, _marc_book(fields)
+            element.clear()  # keep memory flat on large files
+
+
+READERS = {'csv': read_csv, 'marc': read_marc21, 'marcxml': read_marcxml}
+EXTENSIONS = {'.csv': 'csv', '.mrc': 'marc', '.marc': 'marc', '.xml': 'marcxml', '.marcxml': 'marcxml'}
+
+
+def detect_format(path):
+    """Import format from a file name, e.g. 'marc' for acquisitions.mrc"""
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Unknown import format for {path}; expected one of {', '.join(sorted(EXTENSIONS))}")
+    return EXTENSIONS[extension]
+
+
+class ImportService:
+    @staticmethod
+    def validate(record):
+        """A record as books column values, or ValueError saying what is wrong with it"""
+        if isinstance(record, Exception):
+            raise ValueError(str(record))
+        book = {column: (str(value).strip() if value is not None else '') for column, value in record.items()}
+        for column in ('isbn', 'title', 'author'):
+            if not book.get(column):
+                raise ValueError(f"{column.replace('_', ' ').title()} is required.")
+        for column, length in MAX_LENGTHS.items():
+            if len(book.get(column) or '') > length:
+                raise ValueError(f"{column.replace('_', ' ').title()} is longer than {length} characters.")
+        if not ISBN_PATTERN.match(book['isbn']):
+            raise ValueError(f"Invalid ISBN '{book['isbn']}'.")
+
+        try:
+            copies = int(book.get('total_copies') or 1)
+        except ValueError:
+            raise ValueError("Copies must be a valid number.")
+        if copies < 1:
+            raise ValueError("Copies must be at least 1.")
+        try:
+            year = int(book['publication_year']) if book.get('publication_year') else None
+        except ValueError:
+            raise ValueError("Publication year must be a valid number.")
+
+        return {
+            'isbn': book['isbn'], 'title': book['title'], 'author': book['author'],
+            'publisher': book.get('publisher') or None, 'publication_year': year,
+            'category': book.get('category') or None, 'total_copies': copies,
+            'shelf_location': book.get('shelf_location') or None,
+        }
+
+    @staticmethod
+    def _write_chunk(books, added_by):
+        """Upsert validated books (one per ISBN) in one transaction; returns (added, merged)"""
+        isbns = tuple(books)
+        placeholders = ", ".join(["%s"] * len(isbns))
+        with db.transaction() as tx:
+            existing = {row['isbn']: row['category'] for row in tx.fetch(
+                f"SELECT isbn, category FROM books WHERE isbn IN ({placeholders}) FOR UPDATE", isbns)}
+            tx.executemany(UPSERT_QUERY, [
+                (book['isbn'], book['title'], book['author'], book['publisher'], book['publication_year'],
+                 book['category'], book['total_copies'], book['total_copies'], book['shelf_location'], added_by)
+                for book in books.values()
+            ])
+
+            # A merged ISBN keeps its own category; the imported one only applies to new books
+            summary = defaultdict(lambda: defaultdict(int))
+            for isbn, book in books.items():
+                if isbn in existing:
+                    summary[existing[isbn] or '']['copies'] += book['total_copies']
+                else:
+                    summary[book['category'] or '']['titles'] += 1
+                    summary[book['category'] or '']['copies'] += book['total_copies']
+            ReportService.adjust_category_summary(tx, summary)
+
+            for action, chunk_isbns in (('insert', [isbn for isbn in isbns if isbn not in existing]),
+                                        ('update', [isbn for isbn in isbns if isbn in existing])):
+                if chunk_isbns:
+                    ChangeFeed.record_select(
+                        tx, 'book',
+                        f"SELECT book_id AS id FROM books WHERE isbn IN ({', '.join(['%s'] * len(chunk_isbns))})",
+                        chunk_isbns, action)
+        return len(isbns) - len(existing), len(existing)
+
+    @staticmethod
+    def import_books(source, fmt=None, added_by=None, chunk_size=2000, progress=None, max_errors=1000):
+        """Import every record of ``source`` (a path or an open file).
+
+        ``fmt`` is 'csv', 'marc' or 'marcxml' (default: from the file name).
+        ``progress(result)`` is called after each chunk. Returns {'read',
+        'added', 'merged', 'copies', 'failed', 'errors': [(position,
+        message)], 'seconds', 'rows_per_second'}; only the first
+        ``max_errors`` errors are listed, 'failed' counts them all.
+        """
+        reader = READERS[fmt or detect_format(source)]
+        result = {'read': 0, 'added': 0, 'merged': 0, 'copies': 0, 'failed': 0, 'errors': [],
+                  'seconds': 0.0, 'rows_per_second': 0.0}
+        started = time.perf_counter()
+
+        def fail(position, message):
+            result['failed'] += 1
+            if len(result['errors']) < max_errors:
+                result['errors'].append((position, message))
+
+        def flush(chunk):
+            books, positions = {}, {}
+            for position, record in chunk:
+                try:
+                    book = ImportService.validate(record)
+                except ValueError as e:
+                    fail(position, str(e))
+                    continue
+                # The same ISBN twice in a file adds up its copies
+                if book['isbn'] in books:
+                    books[book['isbn']]['total_copies'] += book['total_copies']
+                else:
+                    books[book['isbn']] = book
+                positions.setdefault(book['isbn'], []).append(position)
+
+            if books:
+                try:
+                    written = [ImportService._write_chunk(books, added_by)]
+                except Exception:
+                    # Find the records the database refuses by writing them one at a time
+                    written = []
+                    for isbn, book in books.items():
+                        try:
+                            written.append(ImportService._write_chunk({isbn: book}, added_by))
+                        except Exception as e:
+                            for position in positions[isbn]:
+                                fail(position, f"Database error: {e}")
+                            book['total_copies'] = 0
+                for added, merged in written:
+                    result['added'] += added
+                    result['merged'] += merged
+                result['copies'] += sum(book['total_copies'] for book in books.values())
+
+            result['seconds'] = round(time.perf_counter() - started, 3)
+            result['rows_per_second'] = round(result['read'] / result['seconds'], 1) if result['seconds'] else 0.0
+            if progress:
+                progress(result)
+
+        chunk = []
+        try:
+            for position, record in reader(source):
+                result['read'] += 1
+                chunk.append((position, record))
+                if len(chunk) >= chunk_size:
+                    flush(chunk)
+                    chunk = []
+        except (OSError, ET.ParseError, csv.Error) as e:
+            print(f"Error reading import file: {e}")
+            fail(result['read'] + 1, f"Unreadable file: {e}")
+        flush(chunk)
+
+        # Imported books can land anywhere in the catalogue; reload it rather than patch thousands of rows
+        if result['added'] or result['merged']:
+            catalogue.invalidate()
+        return result
@@ -1,19 +1,32 @@
 from app.database.db_handler import db
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from app.database.db_handler import db
 from app.models.loan import Loan
+from app.services.catalogue_cache import catalogue
+from app.services.change_feed import ChangeFeed
+from app.services.fine_service import FineService
+from app.services.report_service import ReportService
+
+# Category and member type of the loan being updated, for policies with per-type rates
+FINE_CONTEXT_SQL = (
+    'due_date',
+    '(SELECT category FROM books WHERE books.book_id = loans.book_id)',
+    '(SELECT membership_type FROM members WHERE members.member_id = loans.member_id)',
+)
 
 
 class LoanService:
     # Update loan_service.py's issue_loan method
     @staticmethod
     def issue_loan(book_id, member_id, issued_by):
-        # Check if book is available
-        book_query = "SELECT available_copies FROM books WHERE book_id = %s"
-        book_result = db.execute_query(book_query, (book_id,), fetch=True)
-
-        if not book_result or book_result[0]['available_copies'] <= 0:
-            return False
+        # Claim a copy: the WHERE clause makes check-and-decrement a single atomic
+        # statement, so two desks can never both lend the last copy
+        claim_copy_query = """
+            UPDATE books SET available_copies = available_copies - 1
+            WHERE book_id = %s AND available_copies > 0
+        """
 
         # Create new loan
         loan_query = """
@@ -32,33 +45,102 @@ class LoanService:
             issued_by
         )
 
-        # Update book inventory
-        update_book_query = "UPDATE books SET available_copies = available_copies - 1 WHERE book_id = %s"
-
         try:
-            # Start transaction
-            db.execute_query("START TRANSACTION")
-
-            # Create loan
-            db.execute_query(loan_query, loan_values)
+            with db.transaction() as tx:
+                # No row updated means the book is missing or has no copies left
+                if tx.execute(claim_copy_query, (book_id,), prepared=True) == 0:
+                    return False
 
-            # Update book inventory
-            db.execute_query(update_book_query, (book_id,))
-
-            # Commit transaction
-            db.execute_query("COMMIT")
+                tx.execute(loan_query, loan_values, prepared=True)
+                loan_id = tx.lastrowid
+                ReportService.adjust_books_summary(tx, {book_id: {'on_loan': 1}})
+                ChangeFeed.record(tx, 'book', [book_id])
+                ChangeFeed.record(tx, 'loan', [loan_id], 'insert')
+            catalogue.adjust_available({book_id: -1})
             return True
         except Exception as e:
-            # Rollback on error
-            db.execute_query("ROLLBACK")
             print(f"Error issuing loan: {e}")
             return False
 
+    @staticmethod
+    def issue_loans(member_id, book_ids, issued_by):
+        """Lend a basket of books to one member in a single transaction.
+
+        Returns {'issued': [book_id, ...], 'failed': {book_id: reason}}.
+        """
+        book_ids = list(dict.fromkeys(book_ids))  # A member borrows one copy of each title
+        result = {'issued': [], 'failed': {}}
+        if not book_ids:
+            return result
+
+        placeholders = ", ".join(["%s"] * len(book_ids))
+
+        # Lock every requested book row up front with a single query
+        stock_query = f"""
+            SELECT book_id, available_copies FROM books
+            WHERE book_id IN ({placeholders})
+            FOR UPDATE
+        """
+        loan_query = """
+            INSERT INTO loans 
+            (book_id, member_id, issue_date, due_date, issued_by)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        issue_date = datetime.now()
+        due_date = issue_date + timedelta(days=14)  # 2 weeks loan period
+
+        try:
+            with db.transaction() as tx:
+                stock = {row['book_id']: row['available_copies']
+                         for row in tx.fetch(stock_query, tuple(book_ids))}
+
+                lendable = []
+                for book_id in book_ids:
+                    if book_id not in stock:
+                        result['failed'][book_id] = "Book not found"
+                    elif stock[book_id] <= 0:
+                        result['failed'][book_id] = "No copies available"
+                    else:
+                        lendable.append(book_id)
+
+                if lendable:
+                    # Ids above this are new; the book locks above keep other desks off these titles
+                    last_loan_id = tx.fetch_one("SELECT COALESCE(MAX(loan_id), 0) AS loan_id FROM loans")['loan_id']
+                    tx.executemany(loan_query, [
+                        (book_id, member_id, issue_date, due_date, issued_by) for book_id in lendable
+                    ])
+
+                    lendable_placeholders = ", ".join(["%s"] * len(lendable))
+                    update_query = f"""
+                        UPDATE books SET available_copies = available_copies - 1
+                        WHERE book_id IN ({lendable_placeholders}) AND available_copies > 0
+                    """
+                    if tx.execute(update_query, tuple(lendable)) != len(lendable):
+                        # Rows are locked above, so this only happens if that lock was lost
+                        raise RuntimeError("Inventory changed while issuing loans")
+
+                    ReportService.adjust_books_summary(tx, {book_id: {'on_loan': 1} for book_id in lendable})
+                    ChangeFeed.record(tx, 'book', lendable)
+                    ChangeFeed.record_select(tx, 'loan', f"""
+                        SELECT loan_id AS id FROM loans
+                        WHERE loan_id > %s AND member_id = %s AND book_id IN ({lendable_placeholders})
+                    """, (last_loan_id, member_id) + tuple(lendable), 'insert')
+
+                result['issued'] = lendable
+            catalogue.adjust_available({book_id: -1 for book_id in lendable})
+        except Exception as e:
+            print(f"Error issuing loans: {e}")
+            result['issued'] = []
+            result['failed'] = {book_id: "Checkout failed, nothing was lent" for book_id in book_ids}
+
+        return result
+
     @staticmethod
     def get_active_loans(member_id=None):
         query = """
             SELECT l.*, b.title, b.isbn, 
-                   CONCAT(m.first_name, ' ', m.last_name) AS member_name
+                   CONCAT(m.first_name, ' ', m.last_name) AS member_name,
+                   GREATEST(DATEDIFF(CURDATE(), l.due_date), 0) AS days_overdue
             FROM loans l
             JOIN books b ON l.book_id = b.book_id
             JOIN members m ON l.member_id = m.member_id
@@ -73,6 +155,61 @@ class LoanService:
 
         return results if results else []
 
+    @staticmethod
+    def get_active_loans_page(after_key=None, limit=200, search=None):
+        """One page of open loans, soonest due first, starting after ``after_key``.
+
+        ``after_key`` is the (due_date, loan_id) of the last loan on the
+        previous page; the (return_date, due_date) index serves the order.
+        ``search`` narrows to a loan/book/member ID or a title/member name match.
+        """
+        query = """
+            SELECT l.*, b.title, b.isbn, 
+                   CONCAT(m.first_name, ' ', m.last_name) AS member_name,
+                   GREATEST(DATEDIFF(CURDATE(), l.due_date), 0) AS days_overdue
+            FROM loans l
+            JOIN books b ON l.book_id = b.book_id
+            JOIN members m ON l.member_id = m.member_id
+            WHERE l.return_date IS NULL
+        """
+        params = ()
+        if search:
+            pattern = f"%{search}%"
+            query += """ AND (b.title LIKE %s OR CONCAT(m.first_name, ' ', m.last_name) LIKE %s
+                              OR l.loan_id = %s OR l.book_id = %s OR l.member_id = %s)"""
+            params += (pattern, pattern, search, search, search)
+        if after_key is not None:
+            due_date, loan_id = after_key
+            query += " AND (l.due_date > %s OR (l.due_date = %s AND l.loan_id > %s))"
+            params += (due_date, due_date, loan_id)
+        query += " ORDER BY l.due_date, l.loan_id LIMIT %s"
+
+        results = db.execute_query(query, params + (limit,), fetch=True)
+        return results if results else []
+
+    @staticmethod
+    def page_key(loan):
+        """Keyset position of a loan row for get_active_loans_page(after_key=...)"""
+        return (loan['due_date'], loan['loan_id'])
+
+    @staticmethod
+    def get_active_loans_by_ids(loan_ids):
+        """Those of ``loan_ids`` still open, as get_active_loans_page rows"""
+        if not loan_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(loan_ids))
+        query = f"""
+            SELECT l.*, b.title, b.isbn,
+                   CONCAT(m.first_name, ' ', m.last_name) AS member_name,
+                   GREATEST(DATEDIFF(CURDATE(), l.due_date), 0) AS days_overdue
+            FROM loans l
+            JOIN books b ON l.book_id = b.book_id
+            JOIN members m ON l.member_id = m.member_id
+            WHERE l.loan_id IN ({placeholders}) AND l.return_date IS NULL
+        """
+        results = db.execute_query(query, tuple(loan_ids), fetch=True)
+        return results if results else []
+
     @staticmethod
     def get_loan_by_id(loan_id):
         query = """
@@ -83,7 +220,7 @@ class LoanService:
             JOIN members m ON l.member_id = m.member_id
             WHERE l.loan_id = %s
         """
-        result = db.execute_query(query, (loan_id,), fetch=True)
+        result = db.execute_query(query, (loan_id,), fetch=True, prepared=True)
         return result[0] if result else None
 
     @staticmethod
@@ -91,22 +228,13 @@ class LoanService:
         """Process book return and calculate any fines"""
         # Get loan details
         loan_query = """
-                SELECT * FROM loans 
-                WHERE loan_id = %s AND return_date IS NULL
+                SELECT l.*, b.category, m.membership_type
+                FROM loans l
+                JOIN books b ON l.book_id = b.book_id
+                JOIN members m ON l.member_id = m.member_id
+                WHERE l.loan_id = %s AND l.return_date IS NULL
+                FOR UPDATE
             """
-        loan_result = db.execute_query(loan_query, (loan_id,), fetch=True)
-
-        if not loan_result:
-            return False
-
-        loan = loan_result[0]
-        return_date = datetime.now()
-        fine_amount = 0.0
-
-        # Calculate fine if overdue
-        if loan['due_date'] and return_date > loan['due_date']:
-            days_overdue = (return_date - loan['due_date']).days
-            fine_amount = days_overdue * 5.0  # $5 per day
 
         # Update loan record
         update_query = """
@@ -122,26 +250,205 @@ class LoanService:
         book_query = "UPDATE books SET available_copies = available_copies + 1 WHERE book_id = %s"
 
         try:
-            db.execute_query("START TRANSACTION")
-            db.execute_query(update_query, (return_date, fine_amount, fine_amount, loan_id))
-            db.execute_query(book_query, (loan['book_id'],))
-            db.execute_query("COMMIT")
+            with db.transaction() as tx:
+                loan = tx.fetch_one(loan_query, (loan_id,))
+                if not loan:
+                    return False
+
+                return_date = datetime.now()
+                fine_amount = FineService.calculate_fine(loan['due_date'], return_date,
+                                                         loan['category'], loan['membership_type'])
+
+                tx.execute(update_query, (return_date, fine_amount, fine_amount, loan_id))
+                tx.execute(book_query, (loan['book_id'],))
+
+                summary = {'on_loan': -1, 'pending_fines': fine_amount}
+                if loan['loan_status'] == 'overdue':
+                    summary['overdue'] = -1
+                ReportService.adjust_books_summary(tx, {loan['book_id']: summary})
+                FineService.record_assessments(tx, [(loan_id, loan['member_id'], fine_amount)])
+                ChangeFeed.record(tx, 'book', [loan['book_id']])
+                ChangeFeed.record(tx, 'loan', [loan_id])
+            catalogue.adjust_available({loan['book_id']: 1})
             return True
         except Exception as e:
-            db.execute_query("ROLLBACK")
             print(f"Error returning loan: {e}")
             return False
 
+    @staticmethod
+    def return_loans(loan_ids=None, book_ids=None, return_date=None):
+        """Process a batch of returns, e.g. the morning book-drop, in one transaction.
+
+        Pass scanned loan_ids, or book_ids to return the longest-outstanding open
+        loan for each scanned copy. Fines are computed by the database in one
+        set-based UPDATE and inventory is restored with one grouped UPDATE.
+        Returns {'returned': [loan_id, ...], 'not_found': [id, ...],
+        'fines': {loan_id: amount}, 'total_fines': amount}.
+        """
+        scanned = list(loan_ids if loan_ids is not None else book_ids or [])
+        summary = {'returned': [], 'not_found': [], 'fines': {}, 'total_fines': 0.0}
+        if not scanned:
+            return summary
+
+        return_date = return_date or datetime.now().date()
+        by_book = loan_ids is None
+        placeholders = ", ".join(["%s"] * len(set(scanned)))
+
+        if by_book:
+            open_loans_query = f"""
+                SELECT loan_id, book_id, loan_status FROM loans
+                WHERE book_id IN ({placeholders}) AND return_date IS NULL
+                ORDER BY due_date, loan_id
+                FOR UPDATE
+            """
+        else:
+            open_loans_query = f"""
+                SELECT loan_id, book_id, loan_status FROM loans
+                WHERE loan_id IN ({placeholders}) AND return_date IS NULL
+                FOR UPDATE
+            """
+
+        try:
+            with db.transaction() as tx:
+                open_loans = tx.fetch(open_loans_query, tuple(set(scanned)))
+
+                if by_book:
+                    # Each scan of a book returns its next outstanding loan
+                    wanted = Counter(scanned)
+                    returning = []
+                    for loan in open_loans:
+                        if wanted[loan['book_id']] > 0:
+                            wanted[loan['book_id']] -= 1
+                            returning.append(loan)
+                    summary['not_found'] = [book_id for book_id, left in wanted.items() for _ in range(left)]
+                else:
+                    returning = open_loans
+                    found = {loan['loan_id'] for loan in open_loans}
+                    summary['not_found'] = [loan_id for loan_id in dict.fromkeys(scanned) if loan_id not in found]
+
+                if not returning:
+                    return summary
+
+                returned_ids = tuple(loan['loan_id'] for loan in returning)
+                loan_placeholders = ", ".join(["%s"] * len(returned_ids))
+
+                # Fines for the whole batch in one statement, under the current fine policy
+                fine_sql, fine_params = FineService.fine_sql(return_date, *FINE_CONTEXT_SQL)
+                tx.execute(f"""
+                    UPDATE loans SET
+                    return_date = %s,
+                    loan_status = 'returned',
+                    fine_amount = {fine_sql},
+                    fine_status = CASE WHEN {fine_sql} > 0 THEN 'pending' ELSE 'none' END
+                    WHERE loan_id IN ({loan_placeholders})
+                """, (return_date,) + fine_params + fine_params + returned_ids)
+
+                # Put the copies back on the shelf, one grouped statement for all titles
+                copies = Counter(loan['book_id'] for loan in returning)
+                cases = " ".join(["WHEN %s THEN %s"] * len(copies))
+                book_placeholders = ", ".join(["%s"] * len(copies))
+                case_params = tuple(value for item in copies.items() for value in item)
+                tx.execute(f"""
+                    UPDATE books SET available_copies = available_copies + CASE book_id {cases} END
+                    WHERE book_id IN ({book_placeholders})
+                """, case_params + tuple(copies))
+
+                fined = tx.fetch(f"""
+                    SELECT loan_id, book_id, member_id, fine_amount FROM loans
+                    WHERE loan_id IN ({loan_placeholders}) AND fine_amount > 0
+                """, returned_ids)
+
+                changes = {book_id: {'on_loan': -count} for book_id, count in copies.items()}
+                for loan in returning:
+                    if loan['loan_status'] == 'overdue':
+                        changes[loan['book_id']]['overdue'] = changes[loan['book_id']].get('overdue', 0) - 1
+                for row in fined:
+                    book_change = changes[row['book_id']]
+                    book_change['pending_fines'] = book_change.get('pending_fines', 0) + float(row['fine_amount'])
+                ReportService.adjust_books_summary(tx, changes)
+                FineService.record_assessments(
+                    tx, [(row['loan_id'], row['member_id'], row['fine_amount']) for row in fined])
+                ChangeFeed.record(tx, 'book', copies)
+                ChangeFeed.record(tx, 'loan', returned_ids)
+
+            catalogue.adjust_available(copies)
+            summary['returned'] = list(returned_ids)
+            summary['fines'] = {row['loan_id']: float(row['fine_amount']) for row in fined}
+            summary['total_fines'] = sum(summary['fines'].values())
+        except Exception as e:
+            print(f"Error returning loans: {e}")
+            summary['returned'] = []
+            summary['fines'] = {}
+            summary['total_fines'] = 0.0
+            summary['not_found'] = []
+            summary['error'] = str(e)
+        return summary
+
+    @staticmethod
+    def sweep_overdue(as_of=None):
+        """Mark open loans past due as 'overdue' and accrue their fines to date.
+
+        One set-based UPDATE sets loan_status and fine_amount (the fine policy
+        applied as if returned on ``as_of``) for every open loan due before ``as_of``
+        (default today). Re-running for the same day changes nothing, so the
+        sweep is safe to schedule as often as needed. Accrued fines stay
+        fine_status 'none' until the book is returned and the fine assessed.
+        Returns {'marked_overdue': n, 'accrued': n, 'elapsed': seconds}, plus
+        'error' if the sweep was rolled back.
+        """
+        as_of = as_of or datetime.now().date()
+        started = time.perf_counter()
+
+        # Loans becoming overdue on this run, per book, for the category summary
+        newly_overdue_query = """
+            SELECT book_id, COUNT(*) AS loans FROM loans
+            WHERE return_date IS NULL AND due_date < %s AND loan_status <> 'overdue'
+            GROUP BY book_id
+            FOR UPDATE
+        """
+        fine_sql, fine_params = FineService.fine_sql(as_of, *FINE_CONTEXT_SQL)
+        sweep_query = f"""
+            UPDATE loans SET
+            loan_status = 'overdue',
+            fine_amount = {fine_sql}
+            WHERE return_date IS NULL AND due_date < %s
+            AND (loan_status <> 'overdue' OR fine_amount <> {fine_sql})
+        """
+
+        result = {'marked_overdue': 0, 'accrued': 0}
+        try:
+            with db.transaction() as tx:
+                newly_overdue = tx.fetch(newly_overdue_query, (as_of,))
+                ChangeFeed.record_select(tx, 'loan', f"""
+                    SELECT loan_id AS id FROM loans
+                    WHERE return_date IS NULL AND due_date < %s
+                    AND (loan_status <> 'overdue' OR fine_amount <> {fine_sql})
+                """, (as_of,) + fine_params)
+                accrued = tx.execute(sweep_query, fine_params + (as_of,) + fine_params)
+                ReportService.adjust_books_summary(
+                    tx, {row['book_id']: {'overdue': row['loans']} for row in newly_overdue})
+            result['marked_overdue'] = sum(row['loans'] for row in newly_overdue)
+            result['accrued'] = accrued
+        except Exception as e:
+            print(f"Error sweeping overdue loans: {e}")
+            result['error'] = str(e)
+
+        result['elapsed'] = time.perf_counter() - started
+        if 'error' not in result:
+            print(f"Overdue sweep as of {as_of}: {result['marked_overdue']} loan(s) newly overdue, "
+                  f"{result['accrued']} row(s) updated in {result['elapsed'] * 1000:.0f} ms")
+        return result
+
     @staticmethod
     def get_loans_with_fines():
-        """Get all loans with fines (pending or paid)"""
+        """Get all loans with fines (pending, paid or waived)"""
         query = """
                 SELECT l.*, b.title, 
                        CONCAT(m.first_name, ' ', m.last_name) AS member_name
                 FROM loans l
                 JOIN books b ON l.book_id = b.book_id
                 JOIN members m ON l.member_id = m.member_id
-                WHERE l.fine_amount > 0
+                WHERE l.fine_status IN ('pending', 'paid', 'waived') AND l.fine_amount > 0
                 ORDER BY l.fine_status, l.due_date
             """
         results = db.execute_query(query, fetch=True)
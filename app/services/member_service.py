@@ -1,13 +1,15 @@
 from app.database.db_handler import db
+from app.models.mapper import model_rows
 from app.models.member import Member
+from app.services.change_feed import ChangeFeed
 
 class MemberService:
     @staticmethod
     def register_member(member_data):
         query = """
             INSERT INTO members 
-            (first_name, last_name, cnic, email, phone, address, city, registered_by)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            (first_name, last_name, cnic, email, phone, address, city, registered_by, membership_type)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         values = (
             member_data['first_name'],
@@ -17,31 +19,90 @@ class MemberService:
             member_data['phone'],
             member_data['address'],
             member_data['city'],
-            member_data['registered_by']
+            member_data['registered_by'],
+            member_data.get('membership_type') or 'standard'
         )
-        return db.execute_query(query, values)
+        try:
+            with db.transaction() as tx:
+                tx.execute(query, values)
+                ChangeFeed.record(tx, 'member', [tx.lastrowid], 'insert')
+            return True
+        except Exception as e:
+            print(f"Error registering member: {e}")
+            return False
 
     @staticmethod
     def get_all_members():
         query = "SELECT * FROM members ORDER BY last_name, first_name"
-        results = db.execute_query(query, fetch=True)
+        # Members are built straight from row tuples; no dict per member
+        try:
+            return [member for members in db.stream(query, batch_size=5000, row_factory=model_rows(Member))
+                    for member in members]
+        except Exception as e:
+            print(f"Error fetching members: {e}")
+            return []
+
+    @staticmethod
+    def get_members_page(after_key=None, limit=200, status=None):
+        """One page of members in name order, starting after ``after_key``.
+
+        ``after_key`` is the (last_name, first_name, member_id) of the last
+        member on the previous page, see ``page_key``.
+        """
+        conditions = []
+        params = []
+        if after_key is not None:
+            last_name, first_name, member_id = after_key
+            conditions.append("""(last_name > %s
+                OR (last_name = %s AND first_name > %s)
+                OR (last_name = %s AND first_name = %s AND member_id > %s))""")
+            params += [last_name, last_name, first_name, last_name, first_name, member_id]
+        if status:
+            conditions.append("membership_status = %s")
+            params.append(status)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = f"SELECT * FROM members{where} ORDER BY last_name, first_name, member_id LIMIT %s"
+        results = db.execute_query(query, tuple(params) + (limit,), fetch=True)
+        return [Member(**row) for row in results] if results else []
+
+    @staticmethod
+    def page_key(member):
+        """Keyset position of a member for get_members_page(after_key=...)"""
+        return (member.last_name, member.first_name, member.member_id)
+
+    @staticmethod
+    def get_members_by_ids(member_ids):
+        """Current rows for the given members, e.g. to patch a list after a change"""
+        if not member_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(member_ids))
+        query = f"SELECT * FROM members WHERE member_id IN ({placeholders})"
+        results = db.execute_query(query, tuple(member_ids), fetch=True)
         return [Member(**row) for row in results] if results else []
 
     @staticmethod
     def get_member_by_id(member_id):
         query = "SELECT * FROM members WHERE member_id = %s"
-        result = db.execute_query(query, (member_id,), fetch=True)
+        result = db.execute_query(query, (member_id,), fetch=True, prepared=True)
         return Member(**result[0]) if result else None
 
     @staticmethod
-    def search_members(search_term):
+    def search_members(search_term, limit=None, offset=0, status=None):
         query = """
             SELECT * FROM members 
-            WHERE first_name LIKE %s OR last_name LIKE %s OR cnic LIKE %s OR email LIKE %s
-            ORDER BY last_name, first_name
+            WHERE (first_name LIKE %s OR last_name LIKE %s OR cnic LIKE %s OR email LIKE %s)
         """
         search_pattern = f"%{search_term}%"
-        results = db.execute_query(query, (search_pattern, search_pattern, search_pattern, search_pattern), fetch=True)
+        params = (search_pattern, search_pattern, search_pattern, search_pattern)
+        if status:
+            query += " AND membership_status = %s"
+            params += (status,)
+        query += " ORDER BY last_name, first_name, member_id"
+        if limit is not None:
+            query += " LIMIT %s OFFSET %s"
+            params += (limit, offset)
+        results = db.execute_query(query, params, fetch=True)
         return [Member(**row) for row in results] if results else []
 
     @staticmethod
@@ -55,7 +116,8 @@ class MemberService:
             phone = %s,
             address = %s,
             city = %s,
-            membership_status = %s
+            membership_status = %s,
+            membership_type = %s
             WHERE member_id = %s
         """
         values = (
@@ -67,11 +129,28 @@ class MemberService:
             member_data['address'],
             member_data['city'],
             member_data.get('membership_status', 'active'),
+            member_data.get('membership_type') or 'standard',
             member_id
         )
-        return db.execute_query(query, values)
+        try:
+            with db.transaction() as tx:
+                if not tx.execute(query, values):
+                    return False
+                ChangeFeed.record(tx, 'member', [member_id])
+            return True
+        except Exception as e:
+            print(f"Error updating member: {e}")
+            return False
 
     @staticmethod
     def delete_member(member_id):
         query = "DELETE FROM members WHERE member_id = %s"
-        return db.execute_query(query, (member_id,))
\ No newline at end of file
+        try:
+            with db.transaction() as tx:
+                if not tx.execute(query, (member_id,)):
+                    return False
+                ChangeFeed.record(tx, 'member', [member_id], 'delete')
+            return True
+        except Exception as e:
+            print(f"Error deleting member: {e}")
+            return False
\ No newline at end of file
@@ -1,17 +1,371 @@
+import os
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
 from app.database.db_handler import db
+from app.services.catalogue_cache import catalogue
+from app.services.export_writers import WRITERS, detect_format
+
+SUMMARY_COLUMNS = ('titles', 'copies', 'on_loan', 'overdue', 'pending_fines')
+DAILY_COLUMNS = ('issued', 'returned', 'fines_assessed')
+TOTALS_COLUMNS = ('pending_fines',)
+
+
+def pending_fine_sql(loans='loans'):
+    """SQL for what is still owed on a loan: its assessed fine less payments and waivers in the ledger"""
+    return f"""CASE WHEN {loans}.fine_status = 'pending' THEN {loans}.fine_amount + COALESCE(
+        (SELECT SUM(ft.amount) FROM fine_transactions ft
+         WHERE ft.loan_id = {loans}.loan_id AND ft.txn_type <> 'assess'), 0) ELSE 0 END"""
+
+
+# What category_summary should hold, computed from books and loans
+CATEGORY_SUMMARY_QUERY = f"""
+    SELECT COALESCE(b.category, '') AS category, COUNT(*) AS titles, SUM(b.total_copies) AS copies,
+           COALESCE(SUM(l.on_loan), 0) AS on_loan, COALESCE(SUM(l.overdue), 0) AS overdue,
+           COALESCE(SUM(l.pending_fines), 0) AS pending_fines
+    FROM books b
+    LEFT JOIN (
+        SELECT book_id,
+               SUM(CASE WHEN return_date IS NULL THEN 1 ELSE 0 END) AS on_loan,
+               SUM(CASE WHEN return_date IS NULL AND loan_status = 'overdue' THEN 1 ELSE 0 END) AS overdue,
+               SUM({pending_fine_sql()}) AS pending_fines
+        FROM loans
+        GROUP BY book_id
+    ) l ON l.book_id = b.book_id
+    GROUP BY COALESCE(b.category, '')
+"""
+
+# What library_totals should hold: the pending fines over all loans
+LIBRARY_TOTALS_QUERY = f"""
+    SELECT 1 AS id, COALESCE(SUM({pending_fine_sql()}), 0) AS pending_fines FROM loans
+"""
+
+# What daily_circulation should hold, computed from loans
+DAILY_CIRCULATION_QUERY = """
+    SELECT day, SUM(issued) AS issued, SUM(returned) AS returned, SUM(fines) AS fines_assessed
+    FROM (
+        SELECT DATE(issue_date) AS day, 1 AS issued, 0 AS returned, 0 AS fines
+        FROM loans WHERE issue_date IS NOT NULL
+        UNION ALL
+        SELECT DATE(return_date), 0, 1, fine_amount
+        FROM loans WHERE return_date IS NOT NULL
+    ) events
+    GROUP BY day
+"""
+
+# The same, for the days from the given date on; served by the issue_date and return_date indexes
+RECENT_CIRCULATION_QUERY = """
+    SELECT day, SUM(issued) AS issued, SUM(returned) AS returned, SUM(fines) AS fines_assessed
+    FROM (
+        SELECT DATE(issue_date) AS day, 1 AS issued, 0 AS returned, 0 AS fines
+        FROM loans WHERE issue_date >= %s
+        UNION ALL
+        SELECT DATE(return_date), 0, 1, fine_amount
+        FROM loans WHERE return_date >= %s
+    ) events
+    GROUP BY day
+"""
+
+
+MEMBER_NAME_SQL = "CONCAT(m.first_name, ' ', m.last_name)"
+
+# Exportable reports: name -> (sheet title, query, [(column, type)]); the query selects exactly those columns
+EXPORT_REPORTS = {
+    'catalogue': ("Catalogue", """
+        SELECT b.book_id, b.isbn, b.title, b.author, b.publisher, b.publication_year, b.category,
+               b.total_copies, b.available_copies, b.shelf_location, u.full_name AS added_by, b.added_on
+        FROM books b
+        LEFT JOIN users u ON u.user_id = b.added_by
+        ORDER BY b.book_id
+    """, [('book_id', 'int'), ('isbn', 'str'), ('title', 'str'), ('author', 'str'), ('publisher', 'str'),
+          ('publication_year', 'int'), ('category', 'str'), ('total_copies', 'int'),
+          ('available_copies', 'int'), ('shelf_location', 'str'), ('added_by', 'str'), ('added_on', 'datetime')]),
+    'active_loans': ("Active Loans", f"""
+        SELECT l.loan_id, l.book_id, b.isbn, b.title, l.member_id, {MEMBER_NAME_SQL} AS member_name,
+               l.issue_date, l.due_date, l.loan_status, l.fine_amount
+        FROM loans l
+        JOIN books b ON l.book_id = b.book_id
+        JOIN members m ON l.member_id = m.member_id
+        WHERE l.return_date IS NULL
+        ORDER BY l.due_date, l.loan_id
+    """, [('loan_id', 'int'), ('book_id', 'int'), ('isbn', 'str'), ('title', 'str'), ('member_id', 'int'),
+          ('member_name', 'str'), ('issue_date', 'datetime'), ('due_date', 'date'), ('loan_status', 'str'),
+          ('fine_amount', 'float')]),
+    'fine_history': ("Fine History", f"""
+        SELECT ft.txn_id, ft.created_at, ft.loan_id, ft.member_id, {MEMBER_NAME_SQL} AS member_name,
+               b.title, ft.txn_type, ft.amount, u.full_name AS recorded_by
+        FROM fine_transactions ft
+        JOIN loans l ON ft.loan_id = l.loan_id
+        JOIN books b ON l.book_id = b.book_id
+        JOIN members m ON ft.member_id = m.member_id
+        LEFT JOIN users u ON u.user_id = ft.recorded_by
+        ORDER BY ft.txn_id
+    """, [('txn_id', 'int'), ('created_at', 'datetime'), ('loan_id', 'int'), ('member_id', 'int'),
+          ('member_name', 'str'), ('title', 'str'), ('txn_type', 'str'), ('amount', 'float'),
+          ('recorded_by', 'str')]),
+    'member_history': ("Member History", f"""
+        SELECT l.member_id, {MEMBER_NAME_SQL} AS member_name, l.loan_id, b.isbn, b.title,
+               l.issue_date, l.due_date, l.return_date, l.loan_status, l.fine_amount, l.fine_status
+        FROM loans l
+        JOIN members m ON l.member_id = m.member_id
+        JOIN books b ON l.book_id = b.book_id
+        ORDER BY l.member_id, l.issue_date, l.loan_id
+    """, [('member_id', 'int'), ('member_name', 'str'), ('loan_id', 'int'), ('isbn', 'str'), ('title', 'str'),
+          ('issue_date', 'datetime'), ('due_date', 'date'), ('return_date', 'date'), ('loan_status', 'str'),
+          ('fine_amount', 'float'), ('fine_status', 'str')]),
+}
+
+
+def _day(value):
+    return str(value)[:10]
+
+
+def _summary_row(row, columns):
+    return tuple(round(float(row[column] or 0), 2) for column in columns)
+
 
 class ReportService:
     @staticmethod
     def get_all_books():
-        query = "SELECT * FROM books ORDER BY title"
-        return db.execute_query(query, fetch=True)
+        return catalogue.books()
 
     @staticmethod
     def get_books_by_category(category):
-        query = "SELECT * FROM books WHERE category = %s"
-        return db.execute_query(query, (category,), fetch=True)
+        return catalogue.books(category=category)
 
     @staticmethod
     def get_available_books():
-        query = "SELECT * FROM books WHERE available_copies > 0"
-        return db.execute_query(query, fetch=True)
\ No newline at end of file
+        return catalogue.books(available_only=True)
+
+    @staticmethod
+    def get_inventory_summary():
+        """Headline stock figures computed in one aggregate query"""
+        query = """
+            SELECT COUNT(*) AS total_unique_books,
+                   COALESCE(SUM(total_copies), 0) AS total_copies_all,
+                   COALESCE(SUM(available_copies), 0) AS total_available_copies,
+                   COUNT(DISTINCT NULLIF(author, '')) AS total_authors,
+                   COUNT(DISTINCT NULLIF(category, '')) AS total_categories
+            FROM books
+        """
+        result = db.execute_query(query, fetch=True)
+        summary = {key: int(value or 0) for key, value in result[0].items()} if result else {
+            'total_unique_books': 0, 'total_copies_all': 0, 'total_available_copies': 0,
+            'total_authors': 0, 'total_categories': 0,
+        }
+        summary['books_on_loan'] = summary['total_copies_all'] - summary['total_available_copies']
+        return summary
+
+    @staticmethod
+    def get_category_counts():
+        """Copies held per category, largest first, as {category: copies}"""
+        query = """
+            SELECT category, copies FROM category_summary
+            WHERE category <> '' AND copies > 0
+            ORDER BY copies DESC, category
+        """
+        results = db.execute_query(query, fetch=True) or []
+        return {row['category']: int(row['copies'] or 0) for row in results}
+
+    @staticmethod
+    def get_books_page(after_key=None, limit=200, available_only=False):
+        """One page of book rows in title order after the (title, book_id) ``after_key``"""
+        conditions = []
+        params = []
+        if after_key is not None:
+            title, book_id = after_key
+            conditions.append("(title > %s OR (title = %s AND book_id > %s))")
+            params += [title, title, book_id]
+        if available_only:
+            conditions.append("available_copies > 0")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = f"SELECT * FROM books{where} ORDER BY title, book_id LIMIT %s"
+        return db.execute_query(query, tuple(params) + (limit,), fetch=True) or []
+
+    @staticmethod
+    def page_key(book):
+        """Keyset position of a book row for get_books_page(after_key=...)"""
+        return (book['title'], book['book_id'])
+
+    @staticmethod
+    def get_books_by_ids(book_ids):
+        """Current book rows for ``book_ids``, e.g. to patch a list after a change"""
+        if not book_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(book_ids))
+        query = f"SELECT * FROM books WHERE book_id IN ({placeholders})"
+        return db.execute_query(query, tuple(book_ids), fetch=True) or []
+
+    # --- Circulation summaries -------------------------------------------
+    # category_summary, and library_totals with it, are kept current by the
+    # services that change books, loans and fines, inside the same
+    # transaction, so dashboards read a handful of rows instead of scanning
+    # loans. daily_circulation is rolled
+    # up from loans when it is read instead: every checkout and return of a
+    # day would otherwise update that day's single row, and each desk would
+    # wait on it for the rest of its transaction.
+
+    @staticmethod
+    def adjust_category_summary(tx, deltas):
+        """Apply {category: {column: delta}} to category_summary within ``tx``"""
+        rows = [
+            (category or '',) + tuple(change.get(column, 0) for column in SUMMARY_COLUMNS)
+            for category, change in deltas.items() if any(change.values())
+        ]
+        if not rows:
+            return
+        updates = ", ".join(f"{column} = {column} + VALUES({column})" for column in SUMMARY_COLUMNS)
+        tx.executemany(f"""
+            INSERT INTO category_summary (category, {", ".join(SUMMARY_COLUMNS)})
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE {updates}
+        """, rows)
+
+        # Only fine changes touch the single totals row; plain checkouts never wait on it
+        pending = round(sum(change.get('pending_fines', 0) for change in deltas.values()), 2)
+        if pending:
+            tx.execute("""
+                INSERT INTO library_totals (id, pending_fines) VALUES (1, %s)
+                ON DUPLICATE KEY UPDATE pending_fines = pending_fines + VALUES(pending_fines)
+            """, (pending,))
+
+    @staticmethod
+    def adjust_books_summary(tx, deltas):
+        """Apply {book_id: {column: delta}} to the categories of those books"""
+        if not deltas:
+            return
+        placeholders = ", ".join(["%s"] * len(deltas))
+        categories = tx.fetch(
+            f"SELECT book_id, category FROM books WHERE book_id IN ({placeholders})", tuple(deltas))
+
+        by_category = defaultdict(lambda: defaultdict(float))
+        for row in categories:
+            for column, delta in deltas[row['book_id']].items():
+                by_category[row['category'] or ''][column] += delta
+        ReportService.adjust_category_summary(tx, by_category)
+
+    @staticmethod
+    def roll_up_circulation():
+        """Recompute daily_circulation from loans for the days it may be missing.
+
+        Starts the day before the latest stored day, so a transaction that
+        committed across midnight after the last roll-up is still counted.
+        Rows are overwritten with totals, so running it again changes nothing.
+        """
+        with db.transaction() as tx:
+            # Locking the latest row first keeps two roll-ups from overwriting each other
+            latest = tx.fetch_one("SELECT MAX(day) AS day FROM daily_circulation FOR UPDATE")
+            since = '0001-01-01'
+            if latest and latest['day']:
+                since = (date.fromisoformat(_day(latest['day'])) - timedelta(days=1)).isoformat()
+            rows = tx.fetch(RECENT_CIRCULATION_QUERY, (since, since))
+            if rows:
+                tx.executemany("""
+                    INSERT INTO daily_circulation (day, issued, returned, fines_assessed)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE issued = VALUES(issued), returned = VALUES(returned),
+                        fines_assessed = VALUES(fines_assessed)
+                """, [(_day(row['day']),) + tuple(row[column] or 0 for column in DAILY_COLUMNS)
+                      for row in rows])
+
+    @staticmethod
+    def get_category_summary():
+        """Per-category copies, loans, overdues and pending fines, largest first"""
+        query = "SELECT * FROM category_summary ORDER BY copies DESC, category"
+        return db.execute_query(query, fetch=True) or []
+
+    @staticmethod
+    def get_daily_circulation(start_date=None, end_date=None):
+        """Issues, returns and fines per day, oldest first; rolls up the latest days first"""
+        ReportService.roll_up_circulation()
+        query = "SELECT * FROM daily_circulation WHERE day >= %s AND day <= %s ORDER BY day"
+        params = (_day(start_date or '0001-01-01'), _day(end_date or '9999-12-31'))
+        return db.execute_query(query, params, fetch=True) or []
+
+    @staticmethod
+    def rebuild_summaries(verify_only=False):
+        """Recompute the summary tables from books and loans.
+
+        Returns {table: [mismatch, ...]} describing where the stored rows
+        differed; unless ``verify_only`` the tables are then rewritten. Recent
+        circulation is rolled up first, so only drift is reported.
+        """
+        ReportService.roll_up_circulation()
+        checks = [
+            ('category_summary', 'category', SUMMARY_COLUMNS, CATEGORY_SUMMARY_QUERY),
+            ('daily_circulation', 'day', DAILY_COLUMNS, DAILY_CIRCULATION_QUERY),
+            ('library_totals', 'id', TOTALS_COLUMNS, LIBRARY_TOTALS_QUERY),
+        ]
+        report = {}
+        with db.transaction() as tx:
+            for table, key, columns, expected_query in checks:
+                expected = {_day(row[key]) if key == 'day' else row[key]: row
+                            for row in tx.fetch(expected_query)}
+                stored = {_day(row[key]) if key == 'day' else row[key]: row
+                          for row in tx.fetch(f"SELECT * FROM {table} FOR UPDATE")}
+
+                mismatches = []
+                for name in sorted(set(expected) | set(stored)):
+                    want = _summary_row(expected[name], columns) if name in expected else None
+                    have = _summary_row(stored[name], columns) if name in stored else None
+                    if want != have and not (want is None and not any(have)):
+                        mismatches.append(f"{key} {name!r}: stored {have}, expected {want}")
+                report[table] = mismatches
+
+                if not verify_only and mismatches:
+                    tx.execute(f"DELETE FROM {table}")
+                    tx.executemany(
+                        f"INSERT INTO {table} ({key}, {', '.join(columns)}) "
+                        f"VALUES ({', '.join(['%s'] * (len(columns) + 1))})",
+                        [(name,) + tuple(row[column] or 0 for column in columns)
+                         for name, row in expected.items()]
+                    )
+        return report
+
+    # --- Exports ---------------------------------------------------------
+
+    @staticmethod
+    def export(report_name, fmt, path, progress=None, batch_size=5000):
+        """Write one of EXPORT_REPORTS to ``path`` as 'csv', 'xlsx' or 'parquet' (None: from the name).
+
+        Rows are streamed from the database ``batch_size`` at a time straight
+        into the writer. The file is written under a temporary name and only
+        appears at ``path`` once complete. ``progress(rows)`` is called after
+        each batch. Returns {'rows', 'seconds', 'path'}, plus 'error' on failure.
+        """
+        if report_name not in EXPORT_REPORTS:
+            raise ValueError(f"Unknown report: {report_name}; expected one of {', '.join(EXPORT_REPORTS)}")
+        fmt = fmt or detect_format(path)
+        if fmt not in WRITERS:
+            raise ValueError(f"Unknown export format: {fmt}; expected one of {', '.join(WRITERS)}")
+
+        title, query, columns = EXPORT_REPORTS[report_name]
+        result = {'rows': 0, 'seconds': 0.0, 'path': path}
+        started = time.perf_counter()
+        partial = f"{path}.part"
+        writer = None
+        try:
+            writer = WRITERS[fmt](partial, columns, title)
+            # Tuples in SELECT order are what the writers take, with no dict built per row
+            for rows in db.stream(query, batch_size=batch_size, row_factory=tuple):
+                writer.write(rows)
+                result['rows'] += len(rows)
+                if progress:
+                    progress(result['rows'])
+            writer.close()
+            writer = None
+            os.replace(partial, path)
+        except Exception as e:
+            print(f"Error exporting {report_name}: {e}")
+            result['error'] = str(e)
+            if writer is not None:
+                try:
+                    writer.close()
+                except Exception:
+                    pass
+            if os.path.exists(partial):
+                os.remove(partial)
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
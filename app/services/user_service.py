@@ -1,8 +1,25 @@
 from app.database.db_handler import db
+from app.utils.cache import TTLCache
+
+# Staff names change rarely; a short TTL still picks up edits without a restart
+_user_names = TTLCache(maxsize=2048, ttl=300)
+
 
 class UserService:
     @staticmethod
     def get_user_name(user_id):
-        query = "SELECT full_name FROM users WHERE user_id = %s"
-        result = db.execute_query(query, (user_id,), fetch=True)
-        return result[0]['full_name'] if result else None
\ No newline at end of file
+        return UserService.get_user_names([user_id]).get(user_id)
+
+    @staticmethod
+    def get_user_names(user_ids):
+        """Map user IDs to full names with one query for all cache misses"""
+        ids = list(dict.fromkeys(uid for uid in user_ids if uid is not None))
+        names, missing = _user_names.get_many(ids)
+        if missing:
+            placeholders = ", ".join(["%s"] * len(missing))
+            query = f"SELECT user_id, full_name FROM users WHERE user_id IN ({placeholders})"
+            # A single name (get_user_name) is the hot case; batches vary in size, so only it is prepared
+            for row in db.execute_query(query, tuple(missing), fetch=True, prepared=len(missing) == 1) or []:
+                names[row['user_id']] = row['full_name']
+                _user_names.set(row['user_id'], row['full_name'])
+        return names
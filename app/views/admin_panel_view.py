@@ -9,6 +9,7 @@ from app.views.member_registration_view import MemberRegistrationView
 from app.views.book_lending_view import BookLendingView
 from app.views.book_return_view import BookReturnView
 from app.views.fine_calculation_view import FineManagementView
+from app.views.db_diagnostics_view import DBDiagnosticsView
 
 
 class AdminPanelView(tk.Tk):
@@ -103,7 +104,8 @@ class AdminPanelView(tk.Tk):
             ("📤", "Book Lending", self._open_book_lending),
             ("📥", "Book Returns", self._open_book_returns),
             ("💰", "Fine Management", self._open_fine_calculation),
-            ("📊", "Inventory Reports", self._open_inventory_reports)
+            ("📊", "Inventory Reports", self._open_inventory_reports),
+            ("🩺", "DB Diagnostics", self._open_db_diagnostics)
         ]
 
         for i, (icon, text, command) in enumerate(actions):
@@ -141,6 +143,9 @@ class AdminPanelView(tk.Tk):
     def _open_inventory_reports(self):
         InventoryReportsView(self)
 
+    def _open_db_diagnostics(self):
+        DBDiagnosticsView(self)
+
     def _open_member_registration(self):
         MemberRegistrationView(self, self.user)
 
@@ -0,0 +1,560 @@
+# base_view.py
+import bisect
+import logging
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+from app.services.catalogue_cache import catalogue
+from app.services.change_feed import ChangePoller
+
+log = logging.getLogger(__name__)
+
+
+def keyset_source(fetch, key):
+    """Page source for a service method paged by ``after_key``.
+
+    ``fetch(after_key=..., limit=...)`` returns a list of rows and ``key(row)``
+    gives the keyset position of a row, e.g. BookService.page_key.
+    """
+    def fetch_page(after_key, limit):
+        rows = fetch(after_key=after_key, limit=limit)
+        next_key = key(rows[-1]) if len(rows) == limit else None
+        return rows, next_key
+    fetch_page.key = key  # lets a VirtualTreeview place rows that start belonging to the list
+    return fetch_page
+
+
+def offset_source(fetch):
+    """Page source for a method paged by ``limit``/``offset`` (e.g. ranked search results)"""
+    def fetch_page(after_key, limit):
+        offset = after_key or 0
+        rows = fetch(limit=limit, offset=offset)
+        next_key = offset + len(rows) if len(rows) == limit else None
+        return rows, next_key
+    return fetch_page
+
+
+class VirtualTreeview(ttk.Frame):
+    """Treeview that loads rows a page at a time as the user scrolls.
+
+    Only ``max_pages`` pages are kept in the tree; pages scrolled far out of
+    view are deleted and fetched again if the user scrolls back, so opening or
+    scrolling the list costs the same for a thousand rows or a million. The
+    scrollbar therefore reflects the loaded window, not the whole table.
+
+    ``fetch_page(after_key, limit)`` returns ``(rows, next_key)`` with
+    ``next_key`` None on the last page; see keyset_source and offset_source.
+    ``row_values(row)`` returns the tuple of column values and the optional
+    ``row_tags(row)`` the Treeview tags for the row. With ``row_key(row)``
+    (e.g. the book_id) loaded rows can be patched in place, see follow_changes;
+    with a keyset_source, rows can also be inserted at their keyset position.
+    """
+
+    def __init__(self, parent, columns, row_values, fetch_page=None, page_size=100,
+                 max_pages=5, row_tags=None, row_key=None, selectmode="browse", **kwargs):
+        super().__init__(parent, **kwargs)
+        self.row_values = row_values
+        self.row_tags = row_tags
+        self.row_key = row_key
+        self.page_size = page_size
+        self.max_pages = max(max_pages, 3)
+        self._fetch_page = fetch_page
+
+        self.tree = ttk.Treeview(self, columns=[col[0] for col in columns], show="headings",
+                                 selectmode=selectmode, style='Treeview')
+        for col, width, *anchor in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, minwidth=width, anchor=anchor[0] if anchor else "w")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill=tk.BOTH, expand=True)
+
+        self._starts = [None]  # after_key of every page seen so far, by page number
+        self._last_page = None  # page number of the final page once it has been fetched
+        self._pages = []  # (page number, row iids) for the pages currently in the tree
+        self._iids = {}  # row_key -> iid of the loaded rows
+        self._keys = {}  # iid -> row_key
+        self._positions = {}  # iid -> keyset position, for keyset sources
+        self._check_pending = False
+
+        if fetch_page is not None:
+            self.reload()
+
+    def set_source(self, fetch_page, first_page=None):
+        """Show a different list (e.g. search results) from its first page.
+
+        ``first_page`` is an already fetched ``(rows, next_key)`` for page 0,
+        e.g. from a SearchController worker, so the Tk thread skips that query.
+        """
+        self._fetch_page = fetch_page
+        self.reload(first_page)
+
+    def reload(self, first_page=None):
+        """Drop every loaded row and fetch the first page again"""
+        self.tree.delete(*self.tree.get_children())
+        self._starts = [None]
+        self._last_page = None
+        self._pages = []
+        self._iids = {}
+        self._keys = {}
+        self._positions = {}
+        if self._fetch_page is not None:
+            self._load_page(0, at_end=True, fetched=first_page)
+            self.tree.yview_moveto(0)
+
+    def loaded_rows(self):
+        return len(self.tree.get_children())
+
+    def patch_rows(self, rows):
+        """Redraw those of ``rows`` that are loaded; returns how many were"""
+        position = self._position_key()
+        patched = 0
+        moved = []
+        for row in rows:
+            iid = self._iids.get(self.row_key(row))
+            if iid is None:
+                continue
+            if position is not None and self._positions.get(iid) != position(row):
+                moved.append(row)  # e.g. a retitled book: it belongs elsewhere in the order
+                continue
+            self.tree.item(iid, values=self.row_values(row),
+                           tags=self.row_tags(row) if self.row_tags is not None else ())
+            patched += 1
+        if moved:
+            self.remove_rows([self.row_key(row) for row in moved])
+            patched += self.insert_rows(moved)
+        return patched
+
+    def insert_rows(self, rows):
+        """Place those of ``rows`` not yet loaded whose keyset position falls in the loaded range.
+
+        Only lists fed by a keyset_source know where a row goes; a row before
+        the first loaded page or after the last one is left to be fetched
+        with its page. Returns how many rows were inserted.
+        """
+        position = self._position_key()
+        if position is None or self.row_key is None or not self._pages:
+            return 0
+        loaded = [iid for number, iids in self._pages for iid in iids]
+        order = [self._positions[iid] for iid in loaded]
+        if not order and self._pages[0][0] > 0:
+            return 0
+        low = order[0] if self._pages[0][0] > 0 else None
+        high = order[-1] if self._more_below() else None
+
+        inserted = 0
+        for row in sorted(rows, key=position):
+            key = position(row)
+            if self.row_key(row) in self._iids or (low is not None and key <= low) \
+                    or (high is not None and key > high):
+                continue
+            index = bisect.bisect(order, key)
+            iid = self._insert(index, row)
+            loaded.insert(index, iid)
+            order.insert(index, key)
+            # The row joins the page of the row before it (the first page when it leads)
+            before = loaded[index - 1] if index else None
+            for number, iids in self._pages:
+                if before is None or before in iids:
+                    iids.insert(iids.index(before) + 1 if before is not None else 0, iid)
+                    break
+            inserted += 1
+        return inserted
+
+    def remove_rows(self, keys):
+        """Take the rows with these keys out of the list, if loaded"""
+        iids = {self._iids.pop(key) for key in keys if key in self._iids}
+        if not iids:
+            return
+        for iid in iids:
+            del self._keys[iid]
+            self._positions.pop(iid, None)
+        self._pages = [(number, [iid for iid in page if iid not in iids]) for number, page in self._pages]
+        self.tree.delete(*iids)
+
+    def _more_below(self):
+        if not self._pages:
+            return False
+        return self._last_page is None or self._pages[-1][0] < self._last_page
+
+    def _more_above(self):
+        return bool(self._pages) and self._pages[0][0] > 0
+
+    def _fetch(self, number, fetched=None):
+        rows, next_key = fetched or self._fetch_page(self._starts[number], self.page_size)
+        if next_key is None:
+            self._last_page = number
+        elif number + 1 == len(self._starts):
+            self._starts.append(next_key)
+        return rows
+
+    def _insert(self, index, row):
+        if self.row_tags is not None:
+            iid = self.tree.insert('', index, values=self.row_values(row), tags=self.row_tags(row))
+        else:
+            iid = self.tree.insert('', index, values=self.row_values(row))
+        if self.row_key is not None:
+            key = self.row_key(row)
+            self._iids[key] = iid
+            self._keys[iid] = key
+        position = self._position_key()
+        if position is not None:
+            self._positions[iid] = position(row)
+        return iid
+
+    def _position_key(self):
+        return getattr(self._fetch_page, 'key', None)
+
+    def _load_page(self, number, at_end, fetched=None):
+        rows = self._fetch(number, fetched)
+        if at_end:
+            iids = [self._insert('end', row) for row in rows]
+            self._pages.append((number, iids))
+        else:
+            iids = [self._insert(index, row) for index, row in enumerate(rows)]
+            self._pages.insert(0, (number, iids))
+        return len(iids)
+
+    def _drop_page(self, from_end):
+        number, iids = self._pages.pop() if from_end else self._pages.pop(0)
+        for iid in iids:
+            self._iids.pop(self._keys.pop(iid, None), None)
+            self._positions.pop(iid, None)
+        self.tree.delete(*iids)
+        return len(iids)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Loading from inside the scroll callback would re-enter it; defer to idle
+        if not self._check_pending and self._pages:
+            self._check_pending = True
+            self.after_idle(self._check_edges)
+
+    def _check_edges(self):
+        self._check_pending = False
+        total = self.loaded_rows()
+        if not total:
+            return
+        first, last = self.tree.yview()
+        top_row = first * total
+        margin = self.page_size / 2
+
+        if (1 - float(last)) * total < margin and self._more_below():
+            added = self._load_page(self._pages[-1][0] + 1, at_end=True)
+            removed = self._drop_page(from_end=False) if len(self._pages) > self.max_pages else 0
+            self._keep_position(top_row - removed, added - removed, total)
+        elif top_row < margin and self._more_above():
+            added = self._load_page(self._pages[0][0] - 1, at_end=False)
+            removed = self._drop_page(from_end=True) if len(self._pages) > self.max_pages else 0
+            self._keep_position(top_row + added, added - removed, total)
+
+    def _keep_position(self, top_row, delta, total_before):
+        # Keep the same rows on screen after pages were added or dropped around them
+        total = total_before + delta
+        if total > 0:
+            self.tree.yview_moveto(max(top_row, 0) / total)
+
+
+class SearchController:
+    """Debounced search that runs its query off the Tk thread.
+
+    ``schedule(term)`` restarts a ``delay_ms`` timer, so a burst of keystrokes
+    costs one query. ``search(term)`` then runs on a worker thread and
+    ``on_results(term, results)`` is called back on the Tk thread; results of
+    a search overtaken by a newer keystroke are dropped. A query already sent
+    to the database cannot be interrupted, only ignored.
+    """
+
+    poll_ms = 25
+
+    def __init__(self, widget, search, on_results, delay_ms=150):
+        self.widget = widget
+        self.search = search
+        self.on_results = on_results
+        self.delay_ms = delay_ms
+        self._generation = 0
+        self._timer = None
+        self._polling = False
+        self._running = 0  # worker threads whose result has not been collected yet
+        self._last_term = None
+        self._results = queue.Queue()
+
+    def schedule(self, term):
+        """Search for ``term`` once typing pauses; unchanged terms are ignored"""
+        if term == self._last_term:
+            return
+        self._last_term = term
+        self._generation += 1  # results of any search still running are now stale
+        if self._timer is not None:
+            self.widget.after_cancel(self._timer)
+        self._timer = self.widget.after(self.delay_ms, self._start, self._generation, term)
+
+    def cancel(self):
+        """Forget the pending search and ignore any running one"""
+        self._generation += 1
+        if self._timer is not None:
+            try:
+                self.widget.after_cancel(self._timer)
+            except tk.TclError:
+                pass
+            self._timer = None
+
+    def _start(self, generation, term):
+        self._timer = None
+        self._running += 1
+        threading.Thread(target=self._run, args=(generation, term), daemon=True).start()
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _run(self, generation, term):
+        # Worker thread: never touch Tk here, hand the result to _poll via the queue
+        try:
+            result = self.search(term)
+        except Exception as e:
+            print(f"Search for {term!r} failed: {e}")
+            result = None
+        self._results.put((generation, term, result))
+
+    def _poll(self):
+        try:
+            alive = self.widget.winfo_exists()
+        except tk.TclError:
+            alive = False
+        if not alive:
+            self._polling = False
+            return
+
+        while True:
+            try:
+                generation, term, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._running -= 1
+            if generation == self._generation and result is not None:
+                self.on_results(term, result)
+
+        if self._running:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+
+class BackgroundTask:
+    """Runs a long job, e.g. an import or export, off the Tk thread.
+
+    ``task(progress)`` runs on a worker thread and may call ``progress(value)``
+    as it goes. Every ``poll_ms`` the Tk thread hands each value to
+    ``on_progress`` and, once the task ends, its result to ``on_done`` or the
+    error message to ``on_error``. Nothing is called back once ``widget`` is
+    destroyed.
+    """
+
+    poll_ms = 100
+
+    def __init__(self, widget, task, on_done, on_error, on_progress=None):
+        self.widget = widget
+        self.task = task
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self._updates = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+        self.widget.after(self.poll_ms, self._poll)
+
+    def _run(self):
+        # Worker thread: never touch Tk here, hand everything to _poll via the queue
+        try:
+            result = self.task(lambda value: self._updates.put(('progress', value)))
+        except Exception as e:
+            self._updates.put(('error', str(e)))
+        else:
+            self._updates.put(('done', result))
+
+    def _poll(self):
+        try:
+            alive = self.widget.winfo_exists()
+        except tk.TclError:
+            alive = False
+        if not alive:
+            return
+
+        while True:
+            try:
+                kind, value = self._updates.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                if self.on_progress is not None:
+                    self.on_progress(value)
+                continue
+            (self.on_done if kind == 'done' else self.on_error)(value)
+            return
+        self.widget.after(self.poll_ms, self._poll)
+
+
+def bind_search(entry, tree_list, source_for, delay_ms=150, filters=None):
+    """Drive a VirtualTreeview from an Entry through a SearchController.
+
+    ``source_for(term)`` returns the page source for a term (the full list
+    when it is empty); the first page is fetched on the worker thread. With
+    ``filters``, e.g. a Combobox's ``get``, it is read on the Tk thread as
+    each search is scheduled and passed on as ``source_for(term, filters())``.
+    """
+    def search(key):
+        term, state = key
+        source = source_for(term) if filters is None else source_for(term, state)
+        return source, source(None, tree_list.page_size)
+
+    def show(key, result):
+        source, first_page = result
+        tree_list.set_source(source, first_page=first_page)
+
+    def schedule(event):
+        controller.schedule((entry.get().strip(), None if filters is None else filters()))
+
+    controller = SearchController(entry, search, show, delay_ms=delay_ms)
+    entry.bind('<KeyRelease>', schedule)
+    entry.bind('<Destroy>', lambda event: controller.cancel(), add='+')
+    return controller
+
+
+class ChangeWatcher:
+    """Polls the change feed and patches the lists that follow it.
+
+    One watcher serves every open window of the application. Each
+    ``interval_ms`` a worker thread reads the feed and fetches the current
+    rows for the changes each list follows; the lists are then patched on
+    the Tk thread. Changed rows that are no longer returned (a returned
+    loan, a deleted book) are removed, and rows that start belonging to a
+    list (a new loan, a book back on the shelf) are inserted at their
+    keyset position when it lies within the loaded pages. A burst bigger
+    than ``max_rows`` reloads the list instead, and so does a list whose
+    rows could not be fetched, since the feed has already moved past them.
+    """
+
+    interval_ms = 1000
+    collect_ms = 25
+    max_rows = 200
+
+    def __init__(self, root):
+        self.root = root
+        self.poller = None
+        self._lists = []  # (tree_list, entity, fetch_rows)
+        self._results = queue.Queue()
+        self._running = False
+        self._ticking = False
+
+    def follow(self, tree_list, entity, fetch_rows):
+        entry = (tree_list, entity, fetch_rows)
+        self._lists.append(entry)
+        tree_list.bind('<Destroy>', lambda event: self._unfollow(entry, event), add='+')
+        if not self._ticking:
+            self._ticking = True
+            self.root.after(self.interval_ms, self._tick)
+
+    def _unfollow(self, entry, event):
+        # <Destroy> also fires for each child widget; only the list itself ends the subscription
+        if event.widget is entry[0] and entry in self._lists:
+            self._lists.remove(entry)
+
+    def poll_now(self):
+        """Read the feed straight away, e.g. right after this desk changed something"""
+        self._start()
+
+    def _tick(self):
+        if not self._lists:
+            self._ticking = False
+            return
+        self._start()
+        self.root.after(self.interval_ms, self._tick)
+
+    def _start(self):
+        if self._running or not self._lists:
+            return
+        self._running = True
+        threading.Thread(target=self._work, args=(list(self._lists),), daemon=True).start()
+        self.root.after(self.collect_ms, self._collect)
+
+    def _work(self, lists):
+        # Worker thread: queries only, the Tk widgets are patched in _collect
+        updates = []
+        try:
+            if self.poller is None:
+                self.poller = ChangePoller()
+            changes = self.poller.poll()
+        except Exception:
+            # Nothing was read, so the next tick asks for the same changes again
+            log.exception("Polling the change feed failed")
+            changes = {}
+        try:
+            self._refresh_catalogue(changes.get('book', {}))
+        except Exception:
+            log.exception("Refreshing the catalogue from the change feed failed")
+            catalogue.invalidate()
+        for entry in lists:
+            tree_list, entity, fetch_rows = entry
+            changed = changes.get(entity, {})
+            updated = changed.get('insert', []) + changed.get('update', [])
+            deleted = changed.get('delete', [])
+            if len(updated) + len(deleted) > self.max_rows:
+                updates.append((entry, None, None))
+            elif updated or deleted:
+                try:
+                    rows = fetch_rows(updated) if updated else []
+                except Exception:
+                    # These changes will not be read again: show them by reloading the list
+                    log.exception("Fetching changed %s rows failed", entity)
+                    updates.append((entry, None, None))
+                    continue
+                found = {tree_list.row_key(row) for row in rows}
+                updates.append((entry, rows, [key for key in updated + deleted if key not in found]))
+        self._results.put(updates)
+
+    def _refresh_catalogue(self, books):
+        changed = books.get('insert', []) + books.get('update', [])
+        if len(changed) + len(books.get('delete', [])) > self.max_rows:
+            catalogue.invalidate()
+            return
+        for book_id in changed:
+            catalogue.refresh(book_id)
+        for book_id in books.get('delete', []):
+            catalogue.discard(book_id)
+
+    def _collect(self):
+        try:
+            updates = self._results.get_nowait()
+        except queue.Empty:
+            self.root.after(self.collect_ms, self._collect)
+            return
+        self._running = False
+        for entry, rows, gone in updates:
+            tree_list = entry[0]
+            if entry not in self._lists:
+                continue
+            if rows is None:
+                tree_list.reload()
+            else:
+                tree_list.patch_rows(rows)
+                tree_list.insert_rows(rows)
+                tree_list.remove_rows(gone)
+
+
+_watcher = None
+
+
+def follow_changes(tree_list, entity, fetch_rows):
+    """Keep a VirtualTreeview (built with ``row_key``) current from the change feed.
+
+    ``fetch_rows(ids)`` returns the rows among ``ids`` that still belong in
+    the list, e.g. BookService.get_books_by_ids.
+    """
+    global _watcher
+    if _watcher is None:
+        _watcher = ChangeWatcher(tree_list._root())
+    _watcher.follow(tree_list, entity, fetch_rows)
+    return _watcher
@@ -1,10 +1,10 @@
 # book_lending_view.py
 import tkinter as tk
 from tkinter import ttk, messagebox, font
-from datetime import datetime, timedelta
 from app.services.book_service import BookService
 from app.services.member_service import MemberService
 from app.services.loan_service import LoanService
+from app.views.base_view import VirtualTreeview, bind_search, follow_changes, keyset_source, offset_source
 
 
 # from app.services.user_service import UserService # Not directly used for display here but good to have if needed
@@ -128,12 +128,10 @@ class BookLendingView(tk.Toplevel):
         ttk.Label(search_controls_frame, text="Search Book:", style='Card.TLabel').pack(side=tk.LEFT, padx=(0, 5))
         self.book_search_entry = ttk.Entry(search_controls_frame, width=30)
         self.book_search_entry.pack(side=tk.LEFT, padx=(0, 15), ipady=2)
-        self.book_search_entry.bind('<KeyRelease>', self._search_books)
 
         ttk.Label(search_controls_frame, text="Search Member:", style='Card.TLabel').pack(side=tk.LEFT, padx=(0, 5))
         self.member_search_entry = ttk.Entry(search_controls_frame, width=30)
         self.member_search_entry.pack(side=tk.LEFT, padx=(0, 5), ipady=2)
-        self.member_search_entry.bind('<KeyRelease>', self._search_members)
 
         # Main content area for book and member selection (side by side)
         selection_area_frame = ttk.Frame(parent_tab_frame, style='Card.TFrame')
@@ -144,39 +142,36 @@ class BookLendingView(tk.Toplevel):
         book_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
 
         book_cols = [("ID", 40), ("Title", 220), ("Author", 130), ("Available", 70), ("Shelf", 70)]
-        self.books_tree = ttk.Treeview(book_frame, columns=[col[0] for col in book_cols], show="headings",
-                                       selectmode="browse", style='Treeview')
-        for col, width in book_cols:
-            self.books_tree.heading(col, text=col)
-            self.books_tree.column(col, width=width, minwidth=width, anchor="w")
-
-        book_scroll = ttk.Scrollbar(book_frame, orient="vertical", command=self.books_tree.yview)
-        self.books_tree.configure(yscrollcommand=book_scroll.set)
-        book_scroll.pack(side="right", fill="y")
-        self.books_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.books_list = VirtualTreeview(book_frame, book_cols, self._book_row_values,
+                                          row_key=lambda book: book.book_id,
+                                          selectmode="extended")  # Multi-select a basket
+        self.books_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.books_tree = self.books_list.tree
+        self.book_search = bind_search(self.book_search_entry, self.books_list, self._book_source)
+        # Copies lent or returned at any desk update here; books with none left drop out
+        self.changes = follow_changes(self.books_list, 'book', lambda book_ids: [
+            book for book in BookService.get_books_by_ids(book_ids) if book.available_copies > 0])
 
         # Members frame
         member_frame = ttk.LabelFrame(selection_area_frame, text="Active Members", style='TLabelframe')
         member_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0))
 
         member_cols = [("ID", 40), ("Name", 180), ("Phone", 100), ("Status", 70)]
-        self.members_tree = ttk.Treeview(member_frame, columns=[col[0] for col in member_cols], show="headings",
-                                         selectmode="browse", style='Treeview')
-        for col, width in member_cols:
-            self.members_tree.heading(col, text=col)
-            self.members_tree.column(col, width=width, minwidth=width, anchor="w")
-
-        member_scroll = ttk.Scrollbar(member_frame, orient="vertical", command=self.members_tree.yview)
-        self.members_tree.configure(yscrollcommand=member_scroll.set)
-        member_scroll.pack(side="right", fill="y")
-        self.members_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.members_list = VirtualTreeview(member_frame, member_cols, self._member_row_values,
+                                            row_key=lambda member: member.member_id)
+        self.members_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.members_tree = self.members_list.tree
+        self.member_search = bind_search(self.member_search_entry, self.members_list, self._member_source)
+        follow_changes(self.members_list, 'member', lambda member_ids: [
+            member for member in MemberService.get_members_by_ids(member_ids)
+            if member.membership_status == 'active'])
 
         # Lend button
         lend_button_frame = ttk.Frame(parent_tab_frame, style='Card.TFrame')
         lend_button_frame.pack(fill=tk.X, pady=(10, 0))
         ttk.Button(
             lend_button_frame,
-            text="✅ Lend Selected Book to Member",
+            text="✅ Lend Selected Books to Member",
             command=self._lend_book,
             style="Success.TButton"  # Use Success for positive action
         ).pack(pady=5, ipady=5, ipadx=10)
@@ -188,17 +183,12 @@ class BookLendingView(tk.Toplevel):
             ("Member", 150), ("Issue Date", 110), ("Due Date", 110),
             ("Days Overdue", 90), ("Fine", 90)  # Renamed from Fine Amount
         ]
-        self.loans_tree = ttk.Treeview(parent_tab_frame, columns=[col[0] for col in loan_cols], show="headings",
-                                       selectmode="browse", style='Treeview')
-        for col, width in loan_cols:
-            self.loans_tree.heading(col, text=col)
-            self.loans_tree.column(col, width=width, minwidth=width,
-                                   anchor="center" if col not in ["Title", "Member"] else "w")
-
-        loan_list_scroll = ttk.Scrollbar(parent_tab_frame, orient="vertical", command=self.loans_tree.yview)
-        self.loans_tree.configure(yscrollcommand=loan_list_scroll.set)
-        loan_list_scroll.pack(side="right", fill="y")
-        self.loans_tree.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+        loan_cols = [(col, width, "center" if col not in ["Title", "Member"] else "w") for col, width in loan_cols]
+        self.loans_list = VirtualTreeview(parent_tab_frame, loan_cols, self._loan_row_values,
+                                          row_tags=self._loan_row_tags, row_key=lambda loan: loan['loan_id'])
+        follow_changes(self.loans_list, 'loan', LoanService.get_active_loans_by_ids)
+        self.loans_list.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+        self.loans_tree = self.loans_list.tree
 
         # Return button frame
         return_button_frame = ttk.Frame(parent_tab_frame, style='Card.TFrame')
@@ -211,118 +201,84 @@ class BookLendingView(tk.Toplevel):
         ).pack(pady=5, ipady=5, ipadx=10)
 
     def _load_available_books(self):
-        for row in self.books_tree.get_children():
-            self.books_tree.delete(row)
-        books = BookService.get_all_books()
-        for book in books:
-            if book.available_copies > 0:
-                self.books_tree.insert('', 'end', values=(
-                    book.book_id, book.title, book.author,
-                    book.available_copies, book.shelf_location or "N/A"
-                ))
+        self.books_list.set_source(self._book_source(""))
+
+    def _book_source(self, search_term):
+        if not search_term:
+            return keyset_source(
+                lambda after_key, limit: BookService.get_books_page(after_key, limit, available_only=True),
+                BookService.page_key)
+        return offset_source(
+            lambda limit, offset: BookService.search_books(search_term, limit=limit, offset=offset,
+                                                           available_only=True))
+
+    def _book_row_values(self, book):
+        return (book.book_id, book.title, book.author,
+                book.available_copies, book.shelf_location or "N/A")
 
     def _load_members(self):
-        for row in self.members_tree.get_children():
-            self.members_tree.delete(row)
-        members = MemberService.get_all_members()
-        for member in members:
-            if member.membership_status == 'active':
-                self.members_tree.insert('', 'end', values=(
-                    member.member_id, f"{member.first_name} {member.last_name}",
-                    member.phone, member.membership_status
-                ))
+        self.members_list.set_source(self._member_source(""))
+
+    def _member_source(self, search_term):
+        if not search_term:
+            return keyset_source(
+                lambda after_key, limit: MemberService.get_members_page(after_key, limit, status='active'),
+                MemberService.page_key)
+        return offset_source(
+            lambda limit, offset: MemberService.search_members(search_term, limit=limit, offset=offset,
+                                                               status='active'))
+
+    def _member_row_values(self, member):
+        return (member.member_id, f"{member.first_name} {member.last_name}",
+                member.phone, member.membership_status)
 
     def _load_active_loans(self):
-        for row in self.loans_tree.get_children():
-            self.loans_tree.delete(row)
-        loans = LoanService.get_active_loans()  # This should return detailed loans
-
-        for loan in loans:
-            issue_date_str = loan['issue_date'].strftime('%Y-%m-%d') if loan['issue_date'] else 'N/A'
-            due_date_obj = loan['due_date']
-            due_date_str = due_date_obj.strftime('%Y-%m-%d') if due_date_obj else 'N/A'
-
-            days_overdue = 0
-            fine_amount_val = 0.0
-            item_tags = ()
-
-            if due_date_obj:
-                # Ensure due_date_obj is datetime for comparison
-                if isinstance(due_date_obj, str):  # Should ideally be datetime from service
-                    try:
-                        due_date_obj = datetime.strptime(due_date_obj, '%Y-%m-%d %H:%M:%S')  # Match your typical format
-                    except ValueError:
-                        due_date_obj = datetime.strptime(due_date_obj, '%Y-%m-%d')
-
-                if datetime.now() > due_date_obj:
-                    days_overdue = (datetime.now() - due_date_obj).days
-                    fine_amount_val = days_overdue * 5.0  # Example fine rate
-                    if days_overdue > 0:
-                        item_tags = ('overdue',)
-
-            fine_display = f"${fine_amount_val:.2f}" if fine_amount_val > 0 else "$0.00"
-
-            self.loans_tree.insert('', 'end', values=(
-                loan['loan_id'], loan['book_id'], loan['title'],
-                loan['member_name'], issue_date_str, due_date_str,
-                days_overdue if days_overdue > 0 else 0,
-                fine_display
-            ), tags=item_tags)
-
-    def _search_books(self, event=None):
-        search_term = self.book_search_entry.get().lower().strip()
-        for row in self.books_tree.get_children(): self.books_tree.delete(row)
-        books = BookService.get_all_books()
-        for book in books:
-            if book.available_copies > 0:
-                if not search_term or \
-                        search_term in book.title.lower() or \
-                        search_term in book.author.lower() or \
-                        search_term in str(book.book_id):
-                    self.books_tree.insert('', 'end', values=(
-                        book.book_id, book.title, book.author,
-                        book.available_copies, book.shelf_location or "N/A"
-                    ))
-
-    def _search_members(self, event=None):
-        search_term = self.member_search_entry.get().strip()
-        for row in self.members_tree.get_children(): self.members_tree.delete(row)
-        # Assuming MemberService.search_members handles empty search_term to return all active
-        members = MemberService.search_members(search_term) if search_term else MemberService.get_all_members()
-        for member in members:
-            if member.membership_status == 'active':
-                # If search_members doesn't filter by active, do it here.
-                # Or ensure search_members also considers the "active" status if implied by context.
-                if not search_term or \
-                        search_term.lower() in f"{member.first_name} {member.last_name}".lower() or \
-                        search_term in member.phone or \
-                        search_term in str(member.member_id):
-                    self.members_tree.insert('', 'end', values=(
-                        member.member_id, f"{member.first_name} {member.last_name}",
-                        member.phone, member.membership_status
-                    ))
+        self.loans_list.set_source(keyset_source(LoanService.get_active_loans_page, LoanService.page_key))
+
+    def _loan_row_tags(self, loan):
+        return ('overdue',) if loan['loan_status'] == 'overdue' else ()
+
+    def _loan_row_values(self, loan):
+        # Status and accrued fine are kept current by LoanService.sweep_overdue
+        issue_date_str = loan['issue_date'].strftime('%Y-%m-%d') if loan['issue_date'] else 'N/A'
+        due_date_str = loan['due_date'].strftime('%Y-%m-%d') if loan['due_date'] else 'N/A'
+        return (
+            loan['loan_id'], loan['book_id'], loan['title'],
+            loan['member_name'], issue_date_str, due_date_str,
+            loan['days_overdue'] or 0,
+            f"${float(loan['fine_amount'] or 0):.2f}"
+        )
 
     def _lend_book(self):
         book_selection = self.books_tree.selection()
         member_selection = self.members_tree.selection()
 
         if not book_selection or not member_selection:
-            messagebox.showwarning("Selection Required", "Please select both a book and a member.", parent=self)
+            messagebox.showwarning("Selection Required", "Please select at least one book and a member.", parent=self)
             return
 
-        book_id = self.books_tree.item(book_selection[0])['values'][0]
+        titles = {}
+        for item in book_selection:
+            values = self.books_tree.item(item)['values']
+            titles[values[0]] = values[1]
         member_id = self.members_tree.item(member_selection[0])['values'][0]
 
         try:
-            if LoanService.issue_loan(book_id, member_id, self.current_user.user_id):
-                messagebox.showinfo("Success", "Book successfully loaned to member.", parent=self)
-                self._load_available_books()  # Refresh book list (availability changed)
-                self._load_active_loans()  # Refresh active loans
+            # The whole basket goes out in one transaction
+            result = LoanService.issue_loans(member_id, list(titles), self.current_user.user_id)
+            if result['issued']:
+                self.changes.poll_now()  # Availability changed; the feed patches the book list
+                self._load_active_loans()  # New loans need a reload to find their place
                 # No need to reload members unless their status changes upon loaning
+
+            if not result['failed']:
+                messagebox.showinfo("Success", f"{len(result['issued'])} book(s) successfully loaned to member.",
+                                    parent=self)
             else:
-                # More specific error if possible from LoanService
+                failed_lines = "\n".join(f"• {titles.get(book_id, book_id)}: {reason}"
+                                          for book_id, reason in result['failed'].items())
                 messagebox.showerror("Loan Error",
-                                     "Failed to issue loan. Book may no longer be available or member cannot borrow.",
+                                     f"{len(result['issued'])} book(s) loaned. Could not lend:\n{failed_lines}",
                                      parent=self)
         except Exception as e:
             messagebox.showerror("System Error", f"An unexpected error occurred: {str(e)}", parent=self)
@@ -349,8 +305,7 @@ class BookLendingView(tk.Toplevel):
             try:
                 if LoanService.return_loan(loan_id):  # This service method should handle fine creation/update if any
                     messagebox.showinfo("Success", "Book successfully returned.", parent=self)
-                    self._load_available_books()  # Book availability changes
-                    self._load_active_loans()  # Loan becomes inactive or removed
+                    self.changes.poll_now()  # The book list and the returned loan are patched from the feed
                 else:
                     messagebox.showerror("Return Error",
                                          "Failed to process book return. Please check loan status or contact support.",
@@ -1,8 +1,10 @@
 # book_management_view.py
 import tkinter as tk
-from tkinter import ttk, messagebox, font
+from tkinter import ttk, messagebox, filedialog, font
 from app.services.book_service import BookService
-from app.services.user_service import UserService
+from app.services.import_service import ImportService
+from app.views.base_view import (BackgroundTask, VirtualTreeview, bind_search, follow_changes, keyset_source,
+                                 offset_source)
 
 
 class BookManagementView(tk.Toplevel):
@@ -41,6 +43,7 @@ class BookManagementView(tk.Toplevel):
         self.tree_row_height = 28
         self.entry_internal_padding = 6
         self.button_padding_y = 8
+        self.page_size = 100  # Rows fetched per scroll step
 
         self.configure(bg=self.bg_color)
         self._setup_styles()
@@ -111,7 +114,6 @@ class BookManagementView(tk.Toplevel):
 
         self.search_entry = ttk.Entry(search_frame, width=40)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0,10), ipady=2)
-        self.search_entry.bind('<KeyRelease>', self._search_books)
 
         # Treeview frame
         tree_frame = ttk.Frame(content_card, style='Card.TFrame') # Ensure background matches card
@@ -123,24 +125,15 @@ class BookManagementView(tk.Toplevel):
             ("Total", 60), ("Available", 70), ("Shelf", 80), ("Added By", 120)
         ]
 
-        self.tree = ttk.Treeview(
-            tree_frame,
-            columns=[col[0] for col in columns],
-            show="headings",
-            selectmode="browse",
-            style='Treeview'
-        )
-
-        for col, width in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=width, minwidth=width, anchor="w") # Use minwidth and anchor "w"
-
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
-        # Place scrollbar next to treeview correctly
-        scrollbar.pack(side="right", fill="y")
-        self.tree.pack(side="left", fill=tk.BOTH, expand=True)
+        # Rows are fetched a page at a time as the list scrolls
+        self.book_list = VirtualTreeview(tree_frame, columns, self._book_row_values,
+                                         page_size=self.page_size, row_key=lambda book: book.book_id,
+                                         style='Card.TFrame')
+        self.book_list.pack(fill=tk.BOTH, expand=True)
+        self.tree = self.book_list.tree
+        self.search = bind_search(self.search_entry, self.book_list, self._book_source)
+        # Edits from any desk are patched into the loaded rows
+        self.changes = follow_changes(self.book_list, 'book', BookService.get_books_by_ids)
 
 
         # Button frame
@@ -151,66 +144,44 @@ class BookManagementView(tk.Toplevel):
             ("➕ Add New", self._open_add_dialog, 'Success.TButton'),
             ("✏️ Update", self._open_update_dialog, 'Primary.TButton'),
             ("🗑️ Delete", self._delete_selected, 'Danger.TButton'),
-            ("🔍 Details", self._view_book_details, 'TButton') # Standard TButton
+            ("🔍 Details", self._view_book_details, 'TButton'), # Standard TButton
+            ("📥 Import", self._import_books, 'TButton')
         ]
 
         for text, command, style in buttons_data:
             btn = ttk.Button(button_frame, text=text, command=command, style=style)
             btn.pack(side=tk.LEFT, padx=(0,10))
 
+        self.import_status = ttk.Label(button_frame, text="", font=self.font_normal,
+                                       background=self.fg_color, foreground=self.text_secondary_color)
+        self.import_status.pack(side=tk.RIGHT)
+
 
     def _load_books(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-
-        books = BookService.get_all_books()
-        for book in books:
-            added_by_name = UserService.get_user_name(book.added_by) or f"User #{book.added_by}"
-            self.tree.insert('', 'end', values=(
-                book.book_id,
-                book.isbn,
-                book.title,
-                book.author,
-                book.publisher,
-                book.publication_year,
-                book.category,
-                book.total_copies,
-                book.available_copies,
-                book.shelf_location,
-                added_by_name
-            ))
-
-    def _search_books(self, event=None):
-        search_term = self.search_entry.get().lower()
-        if not search_term:
-            self._load_books()
-            return
+        self.book_list.set_source(self._book_source(""))
 
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-
-        books = BookService.get_all_books()
-        for book in books:
-            if (search_term in str(book.book_id).lower() or
-                    search_term in book.isbn.lower() or
-                    search_term in book.title.lower() or
-                    search_term in book.author.lower() or
-                    (book.publisher and search_term in book.publisher.lower()) or # Check for None
-                    (book.category and search_term in book.category.lower())):    # Check for None
-                added_by_name = UserService.get_user_name(book.added_by) or f"User #{book.added_by}"
-                self.tree.insert('', 'end', values=(
-                    book.book_id,
-                    book.isbn,
-                    book.title,
-                    book.author,
-                    book.publisher,
-                    book.publication_year,
-                    book.category,
-                    book.total_copies,
-                    book.available_copies,
-                    book.shelf_location,
-                    added_by_name
-                ))
+    def _book_source(self, search_term):
+        if not search_term:
+            return keyset_source(BookService.get_books_page, BookService.page_key)
+        # Ranked FULLTEXT search in the database, paged like the full list
+        return offset_source(
+            lambda limit, offset: BookService.search_books(search_term, limit=limit, offset=offset))
+
+    def _book_row_values(self, book):
+        added_by_name = book.added_by_name or f"User #{book.added_by}"
+        return (
+            book.book_id,
+            book.isbn,
+            book.title,
+            book.author,
+            book.publisher,
+            book.publication_year,
+            book.category,
+            book.total_copies,
+            book.available_copies,
+            book.shelf_location,
+            added_by_name
+        )
 
     def _open_add_dialog(self):
         self._book_dialog("Add New Book", self._save_new_book)
@@ -237,7 +208,7 @@ class BookManagementView(tk.Toplevel):
         book = BookService.get_book_by_id(book_id)
 
         if book:
-            added_by_name = UserService.get_user_name(book.added_by) or f"User #{book.added_by}"
+            added_by_name = book.added_by_name or f"User #{book.added_by}"
             details = (
                 f"Book ID: {book.book_id}\n"
                 f"ISBN: {book.isbn}\n"
@@ -378,11 +349,44 @@ class BookManagementView(tk.Toplevel):
 
         if BookService.update_book(book_data):
             window.destroy()
-            self._load_books()
+            self.changes.poll_now()
             messagebox.showinfo("Success", "Book updated successfully.", parent=self)
         else:
             error_label_dialog.config(text="Failed to update book. Data may be invalid.")
 
+    def _import_books(self):
+        path = filedialog.askopenfilename(parent=self, title="Import Books", filetypes=[
+            ("Catalogue files", "*.csv *.mrc *.marc *.xml *.marcxml"), ("All files", "*.*")])
+        if not path:
+            return
+
+        self.import_status.config(text="Importing...")
+        BackgroundTask(
+            self,
+            lambda progress: ImportService.import_books(path, added_by=self.current_user.user_id,
+                                                        progress=lambda result: progress(dict(result))),
+            on_done=self._import_finished, on_error=self._import_failed, on_progress=self._import_progress)
+
+    def _import_progress(self, result):
+        self.import_status.config(text=f"Imported {result['read']} record(s), "
+                                       f"{result['rows_per_second']:.0f}/s, {result['failed']} failed")
+
+    def _import_failed(self, message):
+        self.import_status.config(text="")
+        messagebox.showerror("Import Failed", message, parent=self)
+
+    def _import_finished(self, result):
+        self.import_status.config(text="")
+        self._load_books()
+        summary = (f"{result['added']} new book(s), {result['merged']} existing book(s) given more copies, "
+                   f"{result['copies']} copies in {result['seconds']:.1f}s.")
+        if result['failed']:
+            errors = "\n".join(f"Record {position}: {message}" for position, message in result['errors'][:10])
+            messagebox.showwarning("Import Finished With Errors",
+                                   f"{summary}\n\n{result['failed']} record(s) skipped:\n{errors}", parent=self)
+        else:
+            messagebox.showinfo("Import Finished", summary, parent=self)
+
     def _delete_selected(self):
         selected = self.tree.selection()
         if not selected:
@@ -400,6 +404,6 @@ class BookManagementView(tk.Toplevel):
         ):
             if BookService.delete_book(book_id):
                 messagebox.showinfo("Success", "Book deleted successfully.", parent=self)
-                self._load_books()
+                self.changes.poll_now()
             else:
                 messagebox.showerror("Error", "Failed to delete book. Book may be currently loaned or part of other records.", parent=self)
\ No newline at end of file
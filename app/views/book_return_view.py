@@ -1,8 +1,8 @@
 # book_return_view.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
 from app.services.loan_service import LoanService
+from app.views.base_view import VirtualTreeview, bind_search, follow_changes, keyset_source
 
 
 class BookReturnView(tk.Toplevel):
@@ -82,7 +82,6 @@ class BookReturnView(tk.Toplevel):
         ttk.Label(search_frame, text="🔍 Search:").pack(side=tk.LEFT, padx=(0, 5))
         self.search_entry = ttk.Entry(search_frame)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
-        self.search_entry.bind('<KeyRelease>', self._search_loans)
 
         # Treeview frame
         tree_frame = ttk.Frame(main_frame)
@@ -95,19 +94,15 @@ class BookReturnView(tk.Toplevel):
             ("Days Overdue", 90), ("Fine Amount", 100), ("Status", 80)
         ]
 
-        self.loans_tree = ttk.Treeview(tree_frame, columns=[col[0] for col in columns],
-                                       show="headings")
-
-        for col, width in columns:
-            anchor = "w" if col in ["Title", "Member Name"] else "center"
-            self.loans_tree.heading(col, text=col)
-            self.loans_tree.column(col, width=width, anchor=anchor)
-
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical",
-                                  command=self.loans_tree.yview)
-        self.loans_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
-        self.loans_tree.pack(side="left", fill=tk.BOTH, expand=True)
+        columns = [(col, width, "w" if col in ["Title", "Member Name"] else "center")
+                   for col, width in columns]
+        self.loans_list = VirtualTreeview(tree_frame, columns, self._loan_row_values,
+                                          row_tags=self._loan_row_tags, row_key=lambda loan: loan['loan_id'])
+        self.loans_list.pack(fill=tk.BOTH, expand=True)
+        self.loans_tree = self.loans_list.tree
+        self.search = bind_search(self.search_entry, self.loans_list, self._loan_source)
+        # Loans returned at any desk drop out of the list, swept ones are redrawn
+        self.changes = follow_changes(self.loans_list, 'loan', LoanService.get_active_loans_by_ids)
 
         # Button frame
         button_frame = ttk.Frame(main_frame)
@@ -115,56 +110,38 @@ class BookReturnView(tk.Toplevel):
 
         ttk.Button(button_frame, text="↩️ Process Return",
                    command=self._return_book,
-                   style='Success.TButton').pack()
-
-    def _load_active_loans(self, search_term=None):
-        for row in self.loans_tree.get_children():
-            self.loans_tree.delete(row)
-
-        # Use get_active_loans() instead of get_active_loans_detailed()
-        loans = LoanService.get_active_loans()
-
-        for loan in loans:
-            issue_date = loan.get('issue_date', 'N/A')
-            due_date = loan.get('due_date', 'N/A')
-
-            # Calculate days overdue
-            days_overdue = 0
-            fine_amount = 0
-            tags = ()
-
-            if isinstance(due_date, str) and due_date != 'N/A':
-                try:
-                    due_date = datetime.strptime(due_date, '%Y-%m-%d')
-                    if datetime.now() > due_date:
-                        days_overdue = (datetime.now() - due_date).days
-                        fine_amount = days_overdue * 5.0  # $5 per day
-                        tags = ('overdue',)
-                except ValueError:
-                    pass
-
-            self.loans_tree.insert('', 'end', values=(
-                loan.get('loan_id', 'N/A'),
-                loan.get('book_id', 'N/A'),
-                loan.get('title', 'N/A'),
-                loan.get('member_id', 'N/A'),
-                loan.get('member_name', 'N/A'),
-                str(issue_date),
-                str(due_date),
-                days_overdue,
-                f"${fine_amount:.2f}",
-                "Overdue" if days_overdue > 0 else "Active"
-            ), tags=tags)
-
-    def _search_loans(self, event=None):
-        search_term = self.search_entry.get().lower()
-        for item in self.loans_tree.get_children():
-            values = [str(v).lower() for v in self.loans_tree.item(item)['values']]
-            if any(search_term in v for v in values):
-                self.loans_tree.selection_set(item)
-                self.loans_tree.focus(item)
-                self.loans_tree.see(item)
-                break
+                   style='Success.TButton').pack(side=tk.LEFT, expand=True, anchor='e', padx=(0, 10))
+        ttk.Button(button_frame, text="📦 Batch Return",
+                   command=self._open_batch_return_dialog,
+                   style='Primary.TButton').pack(side=tk.LEFT, expand=True, anchor='w')
+
+    def _load_active_loans(self):
+        # Keep the current filter when refreshing after a return
+        self.loans_list.set_source(self._loan_source(self.search_entry.get().strip()))
+
+    def _loan_source(self, search_term):
+        # Soonest due first, fetched a page at a time as the list scrolls
+        return keyset_source(
+            lambda after_key, limit: LoanService.get_active_loans_page(after_key, limit, search=search_term),
+            LoanService.page_key)
+
+    def _loan_row_tags(self, loan):
+        return ('overdue',) if loan.get('loan_status') == 'overdue' else ()
+
+    def _loan_row_values(self, loan):
+        # Status and accrued fine are kept current by LoanService.sweep_overdue
+        return (
+            loan.get('loan_id', 'N/A'),
+            loan.get('book_id', 'N/A'),
+            loan.get('title', 'N/A'),
+            loan.get('member_id', 'N/A'),
+            loan.get('member_name', 'N/A'),
+            str(loan.get('issue_date', 'N/A')),
+            str(loan.get('due_date', 'N/A')),
+            loan.get('days_overdue') or 0,
+            f"${float(loan.get('fine_amount') or 0):.2f}",
+            "Overdue" if loan.get('loan_status') == 'overdue' else "Active"
+        )
 
     def _return_book(self):
         selected = self.loans_tree.selection()
@@ -181,6 +158,66 @@ class BookReturnView(tk.Toplevel):
                                parent=self):
             if LoanService.return_loan(loan_id):
                 messagebox.showinfo("Success", "Book returned successfully", parent=self)
-                self._load_active_loans()
+                self.changes.poll_now()
             else:
-                messagebox.showerror("Error", "Failed to return book", parent=self)
\ No newline at end of file
+                messagebox.showerror("Error", "Failed to return book", parent=self)
+
+    def _open_batch_return_dialog(self):
+        dialog = tk.Toplevel(self)
+        dialog.title("📦 Batch Return")
+        dialog.geometry("420x460")
+        dialog.configure(bg=self.fg_color)
+        dialog.grab_set()
+
+        frame = ttk.Frame(dialog, style='Card.TFrame', padding=20)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(frame, text="Scan or paste IDs (one per line, or separated by commas):",
+                  background=self.fg_color).pack(anchor='w', pady=(0, 8))
+
+        id_kind = tk.StringVar(value='book')
+        kind_frame = ttk.Frame(frame, style='Card.TFrame')
+        kind_frame.pack(fill=tk.X, pady=(0, 8))
+        ttk.Radiobutton(kind_frame, text="Book IDs (scanned copies)", variable=id_kind,
+                        value='book').pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Radiobutton(kind_frame, text="Loan IDs", variable=id_kind, value='loan').pack(side=tk.LEFT)
+
+        ids_text = tk.Text(frame, height=14, font=self.font_normal, relief='solid', borderwidth=1)
+        ids_text.pack(fill=tk.BOTH, expand=True)
+        ids_text.focus_set()
+
+        ttk.Button(frame, text="↩️ Return All", style='Success.TButton',
+                   command=lambda: self._process_batch_return(dialog, ids_text.get("1.0", tk.END), id_kind.get())
+                   ).pack(pady=(12, 0))
+
+    def _process_batch_return(self, dialog, raw_ids, id_kind):
+        tokens = raw_ids.replace(',', ' ').split()
+        invalid = [token for token in tokens if not token.isdigit()]
+        if invalid:
+            messagebox.showerror("Invalid Input", f"Not a valid ID: {', '.join(invalid[:5])}", parent=dialog)
+            return
+        ids = [int(token) for token in tokens]
+        if not ids:
+            messagebox.showwarning("No IDs", "Please scan or paste at least one ID.", parent=dialog)
+            return
+
+        if id_kind == 'loan':
+            summary = LoanService.return_loans(loan_ids=ids)
+        else:
+            summary = LoanService.return_loans(book_ids=ids)
+
+        if summary.get('error'):
+            messagebox.showerror("Error", "Batch return failed; nothing was returned.", parent=dialog)
+            return
+
+        message = (f"Returned: {len(summary['returned'])}\n"
+                   f"Fines assessed: {len(summary['fines'])} (${summary['total_fines']:.2f})")
+        if summary['not_found']:
+            shown = ", ".join(str(i) for i in summary['not_found'][:20])
+            message += f"\nNo open loan for: {shown}"
+            if len(summary['not_found']) > 20:
+                message += f" (+{len(summary['not_found']) - 20} more)"
+
+        dialog.destroy()
+        messagebox.showinfo("Batch Return Complete", message, parent=self)
+        self.changes.poll_now()
@@ -0,0 +1,145 @@
+# db_diagnostics_view.py
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from app.database.db_handler import db
+
+REFRESH_MS = 2000
+SORT_KEYS = {"Total time": 'total_ms', "Mean time": 'mean_ms', "p95": 'p95_ms', "Max time": 'max_ms',
+             "Calls": 'calls', "Rows": 'rows', "Errors": 'errors'}
+
+
+class DBDiagnosticsView(tk.Toplevel):
+    """Live per-query timings from db.stats, hottest first"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("🩺 DB Diagnostics")
+        self.geometry("1200x750")
+        self.minsize(900, 600)
+
+        self.bg_color = "#f0f2f5"
+        self.card_color = "#ffffff"
+        self.header_color = "#2c3e50"
+        self.primary_color = "#3498db"
+        self.text_color = "#212529"
+        self.light_text = "#ffffff"
+
+        self.queries = {}  # Treeview item -> snapshot row
+        self.configure(bg=self.bg_color)
+        self._setup_styles()
+        self._create_widgets()
+        self._refresh()
+
+    def _setup_styles(self):
+        self.style = ttk.Style(self)
+        self.style.theme_use('clam')
+        self.style.configure('TFrame', background=self.bg_color)
+        self.style.configure('TLabel', background=self.bg_color,
+                             foreground=self.text_color, font=('Segoe UI', 10))
+        self.style.configure('Header.TLabel', font=('Segoe UI', 16, 'bold'),
+                             foreground=self.header_color)
+        self.style.configure('Treeview', font=('Segoe UI', 10), rowheight=26,
+                             fieldbackground=self.card_color, background=self.card_color)
+        self.style.configure('Treeview.Heading', font=('Segoe UI', 10, 'bold'),
+                             background=self.header_color, foreground=self.light_text, relief='flat')
+        self.style.map('Treeview.Heading', background=[('active', self.primary_color)])
+
+    def _create_widgets(self):
+        main_frame = ttk.Frame(self, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # Header and controls
+        header_frame = ttk.Frame(main_frame)
+        header_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(header_frame, text="DB Diagnostics", style='Header.TLabel').pack(side=tk.LEFT)
+
+        ttk.Button(header_frame, text="💾 Save JSON", command=self._save).pack(side=tk.RIGHT)
+        ttk.Button(header_frame, text="Reset", command=self._reset).pack(side=tk.RIGHT, padx=(0, 10))
+        self.recording = tk.BooleanVar(value=db.stats.enabled)
+        ttk.Checkbutton(header_frame, text="Record queries", variable=self.recording,
+                        command=lambda: db.stats.configure(enabled=self.recording.get())
+                        ).pack(side=tk.RIGHT, padx=(0, 10))
+        self.sort_choice = ttk.Combobox(header_frame, values=list(SORT_KEYS), state='readonly', width=12)
+        self.sort_choice.current(0)
+        self.sort_choice.bind("<<ComboboxSelected>>", lambda e: self._refresh(reschedule=False))
+        self.sort_choice.pack(side=tk.RIGHT, padx=(0, 10))
+        ttk.Label(header_frame, text="Sort by").pack(side=tk.RIGHT, padx=(0, 5))
+
+        self.pool_label = ttk.Label(main_frame, text="")
+        self.pool_label.pack(fill=tk.X, pady=(0, 10))
+
+        # One row per normalised query
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        columns = [("Query", 460), ("Calls", 70), ("Total ms", 90), ("Mean ms", 80), ("p95 ms", 80),
+                   ("Max ms", 80), ("Rows", 80), ("Errors", 60), ("Top caller", 220)]
+        self.tree = ttk.Treeview(tree_frame, columns=[name for name, width in columns], show='headings')
+        for name, width in columns:
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=width, anchor=tk.W if name in ("Query", "Top caller") else tk.E)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self._show_details())
+
+        # Full text, callers and histogram of the selected query
+        self.details = tk.Text(main_frame, height=10, font=('Consolas', 10), wrap=tk.WORD)
+        self.details.pack(fill=tk.X, pady=(10, 0))
+
+    def _refresh(self, reschedule=True):
+        if not self.winfo_exists():
+            return
+        pool = db.pool_stats()
+        statements = db.statement_cache_stats()
+        slow_log = db.stats.slow_query_log or "off"
+        self.pool_label.config(text=f"Pool: {pool['in_use']} in use / {pool['size']} open (max {pool['max_size']}), "
+                                    f"{pool['checkouts']:,} checkouts, avg wait {pool['avg_wait_ms']:.2f} ms, "
+                                    f"{pool['timeouts']} timeout(s)    Prepared statements: "
+                                    f"{statements['hit_rate']:.0%} hit rate, {statements['evictions']:,} evicted    "
+                                    f"Slow-query log (>= {db.stats.slow_query_ms} ms): {slow_log}")
+
+        selected = [self.queries[item]['query'] for item in self.tree.selection() if item in self.queries]
+        self.tree.delete(*self.tree.get_children())
+        self.queries = {}
+        for query in db.stats.snapshot(sort=SORT_KEYS[self.sort_choice.get()]):
+            top_caller = next(iter(query['callers']), None)
+            item = self.tree.insert('', tk.END, values=(
+                query['query'], f"{query['calls']:,}", f"{query['total_ms']:,.1f}", f"{query['mean_ms']:.2f}",
+                f"{query['p95_ms']:.2f}", f"{query['max_ms']:.2f}", f"{query['rows']:,}", query['errors'],
+                top_caller or ""))
+            self.queries[item] = query
+            if query['query'] in selected:
+                self.tree.selection_add(item)
+        if reschedule:
+            self.after(REFRESH_MS, self._refresh)
+
+    def _show_details(self):
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.queries:
+            return
+        query = self.queries[selection[0]]
+        lines = [query['query'], "", "Callers:"]
+        lines += [f"  {count:>8,}  {caller}" for caller, count in query['callers'].items()]
+        lines += ["", "Latency:"]
+        peak = max(query['histogram'].values()) or 1
+        for bucket, count in query['histogram'].items():
+            if count:
+                lines.append(f"  {bucket:>10} {count:>8,}  {'█' * max(1, round(count / peak * 40))}")
+        self.details.delete('1.0', tk.END)
+        self.details.insert('1.0', "\n".join(lines))
+
+    def _reset(self):
+        db.stats.reset()
+        self.details.delete('1.0', tk.END)
+        self._refresh(reschedule=False)
+
+    def _save(self):
+        path = filedialog.asksaveasfilename(parent=self, title="Save DB statistics", defaultextension=".json",
+                                            initialfile="db_stats.json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            db.dump_stats(path)
+        except OSError as e:
+            messagebox.showerror("Save Failed", str(e), parent=self)
@@ -1,37 +1,8 @@
 # fine_calculation_view.py
 import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime
-
-class FineService:
-    @staticmethod
-    def get_all_fines_detailed():
-        return [
-            {
-                'fine_id': 1,
-                'loan_id': 101,
-                'book_title': 'Raja Gidh',
-                'member_name': 'Ali Hassan',
-                'amount': 5.00,
-                'due_date': datetime(2024, 12, 1),
-                'paid_date': None,
-                'status': 'Pending'
-            },
-            {
-                'fine_id': 2,
-                'loan_id': 102,
-                'book_title': 'Moth Smoke',
-                'member_name': 'Fatima Ali',
-                'amount': 10.00,
-                'due_date': datetime(2024, 11, 15),
-                'paid_date': datetime(2024, 12, 5),
-                'status': 'Paid'
-            }
-        ]
-
-    @staticmethod
-    def mark_fine_as_paid(fine_id):
-        return True  # Simulate success
+from tkinter import ttk, messagebox, simpledialog
+from app.services.fine_service import FineService
+from app.views.base_view import VirtualTreeview, bind_search, keyset_source
 
 
 class FineManagementView(tk.Toplevel):
@@ -102,10 +73,9 @@ class FineManagementView(tk.Toplevel):
         ttk.Label(filter_frame, text="🔍 Search:", style='TLabel').pack(side=tk.LEFT)
         self.search_entry = ttk.Entry(filter_frame, width=30)
         self.search_entry.pack(side=tk.LEFT, padx=(5, 20))
-        self.search_entry.bind('<KeyRelease>', self._filter_data)
 
         ttk.Label(filter_frame, text="Status:", style='TLabel').pack(side=tk.LEFT)
-        self.status_filter = ttk.Combobox(filter_frame, values=["All", "Pending", "Paid"], width=15, state="readonly")
+        self.status_filter = ttk.Combobox(filter_frame, values=["All", "Pending", "Paid", "Waived"], width=15, state="readonly")
         self.status_filter.current(0)
         self.status_filter.pack(side=tk.LEFT)
         self.status_filter.bind("<<ComboboxSelected>>", self._filter_data)
@@ -113,72 +83,105 @@ class FineManagementView(tk.Toplevel):
         tree_frame = ttk.Frame(card, style='Card.TFrame')
         tree_frame.pack(fill=tk.BOTH, expand=True)
 
-        cols = ["Fine ID", "Loan ID", "Book Title", "Member Name", "Amount", "Due Date", "Paid Date", "Status"]
-        self.fines_tree = ttk.Treeview(tree_frame, columns=cols, show="headings")
+        cols = [("Loan ID", 80), ("Book Title", 220), ("Member Name", 170), ("Amount", 90),
+                ("Outstanding", 100), ("Due Date", 100), ("Returned", 100), ("Status", 80)]
+        cols = [(col, width, "w" if col in ["Book Title", "Member Name"] else "center") for col, width in cols]
+        self.fines_list = VirtualTreeview(tree_frame, cols, self._fine_row_values, row_tags=self._fine_row_tags)
+        self.fines_list.pack(fill=tk.BOTH, expand=True)
+        self.fines_tree = self.fines_list.tree
         self.fines_tree.tag_configure('paid', foreground=self.success_dark_color)
         self.fines_tree.tag_configure('pending', foreground=self.danger_color)
-
-        for col in cols:
-            anchor = "w" if col in ["Book Title", "Member Name"] else "center"
-            self.fines_tree.heading(col, text=col, anchor=anchor)
-            self.fines_tree.column(col, width=120, anchor=anchor)
-
-        scroll = ttk.Scrollbar(tree_frame, orient="vertical", command=self.fines_tree.yview)
-        self.fines_tree.configure(yscrollcommand=scroll.set)
-        scroll.pack(side="right", fill="y")
-        self.fines_tree.pack(side="left", fill=tk.BOTH, expand=True)
+        self.fines_tree.tag_configure('waived', foreground=self.text_color)
+        self.search = bind_search(self.search_entry, self.fines_list, self._fine_source,
+                                  filters=self.status_filter.get)
 
         btn_frame = ttk.Frame(card, style='Card.TFrame')
         btn_frame.pack(fill=tk.X, pady=(10, 0))
 
         ttk.Button(btn_frame, text="💵 Mark Selected as Paid", style="Success.TButton",
                    command=self._mark_paid).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="🧾 Record Partial Payment", style="Primary.TButton",
+                   command=self._record_payment).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="✋ Waive Fine", style="Primary.TButton",
+                   command=self._waive).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(btn_frame, text="🔄 Refresh List", style="Primary.TButton",
                    command=self._load_fines_data).pack(side=tk.LEFT)
 
-    def _load_fines_data(self, search_term=None, status=None):
-        self.fines_tree.delete(*self.fines_tree.get_children())
-        search_term = self.search_entry.get().lower().strip() if search_term is None else search_term
-        status = self.status_filter.get() if status is None else status
-
-        for fine in FineService.get_all_fines_detailed():
-            fine_status = fine['status'].capitalize()
-            if status != "All" and fine_status != status:
-                continue
-            if search_term and not any(search_term in str(fine.get(key, '')).lower()
-                                       for key in ['fine_id', 'loan_id', 'book_title', 'member_name']):
-                continue
-
-            due_str = fine['due_date'].strftime("%Y-%m-%d") if fine['due_date'] else "N/A"
-            paid_str = fine['paid_date'].strftime("%Y-%m-%d") if fine['paid_date'] else "N/A"
-            amount_str = f"${fine['amount']:.2f}"
-            tag = 'paid' if fine_status == 'Paid' else 'pending'
-
-            self.fines_tree.insert('', 'end', values=(
-                fine['fine_id'], fine['loan_id'], fine['book_title'], fine['member_name'],
-                amount_str, due_str, paid_str, fine_status
-            ), tags=(tag,))
+    def _load_fines_data(self):
+        # One indexed query for the first page; the rest load as the list scrolls
+        self.fines_list.set_source(self._fine_source(self.search_entry.get().strip(), self.status_filter.get()))
+
+    def _fine_source(self, search_term, status):
+        # Runs on the search worker too, so the status is read on the Tk thread and passed in
+        return keyset_source(
+            lambda after_key, limit: FineService.query_fines(status, search_term, limit, after_key),
+            FineService.page_key)
+
+    def _fine_row_tags(self, fine):
+        return (fine['fine_status'],)
+
+    def _fine_row_values(self, fine):
+        return (
+            fine['loan_id'],
+            fine['book_title'],
+            fine['member_name'],
+            f"${float(fine['fine_amount']):.2f}",
+            f"${float(fine['outstanding'] or 0):.2f}",
+            str(fine['due_date'])[:10] if fine['due_date'] else "N/A",
+            str(fine['return_date'])[:10] if fine['return_date'] else "N/A",
+            fine['fine_status'].capitalize()
+        )
 
     def _filter_data(self, event=None):
+        self.search.cancel()  # a search still running was scheduled under the old status
         self._load_fines_data()
 
-    def _mark_paid(self):
+    def _selected_fine(self):
+        """(loan_id, outstanding) of the selected pending fine, or None after telling the user why not"""
         selected = self.fines_tree.selection()
         if not selected:
-            messagebox.showwarning("No Selection", "Please select a fine to mark as paid.", parent=self)
-            return
+            messagebox.showwarning("No Selection", "Please select a fine first.", parent=self)
+            return None
 
-        item = self.fines_tree.item(selected[0])
-        fine_id = item['values'][0]
-        status = item['values'][7]
+        values = self.fines_tree.item(selected[0])['values']
+        loan_id, outstanding, status = values[0], float(str(values[4]).lstrip('$')), values[7]
+        if status != "Pending":
+            messagebox.showinfo("Nothing Owed", f"The fine on loan {loan_id} is already {status.lower()}.",
+                                parent=self)
+            return None
+        return loan_id, outstanding
 
-        if status == "Paid":
-            messagebox.showinfo("Already Paid", f"Fine ID {fine_id} is already marked as paid.", parent=self)
+    def _mark_paid(self):
+        fine = self._selected_fine()
+        if fine is None:
             return
-
-        if messagebox.askyesno("Confirm", f"Mark fine ID {fine_id} as paid?", parent=self):
-            if FineService.mark_fine_as_paid(fine_id):
-                messagebox.showinfo("Success", f"Fine ID {fine_id} marked as paid.", parent=self)
-                self._load_fines_data()
-            else:
-                messagebox.showerror("Error", "Failed to mark fine as paid.", parent=self)
+        loan_id, outstanding = fine
+        if messagebox.askyesno("Confirm", f"Record full payment of ${outstanding:.2f} for loan {loan_id}?",
+                               parent=self):
+            self._post(FineService.pay_fine(loan_id), f"The fine on loan {loan_id} was marked as paid.")
+
+    def _record_payment(self):
+        fine = self._selected_fine()
+        if fine is None:
+            return
+        loan_id, outstanding = fine
+        amount = simpledialog.askfloat("Partial Payment", f"Amount paid towards ${outstanding:.2f}:",
+                                       minvalue=0.01, maxvalue=outstanding, parent=self)
+        if amount is not None:
+            self._post(FineService.pay_fine(loan_id, amount), f"Recorded ${amount:.2f} against loan {loan_id}.")
+
+    def _waive(self):
+        fine = self._selected_fine()
+        if fine is None:
+            return
+        loan_id, outstanding = fine
+        if messagebox.askyesno("Confirm", f"Waive the remaining ${outstanding:.2f} on loan {loan_id}?",
+                               parent=self):
+            self._post(FineService.waive_fine(loan_id), f"The fine on loan {loan_id} was waived.")
+
+    def _post(self, posted, message):
+        if posted:
+            messagebox.showinfo("Success", message, parent=self)
+            self._load_fines_data()
+        else:
+            messagebox.showerror("Error", "The fine could not be updated; it may have changed.", parent=self)
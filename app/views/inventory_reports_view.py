@@ -1,10 +1,10 @@
 # inventory_reports_view.py
 import tkinter as tk
-from tkinter import ttk, messagebox
-from app.services.report_service import ReportService
+from tkinter import ttk, messagebox, filedialog
+from app.services.report_service import EXPORT_REPORTS, ReportService
+from app.views.base_view import BackgroundTask, VirtualTreeview, follow_changes, keyset_source
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from collections import defaultdict
 
 
 class InventoryReportsView(tk.Toplevel):
@@ -77,6 +77,15 @@ class InventoryReportsView(tk.Toplevel):
         ttk.Label(header_frame, text="Inventory Reports Dashboard",
                   style='Header.TLabel').pack(side=tk.LEFT)
 
+        # Export any report to a file in the background
+        self.export_titles = {title: name for name, (title, query, columns) in EXPORT_REPORTS.items()}
+        ttk.Button(header_frame, text="📤 Export", command=self._export_report).pack(side=tk.RIGHT)
+        self.export_choice = ttk.Combobox(header_frame, values=list(self.export_titles), state='readonly', width=18)
+        self.export_choice.current(0)
+        self.export_choice.pack(side=tk.RIGHT, padx=(0, 10))
+        self.export_status = ttk.Label(header_frame, text="")
+        self.export_status.pack(side=tk.RIGHT, padx=(0, 10))
+
         # Notebook for tabs
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True)
@@ -87,6 +96,33 @@ class InventoryReportsView(tk.Toplevel):
         self._create_all_books_tab()
         self._create_available_books_tab()
 
+    def _export_report(self):
+        title = self.export_choice.get()
+        path = filedialog.asksaveasfilename(parent=self, title=f"Export {title}", defaultextension=".csv",
+                                            initialfile=self.export_titles[title], filetypes=[
+                                                ("CSV", "*.csv"), ("Excel workbook", "*.xlsx"),
+                                                ("Parquet", "*.parquet")])
+        if not path:
+            return
+
+        self.export_status.config(text=f"Exporting {title}...")
+        BackgroundTask(
+            self, lambda progress: ReportService.export(self.export_titles[title], None, path, progress=progress),
+            on_done=self._export_finished, on_error=self._export_failed,
+            on_progress=lambda rows: self.export_status.config(text=f"{rows:,} row(s) written..."))
+
+    def _export_failed(self, message):
+        self.export_status.config(text="")
+        messagebox.showerror("Export Failed", message, parent=self)
+
+    def _export_finished(self, result):
+        if 'error' in result:
+            self._export_failed(result['error'])
+            return
+        self.export_status.config(text="")
+        messagebox.showinfo("Export Finished", f"Exported {result['rows']:,} row(s) to {result['path']} "
+                                               f"in {result['seconds']:.1f}s.", parent=self)
+
     def _create_tab_frame(self, tab_text):
         tab = ttk.Frame(self.notebook, style='Card.TFrame', padding=15)
         self.notebook.add(tab, text=tab_text)
@@ -105,19 +141,11 @@ class InventoryReportsView(tk.Toplevel):
             ("Category", 150), ("Total", 80), ("Available", 80), ("Shelf", 100)
         ]
 
-        self.all_books_tree = ttk.Treeview(tree_frame, columns=[col[0] for col in columns],
-                                           show="headings", style='Treeview')
-
-        for col, width in columns:
-            self.all_books_tree.heading(col, text=col)
-            self.all_books_tree.column(col, width=width, anchor='w')
-
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical",
-                                  command=self.all_books_tree.yview)
-        self.all_books_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
-        self.all_books_tree.pack(side="left", fill=tk.BOTH, expand=True)
+        self.all_books_list = VirtualTreeview(tree_frame, columns, self._all_books_row_values,
+                                              row_key=lambda book: book['book_id'], style='Card.TFrame')
+        self.all_books_list.pack(fill=tk.BOTH, expand=True)
+        self.all_books_tree = self.all_books_list.tree
+        follow_changes(self.all_books_list, 'book', ReportService.get_books_by_ids)
 
         # Load data
         self._load_all_books()
@@ -135,19 +163,12 @@ class InventoryReportsView(tk.Toplevel):
             ("Category", 150), ("Available", 100), ("Shelf", 120)
         ]
 
-        self.available_books_tree = ttk.Treeview(tree_frame, columns=[col[0] for col in columns],
-                                                 show="headings", style='Treeview')
-
-        for col, width in columns:
-            self.available_books_tree.heading(col, text=col)
-            self.available_books_tree.column(col, width=width, anchor='w')
-
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical",
-                                  command=self.available_books_tree.yview)
-        self.available_books_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
-        self.available_books_tree.pack(side="left", fill=tk.BOTH, expand=True)
+        self.available_books_list = VirtualTreeview(tree_frame, columns, self._available_books_row_values,
+                                                    row_key=lambda book: book['book_id'], style='Card.TFrame')
+        self.available_books_list.pack(fill=tk.BOTH, expand=True)
+        self.available_books_tree = self.available_books_list.tree
+        follow_changes(self.available_books_list, 'book', lambda book_ids: [
+            book for book in ReportService.get_books_by_ids(book_ids) if book['available_copies'] > 0])
 
         # Load data
         self._load_available_books()
@@ -228,64 +249,36 @@ class InventoryReportsView(tk.Toplevel):
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
     def _load_all_books(self):
-        for row in self.all_books_tree.get_children():
-            self.all_books_tree.delete(row)
-
-        books = ReportService.get_all_books()
-        for book in books:
-            self.all_books_tree.insert('', 'end', values=(
-                book.get('book_id', 'N/A'),
-                book.get('title', 'N/A'),
-                book.get('author', 'N/A'),
-                book.get('category', 'N/A'),
-                book.get('total_copies', 0),
-                book.get('available_copies', 0),
-                book.get('shelf_location', 'N/A')
-            ))
+        self.all_books_list.set_source(keyset_source(ReportService.get_books_page, ReportService.page_key))
+
+    def _all_books_row_values(self, book):
+        return (
+            book.get('book_id', 'N/A'),
+            book.get('title', 'N/A'),
+            book.get('author', 'N/A'),
+            book.get('category', 'N/A'),
+            book.get('total_copies', 0),
+            book.get('available_copies', 0),
+            book.get('shelf_location', 'N/A')
+        )
 
     def _load_available_books(self):
-        for row in self.available_books_tree.get_children():
-            self.available_books_tree.delete(row)
-
-        books = ReportService.get_available_books()
-        for book in books:
-            self.available_books_tree.insert('', 'end', values=(
-                book.get('book_id', 'N/A'),
-                book.get('title', 'N/A'),
-                book.get('author', 'N/A'),
-                book.get('category', 'N/A'),
-                book.get('available_copies', 0),
-                book.get('shelf_location', 'N/A')
-            ))
+        self.available_books_list.set_source(keyset_source(
+            lambda after_key, limit: ReportService.get_books_page(after_key, limit, available_only=True),
+            ReportService.page_key))
+
+    def _available_books_row_values(self, book):
+        return (
+            book.get('book_id', 'N/A'),
+            book.get('title', 'N/A'),
+            book.get('author', 'N/A'),
+            book.get('category', 'N/A'),
+            book.get('available_copies', 0),
+            book.get('shelf_location', 'N/A')
+        )
 
     def _get_statistics(self):
-        all_books = ReportService.get_all_books()
-        total_unique = len(all_books)
-        total_copies = sum(book.get('total_copies', 0) for book in all_books)
-        available_copies = sum(book.get('available_copies', 0) for book in all_books)
-
-        authors = set(book.get('author') for book in all_books if book.get('author'))
-        categories = set(book.get('category') for book in all_books if book.get('category'))
-
-        # Calculate books on loan (simplified)
-        books_on_loan = total_copies - available_copies
-
-        return {
-            'total_unique_books': total_unique,
-            'total_copies_all': total_copies,
-            'total_available_copies': available_copies,
-            'total_authors': len(authors),
-            'total_categories': len(categories),
-            'books_on_loan': books_on_loan
-        }
+        return ReportService.get_inventory_summary()
 
     def _get_category_stats(self):
-        books = ReportService.get_all_books()
-        category_counts = defaultdict(int)
-
-        for book in books:
-            cat = book.get('category')
-            if cat:
-                category_counts[cat] += book.get('total_copies', 0)
-
-        return dict(sorted(category_counts.items(), key=lambda item: item[1], reverse=True))
\ No newline at end of file
+        return ReportService.get_category_counts()
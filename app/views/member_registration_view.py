@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from app.services.member_service import MemberService
 from app.services.user_service import UserService
+from app.views.base_view import VirtualTreeview, bind_search, follow_changes, keyset_source, offset_source
 
 
 class MemberRegistrationView(tk.Toplevel):
@@ -83,22 +84,18 @@ class MemberRegistrationView(tk.Toplevel):
         ttk.Label(search_frame, text="🔍", font=(self.font_family, 12), background=self.fg_color).pack(side=tk.LEFT, padx=(0, 8))
         self.search_entry = ttk.Entry(search_frame, width=40)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0,10))
-        self.search_entry.bind('<KeyRelease>', self._search_members)
 
         # Treeview
         tree_frame = ttk.Frame(content_card, style='Card.TFrame')
         tree_frame.pack(fill=tk.BOTH, expand=True, pady=(0,15))
 
-        columns = ["ID", "Name", "CNIC", "Phone", "Email", "City", "Status"]
-        self.member_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", selectmode="browse")
-        for col in columns:
-            self.member_tree.heading(col, text=col)
-            self.member_tree.column(col, anchor="w", width=130)
-
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.member_tree.yview)
-        self.member_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
-        self.member_tree.pack(side="left", fill=tk.BOTH, expand=True)
+        columns = [(col, 130) for col in ["ID", "Name", "CNIC", "Phone", "Email", "City", "Status"]]
+        self.member_list = VirtualTreeview(tree_frame, columns, self._member_row_values,
+                                           row_key=lambda member: member.member_id, style='Card.TFrame')
+        self.member_list.pack(fill=tk.BOTH, expand=True)
+        self.member_tree = self.member_list.tree
+        self.search = bind_search(self.search_entry, self.member_list, self._member_source)
+        self.changes = follow_changes(self.member_list, 'member', MemberService.get_members_by_ids)
 
         # Buttons
         button_frame = ttk.Frame(content_card, style='Card.TFrame')
@@ -113,16 +110,17 @@ class MemberRegistrationView(tk.Toplevel):
             ttk.Button(button_frame, text=text, command=cmd, style=style).pack(side=tk.LEFT, padx=(0, 10))
 
     def _load_members(self, search_term=None):
-        for row in self.member_tree.get_children():
-            self.member_tree.delete(row)
-        members = MemberService.search_members(search_term) if search_term else MemberService.get_all_members()
-        for m in members:
-            self.member_tree.insert('', 'end', values=(
-                m.member_id, f"{m.first_name} {m.last_name}", m.cnic or "N/A",
-                m.phone, m.email or "N/A", m.city or "N/A", m.membership_status.capitalize()))
+        self.member_list.set_source(self._member_source(search_term))
+
+    def _member_source(self, search_term):
+        if not search_term:
+            return keyset_source(MemberService.get_members_page, MemberService.page_key)
+        return offset_source(
+            lambda limit, offset: MemberService.search_members(search_term, limit=limit, offset=offset))
 
-    def _search_members(self, event=None):
-        self._load_members(self.search_entry.get().strip())
+    def _member_row_values(self, m):
+        return (m.member_id, f"{m.first_name} {m.last_name}", m.cnic or "N/A",
+                m.phone, m.email or "N/A", m.city or "N/A", m.membership_status.capitalize())
 
     def _open_add_dialog(self):
         self._member_dialog("Add New Member", self._save_new_member)
@@ -149,7 +147,8 @@ class MemberRegistrationView(tk.Toplevel):
                 f"ID: {m.member_id}\nName: {m.first_name} {m.last_name}\n"
                 f"Phone: {m.phone}\nEmail: {m.email or 'N/A'}\n"
                 f"Address: {m.address or 'N/A'}\nCity: {m.city or 'N/A'}\n"
-                f"Status: {m.membership_status.capitalize()}"
+                f"Status: {m.membership_status.capitalize()}\n"
+                f"Membership Type: {m.membership_type.capitalize()}"
             )
             messagebox.showinfo("Member Details", info, parent=self)
 
@@ -166,7 +165,8 @@ class MemberRegistrationView(tk.Toplevel):
         fields = [
             ("first_name", "First Name *"), ("last_name", "Last Name *"),
             ("cnic", "CNIC"), ("phone", "Phone *"), ("email", "Email"),
-            ("address", "Address"), ("city", "City"), ("membership_status", "Status")
+            ("address", "Address"), ("city", "City"), ("membership_status", "Status"),
+            ("membership_type", "Membership Type")
         ]
         entries = {}
         for i, (key, label) in enumerate(fields):
@@ -208,7 +208,7 @@ class MemberRegistrationView(tk.Toplevel):
             return
         if MemberService.update_member(data):
             window.destroy()
-            self._load_members()
+            self.changes.poll_now()
             messagebox.showinfo("Success", "Member updated successfully.", parent=self)
         else:
             messagebox.showerror("Error", "Failed to update member.", parent=window)
@@ -221,7 +221,7 @@ class MemberRegistrationView(tk.Toplevel):
         member_id = self.member_tree.item(selected[0])['values'][0]
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this member?", parent=self):
             if MemberService.delete_member(member_id):
-                self._load_members()
+                self.changes.poll_now()
                 messagebox.showinfo("Deleted", "Member deleted successfully.", parent=self)
             else:
                 messagebox.showerror("Error", "Could not delete member.", parent=self)
@@ -0,0 +1 @@
+"""Performance benchmarks, run as ``python -m benchmarks.<name>``"""
@@ -0,0 +1,173 @@
+# benchmarks/datagen.py
+"""Deterministic synthetic library for the benchmarks.
+
+    generate(books=20000, members=5000, years=3, seed=42)
+
+fills the database behind ``db`` with a library shaped like a real one: a
+few titles and categories take most of the loans (Zipf), a few members
+borrow far more than the rest (Pareto), most loans come back within the
+two-week period and some late. Loans of the last few weeks are still out.
+The same seed and ``today`` always give the same rows. The summary tables,
+fine ledger and member balances are then derived by the services' own
+rebuild paths, so every service sees a consistent database.
+"""
+import bisect
+import itertools
+import random
+from datetime import date, datetime, timedelta
+
+from app.database.db_handler import db
+
+CATEGORIES = [("Fiction", 30), ("Children", 15), ("Science", 12), ("History", 10), ("Biography", 8),
+              ("Reference", 6), ("Poetry", 4), ("Travel", 4), ("Religion", 4), ("Computing", 7)]
+FIRST_NAMES = ["Ayesha", "Ali", "Fatima", "Hassan", "Zainab", "Omar", "Maryam", "Bilal", "Sana", "Usman",
+               "Hira", "Imran", "Amna", "Kamran", "Nida", "Saad", "Rabia", "Tariq", "Iqra", "Faisal"]
+LAST_NAMES = ["Khan", "Ahmed", "Malik", "Hussain", "Shah", "Butt", "Chaudhry", "Qureshi", "Siddiqui", "Raza",
+              "Iqbal", "Javed", "Aslam", "Rehman", "Sheikh", "Mirza", "Abbasi", "Baig", "Anwar", "Nawaz"]
+WORDS = ["River", "Night", "Garden", "Empire", "Silent", "Code", "Journey", "Stars", "Memory", "Winter",
+         "Desert", "Light", "History", "Secret", "Ocean", "Mountain", "Machine", "Letters", "City", "Dream"]
+
+LOAN_DAYS = 14
+CHUNK = 5000
+# Tables emptied before generating, children first; users are kept
+TABLES = ['change_log', 'fine_transactions', 'member_balances', 'loans', 'books', 'members',
+          'category_summary', 'daily_circulation', 'library_totals']
+
+
+def _chooser(rng, weights):
+    """Function picking an index with probability proportional to ``weights``"""
+    cumulative = list(itertools.accumulate(weights))
+    total = cumulative[-1]
+    return lambda: bisect.bisect_right(cumulative, rng.random() * total)
+
+
+def _insert(query, rows):
+    for start in range(0, len(rows), CHUNK):
+        with db.transaction() as tx:
+            tx.executemany(query, rows[start:start + CHUNK])
+
+
+def reset():
+    """Delete every row the generator writes"""
+    with db.transaction() as tx:
+        for table in TABLES:
+            tx.execute(f"DELETE FROM {table}")
+
+
+def generate(books=20000, members=5000, years=3, loans_per_member_year=12, seed=42, today=None, user_id=None):
+    """Replace the library's books, members and loans with a synthetic set; returns row counts"""
+    # Imported here so ``benchmarks.datagen`` loads without pulling in every service
+    from app.services.fine_service import FineService
+    from app.services.loan_service import LoanService
+    from app.services.report_service import ReportService
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    if user_id is None:
+        user = db.execute_query("SELECT MIN(user_id) AS user_id FROM users", fetch=True)
+        user_id = user[0]['user_id'] if user and user[0]['user_id'] else None
+    if user_id is None:
+        db.execute_query("INSERT INTO users (username, password, full_name, role) VALUES (%s, %s, %s, %s)",
+                         ("bench", "x", "Benchmark Desk", "librarian"))
+        user_id = db.execute_query("SELECT MIN(user_id) AS user_id FROM users", fetch=True)[0]['user_id']
+    reset()
+
+    start = today - timedelta(days=365 * years)
+    # Books: popularity falls off as 1/rank over a shuffled order; popular titles hold more copies
+    pick_category = _chooser(rng, [weight for name, weight in CATEGORIES])
+    ranks = list(range(books))
+    rng.shuffle(ranks)
+    popularity = [1.0 / (rank + 1) ** 1.1 for rank in ranks]
+    copies = [1 + min(int(popularity[n] * 40), 9) + (rng.random() < 0.2) for n in range(books)]
+    categories = [CATEGORIES[pick_category()][0] for n in range(books)]
+    book_rows = []
+    for n in range(books):
+        title = " ".join(rng.sample(WORDS, rng.randint(1, 3)) + [str(n)])
+        book_rows.append((f"978{n:010d}", title, f"{rng.choice(LAST_NAMES)}, {rng.choice(FIRST_NAMES)}",
+                          f"{rng.choice(WORDS)} Press", rng.randint(1950, today.year), categories[n],
+                          copies[n], copies[n], f"{chr(65 + n % 26)}{n % 400}", user_id,
+                          datetime.combine(start - timedelta(days=rng.randint(0, 3650)), datetime.min.time())))
+    _insert("""INSERT INTO books (isbn, title, author, publisher, publication_year, category,
+               total_copies, available_copies, shelf_location, added_by, added_on)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", book_rows)
+    book_ids = [row['book_id'] for row in db.execute_query("SELECT book_id FROM books ORDER BY isbn", fetch=True)]
+
+    # Members: activity is heavy-tailed, a few borrow every week
+    member_rows = []
+    membership_types = [rng.choices(['standard', 'student', 'staff'], [70, 25, 5])[0] for n in range(members)]
+    for n in range(members):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        member_rows.append((first_name, last_name, f"35202-{n:07d}-{n % 10}", f"member{n:07d}@example.org",
+                            f"0300{n:07d}", f"House {n}, Street {n % 90}", "Lahore",
+                            datetime.combine(start - timedelta(days=rng.randint(0, 365)), datetime.min.time()),
+                            rng.choices(['active', 'expired', 'suspended'], [90, 8, 2])[0], user_id,
+                            membership_types[n]))
+    _insert("""INSERT INTO members (first_name, last_name, cnic, email, phone, address, city,
+               registration_date, membership_status, registered_by, membership_type)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", member_rows)
+    member_ids = [row['member_id'] for row in
+                  db.execute_query("SELECT member_id FROM members ORDER BY email", fetch=True)]
+    pick_book = _chooser(rng, popularity)
+    pick_member = _chooser(rng, [rng.paretovariate(1.5) for n in range(members)])
+
+    # Loans, day by day; anything not yet back by today is still out
+    on_loan = [0] * books
+    loans = 0
+    total = members * loans_per_member_year * years
+    days = (today - start).days
+    batch = []
+    for day in range(days):
+        issued = start + timedelta(days=day)
+        for n in range(total // days + (rng.random() < (total % days) / days)):
+            book, member = pick_book(), pick_member()
+            due = issued + timedelta(days=LOAN_DAYS)
+            late = rng.random() < 0.15
+            returned = due + timedelta(days=rng.randint(1, 30)) if late else issued + timedelta(
+                days=rng.randint(1, LOAN_DAYS))
+            if returned > today:
+                if on_loan[book] >= copies[book]:
+                    continue  # every copy is already out
+                on_loan[book] += 1
+                returned = None
+            fine = FineService.calculate_fine(due, returned, categories[book], membership_types[member]) \
+                if late and returned else 0.0
+            fine_status = 'none' if not fine else rng.choices(['paid', 'pending', 'waived'], [70, 25, 5])[0]
+            batch.append((book_ids[book], member_ids[member],
+                          datetime.combine(issued, datetime.min.time()) + timedelta(minutes=rng.randint(540, 1140)),
+                          due, returned, 'returned' if returned else 'issued', fine, fine_status, user_id))
+            if len(batch) >= CHUNK:
+                _insert_loans(batch)
+                loans += len(batch)
+                batch = []
+    _insert_loans(batch)
+    loans += len(batch)
+
+    _insert("UPDATE books SET available_copies = total_copies - %s WHERE book_id = %s",
+            [(count, book_ids[n]) for n, count in enumerate(on_loan) if count])
+    _backfill_ledger()
+    LoanService.sweep_overdue(as_of=today)
+    ReportService.rebuild_summaries()
+    FineService.reconcile_balances()
+    return {'books': books, 'members': members, 'loans': loans, 'on_loan': sum(on_loan)}
+
+
+def _insert_loans(rows):
+    _insert("""INSERT INTO loans (book_id, member_id, issue_date, due_date, return_date, loan_status,
+               fine_amount, fine_status, issued_by)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""", rows)
+
+
+def _backfill_ledger():
+    """Ledger rows for the generated fines: an assessment each, settled by a payment or waiver"""
+    with db.transaction() as tx:
+        tx.execute("""
+            INSERT INTO fine_transactions (loan_id, member_id, txn_type, amount, created_at)
+            SELECT loan_id, member_id, 'assess', fine_amount, return_date
+            FROM loans WHERE fine_amount > 0 AND fine_status <> 'none'
+        """)
+        tx.execute("""
+            INSERT INTO fine_transactions (loan_id, member_id, txn_type, amount, created_at)
+            SELECT loan_id, member_id, CASE fine_status WHEN 'paid' THEN 'payment' ELSE 'waiver' END,
+                   -fine_amount, return_date
+            FROM loans WHERE fine_amount > 0 AND fine_status IN ('paid', 'waived')
+        """)
@@ -0,0 +1,132 @@
+# benchmarks/models.py
+"""Book construction time and memory, before and after slotted models.
+
+    python -m benchmarks.models --books 1000000
+
+Each variant runs in its own process so its peak RSS is its own:
+  before  dict rows (as from a dictionary cursor) into Book(**row) with a per-instance __dict__
+  slots   dict rows into the slotted Book(**row)
+  mapper  tuple rows into slotted Books through app.models.mapper.row_mapper
+Timings include producing the rows; the 'rows' variant measures that alone.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from app.models.book import Book
+from app.models.mapper import row_mapper
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS, timings only
+    resource = None
+
+# Column order of BOOK_SELECT (b.*, added_by_name)
+COLUMNS = ('book_id', 'isbn', 'title', 'author', 'publisher', 'publication_year', 'category',
+           'total_copies', 'available_copies', 'shelf_location', 'added_by', 'added_on', 'added_by_name')
+CATEGORIES = ("Fiction", "Reference", "History", "Science", "Children")
+ADDED_ON = datetime(2024, 1, 1, 9, 30)
+VARIANTS = ('rows', 'before', 'slots', 'mapper')
+
+
+class DictBook:
+    """Book as it was before __slots__: every attribute in a per-instance __dict__"""
+
+    def __init__(self, book_id, isbn, title, author, publisher, publication_year, category, total_copies,
+                 available_copies, shelf_location, added_by, added_on=None, added_by_name=None):
+        self.book_id = book_id
+        self.isbn = isbn
+        self.title = title
+        self.author = author
+        self.publisher = publisher
+        self.publication_year = publication_year
+        self.category = category
+        self.total_copies = total_copies
+        self.available_copies = available_copies
+        self.shelf_location = shelf_location
+        self.added_by = added_by
+        self.added_by_name = added_by_name
+
+
+def row_batches(count, batch_size=10000):
+    """Row tuples in cursor-sized batches"""
+    for start in range(0, count, batch_size):
+        yield [(n, f"978{n:010d}", f"Title {n}", f"Author {n % 5000}", "Publisher", 1950 + n % 70,
+                CATEGORIES[n % len(CATEGORIES)], 3, 2, f"S{n % 400}", 1, ADDED_ON, "Desk Librarian")
+               for n in range(start, min(start + batch_size, count))]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def build(variant, count):
+    mapper = row_mapper(Book, COLUMNS)
+    convert = {
+        'rows': lambda rows: (),
+        'before': lambda rows: [DictBook(**dict(zip(COLUMNS, row))) for row in rows],
+        'slots': lambda rows: [Book(**dict(zip(COLUMNS, row))) for row in rows],
+        'mapper': lambda rows: list(map(mapper, rows)),
+    }[variant]
+    books = []
+    for rows in row_batches(count):
+        books.extend(convert(rows))
+    return books
+
+
+def measure(variant, count):
+    """Build ``count`` books in this process; seconds and peak RSS growth in MB"""
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    books = build(variant, count)
+    seconds = time.perf_counter() - started
+    peak = _peak_rss_mb()
+    assert variant == 'rows' or len(books) == count
+    # Bytes of the object itself plus its attribute dict, if any; the values are shared by every variant
+    book = books[0] if books else None
+    object_bytes = sys.getsizeof(book) + (sys.getsizeof(vars(book)) if hasattr(book, '__dict__') else 0)
+    return {'variant': variant, 'books': count, 'seconds': round(seconds, 3),
+            'rss_mb': None if peak is None else round(peak - baseline, 1),
+            'object_bytes': object_bytes if book is not None else None}
+
+
+def run(books=1_000_000):
+    results = {}
+    for variant in VARIANTS:
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.models', '--books', str(books),
+                                 '--variant', variant], capture_output=True, text=True, check=True).stdout
+        results[variant] = json.loads(output.splitlines()[-1])
+
+    rows_s = results['rows']['seconds']
+    print(f"{books:,} books; producing the rows alone takes {rows_s:.2f} s")
+    for variant in VARIANTS[1:]:
+        result = results[variant]
+        rss = "n/a" if result['rss_mb'] is None else f"{result['rss_mb']:,.0f} MB"
+        print(f"  {variant:<7} {result['seconds'] - rows_s:6.2f} s to build, peak RSS +{rss}, "
+              f"{result['object_bytes']} bytes per object excluding values")
+    before, after = results['before'], results['mapper']
+    print(f"Mapper vs before: {(before['seconds'] - rows_s) / max(after['seconds'] - rows_s, 1e-9):.1f}x faster"
+          + (f", {before['rss_mb'] / after['rss_mb']:.1f}x less memory" if after['rss_mb'] else ""))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--variant", choices=VARIANTS, help="measure one variant in this process (JSON output)")
+    args = parser.parse_args(argv)
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.books)))
+    else:
+        run(args.books)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/point_lookups.py
+"""Point-lookup latency with and without the prepared-statement cache.
+
+    python -m benchmarks.point_lookups --lookups 2000 --output lookups.json
+
+Generates a library with benchmarks.datagen (MySQL database library_bench
+when reachable, else the SQLite stand-in, as in benchmarks.suite) and
+times the hot single-row service calls, first on plain cursors
+(statement_cache_size 0) and then on cached prepared statements. The
+catalogue and user-name caches are bypassed so every call reaches the
+database. On the SQLite stand-in there is no server-side parse to save;
+the numbers that matter come from MySQL.
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+from app.database.db_handler import STATEMENT_CACHE_SIZE, db
+from app.services import user_service
+from app.services.book_service import BookService
+from app.services.catalogue_cache import catalogue
+from app.services.loan_service import LoanService
+from app.services.member_service import MemberService
+from app.services.user_service import UserService
+from benchmarks import datagen
+from benchmarks.suite import connect
+
+VARIANTS = (('plain', 0), ('prepared', STATEMENT_CACHE_SIZE))
+
+
+def _ids(query, count):
+    return [row['id'] for row in db.execute_query(query, (count,), fetch=True)]
+
+
+def lookups(count):
+    """(name, function of one id, ids) for every point lookup measured"""
+    user_id = db.execute_query("SELECT MIN(user_id) AS id FROM users", fetch=True)[0]['id']
+    book_ids = _ids("SELECT book_id AS id FROM books WHERE available_copies > 0 ORDER BY book_id LIMIT %s", count)
+    member_ids = _ids("SELECT member_id AS id FROM members ORDER BY member_id LIMIT %s", count)
+
+    def user_name(user):
+        user_service._user_names.invalidate()
+        return UserService.get_user_name(user)
+
+    issued = []
+
+    def issue(book_id):
+        assert LoanService.issue_loan(book_id, member_ids[len(issued) % len(member_ids)], user_id)
+        issued.append(book_id)
+
+    return [
+        ('get_book_by_id', BookService.get_book_by_id, book_ids),
+        ('get_member_by_id', MemberService.get_member_by_id, member_ids),
+        ('get_loan_by_id', LoanService.get_loan_by_id,
+         _ids("SELECT loan_id AS id FROM loans ORDER BY loan_id DESC LIMIT %s", count)),
+        ('get_user_name', user_name, [user_id] * count),
+        ('issue_loan', issue, book_ids[:max(count // 10, 1)]),
+    ]
+
+
+def _return_open_loans(book_ids):
+    rows = db.execute_query(f"""
+        SELECT loan_id FROM loans WHERE return_date IS NULL AND book_id IN ({", ".join(["%s"] * len(book_ids))})
+        AND issue_date >= CURDATE()
+    """, tuple(book_ids), fetch=True) if book_ids else []
+    LoanService.return_loans(loan_ids=[row['loan_id'] for row in rows])
+
+
+def measure(count, rounds=3):
+    """Per lookup and variant: latency over ``rounds`` alternating passes, so drift favours neither"""
+    timings = {}
+    cache = {}
+    for n in range(rounds):
+        for variant, cache_size in VARIANTS:
+            db.statement_cache_size = cache_size
+            db.statement_stats.reset()
+            catalogue.invalidate()  # get_book_by_id then answers each id with one primary-key query
+            for name, function, ids in lookups(count):
+                function(ids[0])  # warm-up: connection checked out, statement prepared
+                calls = timings.setdefault(name, {}).setdefault(variant, [])
+                for value in ids:
+                    started = time.perf_counter()
+                    function(value)
+                    calls.append(time.perf_counter() - started)
+                if name == 'issue_loan':
+                    _return_open_loans(ids)
+            cache[variant] = db.statement_cache_stats()
+
+    results = {'_statement_cache': cache}
+    for name, variants in timings.items():
+        for variant, calls in variants.items():
+            calls.sort()
+            results.setdefault(name, {})[variant] = {
+                'calls': len(calls),
+                'median_us': statistics.median(calls) * 1e6,
+                'p95_us': calls[int(len(calls) * 0.95) - 1] * 1e6,
+                'mean_us': statistics.mean(calls) * 1e6,
+            }
+    return results
+
+
+def run(lookups_per_query=2000, rounds=3, books=20000, members=5000, years=1, backend='auto',
+        database='library_bench', output=None):
+    used = connect(backend, database, tempfile.gettempdir())
+    datagen.generate(books=books, members=members, years=years)
+    results = measure(lookups_per_query, rounds)
+
+    print(f"{used}: median / p95 per call over {rounds} round(s), plain cursor vs prepared statement")
+    for name, variants in results.items():
+        if name.startswith('_'):
+            continue
+        plain, prepared = variants['plain'], variants['prepared']
+        print(f"  {name:<18} {plain['median_us']:8.1f} / {plain['p95_us']:8.1f} us -> "
+              f"{prepared['median_us']:8.1f} / {prepared['p95_us']:8.1f} us  "
+              f"({plain['median_us'] / prepared['median_us']:.2f}x at the median)")
+    cache = results['_statement_cache']['prepared']
+    print(f"  statement cache, last round: {cache['hits']:,} hits, {cache['misses']:,} misses, {cache['evictions']:,} evictions")
+
+    report = {'backend': used, 'lookups': lookups_per_query, 'rounds': rounds, 'results': results}
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=2000, help="calls per lookup, variant and round")
+    parser.add_argument("--rounds", type=int, default=3, help="alternating passes over both variants")
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--backend", choices=('auto', 'mysql', 'sqlite'), default='auto')
+    parser.add_argument("--database", default='library_bench')
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args(argv)
+    run(args.lookups, args.rounds, books=args.books, members=args.members, backend=args.backend, database=args.database,
+        output=args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+# benchmarks/suite.py
+"""Service benchmarks on a generated library, with JSON results.
+
+    python -m benchmarks.suite --books 20000 --members 5000 --years 3 --output results.json
+    python -m benchmarks.suite --compare results-1.4.json --output results-1.5.json
+
+Runs against a local MySQL database (``--database``, default library_bench,
+created and migrated beforehand; never the live library_management) and
+falls back to the SQLite stand-in when MySQL is not reachable. The data
+comes from benchmarks.datagen, so a seed gives the same library every run.
+
+Every scenario runs one untimed warm-up and then ``--rounds`` timed rounds;
+the results use pytest-benchmark's JSON layout (min/max/mean/stddev/median
+in seconds per benchmark). With ``--compare`` each benchmark's median is set
+against an earlier result file, and the exit status is 1 if any got slower
+by more than ``--threshold``.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from app.database import sqlite_backend
+from app.database.db_handler import DB_CONFIG, db
+from app.database.migrations import migrate
+from app.services.book_service import BookService
+from app.services.catalogue_cache import catalogue
+from app.services.loan_service import LoanService
+from app.services.member_service import MemberService
+from app.services.report_service import ReportService
+from benchmarks import datagen
+
+SEARCH_TERMS = ["Khan", "Ayesha", "member0000042", "0300", "Lahore", "zz-no-match"]
+
+
+def _bench_user():
+    return db.execute_query("SELECT MIN(user_id) AS user_id FROM users", fetch=True)[0]['user_id']
+
+
+class IssueReturn:
+    """Issue loans round by round, then return the same loans"""
+
+    def __init__(self, rounds):
+        rows = db.execute_query("""
+            SELECT b.book_id FROM books b WHERE b.available_copies > 0 ORDER BY b.book_id LIMIT %s
+        """, (rounds + 1,), fetch=True)
+        self.books = [row['book_id'] for row in rows]
+        members = db.execute_query("""
+            SELECT member_id FROM members WHERE membership_status = 'active' ORDER BY member_id LIMIT %s
+        """, (rounds + 1,), fetch=True)
+        self.members = [row['member_id'] for row in members]
+        self.user_id = _bench_user()
+        self.issued = []
+        self.loan_ids = []
+
+    def issue(self):
+        book_id, member_id = self.books[len(self.issued)], self.members[len(self.issued)]
+        assert LoanService.issue_loan(book_id, member_id, self.user_id), "issue_loan failed"
+        self.issued.append((book_id, member_id))
+
+    def next_return(self):
+        """Untimed: the loans to return, issuing them first if issue_loan was not run"""
+        if self.loan_ids:
+            return
+        while len(self.issued) < len(self.books):
+            self.issue()
+        for book_id, member_id in self.issued:
+            row = db.execute_query("""
+                SELECT MAX(loan_id) AS loan_id FROM loans
+                WHERE book_id = %s AND member_id = %s AND return_date IS NULL
+            """, (book_id, member_id), fetch=True)
+            self.loan_ids.append(row[0]['loan_id'])
+
+    def return_next(self):
+        assert LoanService.return_loan(self.loan_ids.pop()), "return_loan failed"
+
+
+def inventory_statistics():
+    """What InventoryReportsView loads: the summary cards and the category breakdown"""
+    return ReportService.get_inventory_summary(), ReportService.get_category_counts()
+
+
+def scenarios(rounds):
+    """(name, setup, function) in run order; setup runs untimed before every round"""
+    terms = iter(SEARCH_TERMS * (rounds + 1))
+    circulation = IssueReturn(rounds)
+    return [
+        ('get_all_books[cold]', catalogue.invalidate, BookService.get_all_books),
+        ('get_all_books[warm]', None, BookService.get_all_books),
+        ('search_members', None, lambda: MemberService.search_members(next(terms))),
+        ('issue_loan', None, circulation.issue),
+        ('return_loan', circulation.next_return, circulation.return_next),
+        ('get_active_loans', None, LoanService.get_active_loans),
+        ('get_loans_with_fines', None, LoanService.get_loans_with_fines),
+        ('inventory_statistics', None, inventory_statistics),
+    ]
+
+
+def measure(name, setup, function, rounds):
+    """Warm-up plus ``rounds`` timed calls; a pytest-benchmark style record"""
+    timings = []
+    rows = None
+    for n in range(rounds + 1):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        if n:
+            timings.append(elapsed)
+        if isinstance(result, list):
+            rows = len(result)
+    mean = statistics.mean(timings)
+    return {
+        'name': name,
+        'stats': {
+            'min': min(timings), 'max': max(timings), 'mean': mean,
+            'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            'median': statistics.median(timings), 'rounds': rounds, 'ops': 1 / mean if mean else None,
+        },
+        'extra_info': {} if rows is None else {'rows': rows},
+    }
+
+
+def connect(backend, database, workdir):
+    """Point ``db`` at MySQL or a fresh SQLite file; returns the backend used"""
+    if backend in ('auto', 'mysql'):
+        if database == DB_CONFIG['database']:
+            raise SystemExit(f"Refusing to benchmark against the live database '{database}'")
+        db.configure(min_size=1, max_size=4, database=database)
+        if db.ping():
+            migrate(db)
+            return 'mysql'
+        if backend == 'mysql':
+            raise SystemExit(f"MySQL database '{database}' is not reachable")
+    path = os.path.join(workdir, "bench.sqlite")
+    if os.path.exists(path):
+        os.remove(path)
+    sqlite_backend.create_schema(path)
+    db.configure(min_size=1, max_size=4, connection_factory=sqlite_backend.connection_factory(path))
+    migrate(db)
+    return 'sqlite'
+
+
+def _commit_id():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(books=20000, members=5000, years=3, seed=42, rounds=10, backend='auto', database='library_bench',
+        workdir=None, output=None, only=None):
+    workdir = workdir or tempfile.gettempdir()
+    used = connect(backend, database, workdir)
+    started = time.perf_counter()
+    counts = datagen.generate(books=books, members=members, years=years, seed=seed)
+    generated = time.perf_counter() - started
+    print(f"{used}: generated {counts['books']:,} books, {counts['members']:,} members, "
+          f"{counts['loans']:,} loans ({counts['on_loan']:,} on loan) in {generated:.1f} s")
+
+    results = []
+    for name, setup, function in scenarios(rounds):
+        if only and not any(part in name for part in only):
+            continue
+        result = measure(name, setup, function, rounds)
+        results.append(result)
+        stats = result['stats']
+        print(f"  {name:<24} median {stats['median'] * 1000:9.2f} ms   min {stats['min'] * 1000:9.2f} ms   "
+              f"max {stats['max'] * 1000:9.2f} ms")
+
+    report = {
+        'machine_info': {'python_version': platform.python_version(), 'platform': platform.platform(),
+                         'processor': platform.processor() or platform.machine()},
+        'commit_info': {'id': _commit_id()},
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'params': {'backend': used, 'books': books, 'members': members, 'years': years, 'seed': seed,
+                   'rounds': rounds, **counts, 'generate_seconds': generated},
+        'benchmarks': results,
+    }
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    return report
+
+
+def compare(report, baseline, threshold=0.2):
+    """Median of each benchmark against ``baseline``; names of those slower by more than ``threshold``"""
+    before = {result['name']: result['stats']['median'] for result in baseline['benchmarks']}
+    regressions = []
+    for result in report['benchmarks']:
+        name, median = result['name'], result['stats']['median']
+        if name not in before:
+            continue
+        change = median / before[name] - 1 if before[name] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<24} {before[name] * 1000:9.2f} ms -> {median * 1000:9.2f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--backend", choices=('auto', 'mysql', 'sqlite'), default='auto')
+    parser.add_argument("--database", default='library_bench', help="MySQL database to fill (default library_bench)")
+    parser.add_argument("--workdir", help="directory for the SQLite file (default: the temp directory)")
+    parser.add_argument("--only", nargs='+', help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="earlier JSON results to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run(books=args.books, members=args.members, years=args.years, seed=args.seed, rounds=args.rounds,
+                 backend=args.backend, database=args.database, workdir=args.workdir, output=args.output,
+                 only=args.only)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Against {args.compare}:")
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
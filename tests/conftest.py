@@ -0,0 +1,53 @@
+import pytest
+from app.database import sqlite_backend
+from app.database.db_handler import db
+from app.database.migrations import migrate
+from app.services.catalogue_cache import catalogue
+from benchmarks import datagen, suite
+
+
+@pytest.fixture(autouse=True)
+def fresh_catalogue():
+    """The catalogue cache is process-wide; never carry books over between tests"""
+    catalogue.invalidate()
+    yield
+    catalogue.invalidate()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """The application's ``db`` pooled over a fresh SQLite stand-in, with one desk user.
+
+    Every service reads the global ``db``, so pointing it here (as
+    benchmarks.suite does) runs them all on the stand-in without patching.
+    """
+    path = str(tmp_path / "library.sqlite")
+    sqlite_backend.create_schema(path)
+    db.configure(min_size=1, max_size=16, connection_factory=sqlite_backend.connection_factory(path))
+    db.stats.reset()
+    db.statement_stats.reset()
+    migrate(db)
+    db.execute_query(
+        "INSERT INTO users (username, password, full_name, role) VALUES (%s, %s, %s, %s)",
+        ("desk", "x", "Desk Librarian", "librarian")
+    )
+    yield db
+    db.configure()  # Back to the MySQL settings; nothing connects until a query runs
+
+
+@pytest.fixture
+def mysql_db(tmp_path):
+    """The application's ``db`` on the local MySQL benchmark database, emptied first.
+
+    Uses library_bench like benchmarks.suite, never the live database, and
+    skips the test when no MySQL server is reachable.
+    """
+    try:
+        suite.connect('mysql', 'library_bench', str(tmp_path))
+    except SystemExit:
+        db.configure()
+        pytest.skip("MySQL benchmark database not reachable")
+    db.configure(min_size=1, max_size=16, database='library_bench')  # a connection per desk thread
+    datagen.reset()
+    yield db
+    db.configure()
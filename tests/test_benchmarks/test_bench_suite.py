@@ -0,0 +1,58 @@
+from datetime import date
+
+from app.services.fine_service import FineService
+from app.services.report_service import ReportService
+from benchmarks import datagen, suite
+
+TODAY = date(2025, 6, 30)
+
+
+def _snapshot(handler):
+    """Every generated row, keyed by ISBN and email rather than by auto-increment ids"""
+    return [handler.execute_query(query, fetch=True) for query in (
+        "SELECT isbn, title, author, category, total_copies, available_copies, added_on FROM books ORDER BY isbn",
+        "SELECT email, first_name, last_name, membership_type FROM members ORDER BY email",
+        """SELECT b.isbn, m.email, l.issue_date, l.due_date, l.return_date, l.loan_status, l.fine_amount,
+                  l.fine_status FROM loans l JOIN books b ON b.book_id = l.book_id
+           JOIN members m ON m.member_id = l.member_id ORDER BY l.loan_id""",
+        "SELECT txn_type, SUM(amount) AS amount FROM fine_transactions GROUP BY txn_type ORDER BY txn_type")]
+
+
+def test_generated_library_is_deterministic_and_consistent(sqlite_db):
+    counts = datagen.generate(books=200, members=50, years=1, seed=7, today=TODAY)
+    first = _snapshot(sqlite_db)
+    assert datagen.generate(books=200, members=50, years=1, seed=7, today=TODAY) == counts
+    assert _snapshot(sqlite_db) == first
+    assert counts['loans'] == len(first[2]) > 500 and counts['on_loan'] > 0
+
+    # Skewed: the busiest tenth of the books takes well over a tenth of the loans
+    per_book = sorted(sqlite_db.execute_query(
+        "SELECT COUNT(*) AS loans FROM loans GROUP BY book_id", fetch=True), key=lambda row: -row['loans'])
+    assert sum(row['loans'] for row in per_book[:20]) > counts['loans'] * 0.3
+
+    # Copies out match the open loans, and the derived tables need no repair
+    assert sqlite_db.execute_query("""
+        SELECT COUNT(*) AS bad FROM books b
+        WHERE b.total_copies - b.available_copies <>
+              (SELECT COUNT(*) FROM loans l WHERE l.book_id = b.book_id AND l.return_date IS NULL)
+    """, fetch=True)[0]['bad'] == 0
+    assert not any(ReportService.rebuild_summaries(verify_only=True).values())
+    assert not any(FineService.reconcile_balances(verify_only=True).values())
+
+
+def test_scenarios_run_and_compare(sqlite_db):
+    datagen.generate(books=100, members=30, years=1, seed=1, today=TODAY)
+    results = [suite.measure(name, setup, function, 2) for name, setup, function in suite.scenarios(2)]
+    assert [result['name'] for result in results] == [
+        'get_all_books[cold]', 'get_all_books[warm]', 'search_members', 'issue_loan', 'return_loan',
+        'get_active_loans', 'get_loans_with_fines', 'inventory_statistics']
+    assert results[0]['extra_info']['rows'] == 100 and results[0]['stats']['rounds'] == 2
+    # Every loan the benchmark issued was returned again
+    assert sqlite_db.execute_query("SELECT SUM(available_copies) AS copies FROM books", fetch=True)[0]['copies'] == \
+        sqlite_db.execute_query("SELECT SUM(total_copies) - (SELECT COUNT(*) FROM loans WHERE return_date IS NULL)"
+                              " AS copies FROM books", fetch=True)[0]['copies']
+
+    report = {'benchmarks': results}
+    slower = {'benchmarks': [{'name': 'search_members', 'stats': {'median': results[2]['stats']['median'] / 2}}]}
+    assert suite.compare(report, slower, threshold=0.5) == ['search_members']
+    assert suite.compare(report, report) == []
@@ -0,0 +1,64 @@
+import pytest
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        if self.connection.fail_with:
+            error, self.connection.fail_with = self.connection.fail_with, None
+            raise error
+        self.connection.executed.append(query)
+        self.rowcount = 1
+
+    def executemany(self, query, seq_params):
+        for params in seq_params:
+            self.execute(query, params)
+
+    def fetchall(self):
+        return [{'value': 1}]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.fail_with = None
+        self.executed = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def is_connected(self):
+        return self.alive
+
+    def start_transaction(self):
+        self.executed.append("START TRANSACTION")
+
+    def commit(self):
+        self.executed.append("COMMIT")
+
+    def rollback(self):
+        self.executed.append("ROLLBACK")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def factory(opened):
+    def make():
+        connection = FakeConnection()
+        opened.append(connection)
+        return connection
+    return make
@@ -0,0 +1,90 @@
+import threading
+import pytest
+from mysql.connector import errors
+from app.database.pool import ConnectionPool, PoolTimeout
+from app.database.db_handler import DBHandler
+
+
+def test_pool_warms_up_lazily_to_min_size(factory, opened):
+    pool = ConnectionPool(factory, min_size=2, max_size=4)
+    assert opened == []
+
+    entry = pool.acquire()
+    assert len(opened) == 2
+    pool.release(entry)
+
+    stats = pool.stats()
+    assert stats['size'] == 2
+    assert stats['idle'] == 2
+    assert stats['checkouts'] == 1
+
+
+def test_pool_never_exceeds_max_size(factory):
+    pool = ConnectionPool(factory, min_size=0, max_size=2, timeout=0.05)
+    first = pool.acquire()
+    second = pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    assert pool.stats()['utilisation'] == 1.0
+    assert pool.stats()['timeouts'] == 1
+    pool.release(first)
+    pool.release(second)
+
+
+def test_waiting_checkout_gets_released_connection(factory):
+    pool = ConnectionPool(factory, min_size=0, max_size=1, timeout=5)
+    entry = pool.acquire()
+    got = []
+
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(entry)
+    waiter.join(timeout=5)
+
+    assert got and got[0] is entry
+    assert pool.stats()['max_wait_ms'] > 0
+
+
+def test_unhealthy_connection_is_replaced_on_checkout(factory, opened):
+    pool = ConnectionPool(factory, min_size=1, max_size=2, ping_interval=0)
+    entry = pool.acquire()
+    pool.release(entry)
+
+    opened[0].alive = False
+    replacement = pool.acquire()
+
+    assert replacement.connection is opened[1]
+    assert opened[0].closed
+    assert pool.stats()['failed_health_checks'] == 1
+
+
+def test_execute_query_retries_a_read_when_server_has_gone_away(factory, opened):
+    handler = DBHandler(min_size=1, max_size=2, connection_factory=factory)
+    entry = handler.pool.acquire()
+    entry.connection.fail_with = errors.OperationalError(msg="MySQL server has gone away", errno=2006)
+    handler.pool.release(entry)
+
+    assert handler.execute_query("SELECT 1 AS value", fetch=True) == [{'value': 1}]
+    assert opened[0].closed
+    assert opened[1].executed == ["SELECT 1 AS value"]
+
+
+def test_execute_query_never_repeats_a_write_after_a_lost_connection(factory, opened):
+    handler = DBHandler(min_size=1, max_size=2, connection_factory=factory)
+    entry = handler.pool.acquire()
+    # The server may have committed the UPDATE before the connection dropped
+    entry.connection.fail_with = errors.OperationalError(msg="Lost connection to MySQL server", errno=2013)
+    handler.pool.release(entry)
+
+    assert handler.execute_query("UPDATE books SET title = title") is False
+    assert opened[0].closed
+    assert all(connection.executed == [] for connection in opened[1:])
+
+
+def test_close_closes_idle_connections(factory, opened):
+    handler = DBHandler(min_size=2, max_size=2, connection_factory=factory)
+    handler.execute_query("SELECT 1", fetch=True)
+    handler.close()
+    assert all(connection.closed for connection in opened)
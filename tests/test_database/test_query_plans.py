@@ -0,0 +1,74 @@
+"""EXPLAIN-based regression check for the hot service queries.
+
+Needs a local MySQL server with the benchmark database (library_bench,
+see benchmarks.suite) and is skipped when it cannot be reached; the live
+library database is never touched. The database is filled by
+benchmarks.datagen first, so the optimizer chooses between a scan and an
+index on realistic row counts. Each service method is called with a
+recording ``db`` so the check always EXPLAINs the SQL the service really sends.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+from app.database.db_handler import db
+from app.services.book_service import BookService
+from app.services.loan_service import LoanService
+from app.services.member_service import MemberService
+from benchmarks import datagen, suite
+
+HOT_QUERIES = [
+    ('app.services.loan_service.db', lambda ids: LoanService.get_active_loans()),
+    ('app.services.loan_service.db', lambda ids: LoanService.get_active_loans(member_id=ids['member'])),
+    ('app.services.loan_service.db', lambda ids: LoanService.get_loan_by_id(ids['loan'])),
+    ('app.services.loan_service.db', lambda ids: LoanService.get_loans_with_fines()),
+    ('app.services.loan_service.db', lambda ids: LoanService.get_member_loan_history(ids['member'])),
+    ('app.services.catalogue_cache.db', lambda ids: BookService.get_book_by_id(ids['book'])),
+    ('app.services.member_service.db', lambda ids: MemberService.get_member_by_id(ids['member'])),
+]
+
+
+@pytest.fixture(scope="module")
+def live_db(tmp_path_factory):
+    try:
+        suite.connect('mysql', 'library_bench', str(tmp_path_factory.mktemp("plans")))
+    except SystemExit:
+        db.configure()
+        pytest.skip("MySQL benchmark database not reachable")
+    datagen.generate(books=5000, members=2000, years=1)
+    for table in ('books', 'members', 'loans'):
+        db.execute_query(f"ANALYZE TABLE {table}", fetch=True)
+    yield db
+    db.configure()
+
+
+@pytest.fixture(scope="module")
+def ids(live_db):
+    """A busy member, one of their loans and a book, so no plan is cut short by an empty lookup"""
+    row = live_db.execute_query("""
+        SELECT member_id, MAX(loan_id) AS loan_id, MAX(book_id) AS book_id FROM loans
+        GROUP BY member_id ORDER BY COUNT(*) DESC LIMIT 1
+    """, fetch=True)[0]
+    return {'member': row['member_id'], 'loan': row['loan_id'], 'book': row['book_id']}
+
+
+def _recorded_queries(target, call):
+    recorder = MagicMock()
+    recorder.execute_query.return_value = []
+    with patch(target, recorder):
+        call()
+    return [(c.args[0], c.args[1] if len(c.args) > 1 else None)
+            for c in recorder.execute_query.call_args_list]
+
+
+@pytest.mark.parametrize("target,call", HOT_QUERIES)
+def test_hot_query_uses_an_index(live_db, ids, target, call):
+    queries = _recorded_queries(target, lambda: call(ids))
+    assert queries, "the service sent no query"
+    for query, params in queries:
+        plan = live_db.execute_query("EXPLAIN " + query, params, fetch=True)
+        assert plan, f"EXPLAIN failed for: {query}"
+        for row in plan:
+            if row['table'] is None:
+                continue  # nothing read, e.g. "No tables used"
+            # A usable index the optimizer passed over is as bad as none at all
+            assert row['type'] != 'ALL' and row['key'] is not None, \
+                f"Full table scan on {row['table']} in: {' '.join(query.split())}"
@@ -0,0 +1,53 @@
+import json
+
+from app.database.query_stats import QueryStats, normalize
+from app.services.member_service import MemberService
+
+
+def test_normalize_groups_calls_of_one_query():
+    assert normalize("SELECT *  FROM books\n WHERE book_id = %s AND title = 'Dune' LIMIT 20") == \
+        "SELECT * FROM books WHERE book_id = ? AND title = ? LIMIT ?"
+    assert normalize("SELECT * FROM loans WHERE loan_id IN (%s, %s, %s)") == \
+        normalize("SELECT * FROM loans WHERE loan_id IN (%s,%s)") == "SELECT * FROM loans WHERE loan_id IN (?+)"
+
+
+def test_statements_are_timed_per_query_and_caller(sqlite_db):
+    sqlite_db.stats.reset()
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES (%s, %s, %s, %s)",
+        ("Ada", "Reader", "0300", "Street"))
+    for term in ("Ada", "Bo", "Reader"):
+        MemberService.search_members(term)
+    with sqlite_db.transaction() as tx:
+        tx.execute("UPDATE members SET city = %s", ("Lahore",))
+    list(sqlite_db.stream("SELECT member_id FROM members", batch_size=1))
+    assert sqlite_db.execute_query("SELECT * FROM no_such_table", fetch=True) is False
+
+    queries = {query['query']: query for query in sqlite_db.dump_stats()['queries']}
+    search = next(query for text, query in queries.items() if "FROM members" in text and "LIKE" in text)
+    assert (search['calls'], search['rows']) == (3, 2)
+    assert search['callers'] == {'MemberService.search_members': 3}
+    assert sum(search['histogram'].values()) == 3 and search['min_ms'] <= search['p50_ms'] <= search['max_ms']
+    assert queries["UPDATE members SET city = ?"]['rows'] == 1
+    assert queries["SELECT member_id FROM members"]['rows'] == 1
+    assert queries["SELECT * FROM no_such_table"]['errors'] == 1
+
+
+def test_slow_query_log_redacts_parameters(sqlite_db, tmp_path):
+    log = tmp_path / "slow.log"
+    sqlite_db.stats.configure(slow_query_ms=0, slow_query_log=str(log))
+    try:
+        sqlite_db.execute_query("SELECT * FROM users WHERE username = %s OR full_name = 'Desk Librarian'",
+                                ("desk",), fetch=True)
+    finally:
+        sqlite_db.stats.configure(slow_query_ms=500, slow_query_log=False)
+    line = log.read_text()
+    assert "SELECT * FROM users WHERE username = ? OR full_name = ?" in line
+    assert "params=1 redacted" in line and "desk" not in line and "Librarian" not in line
+
+    disabled = QueryStats(enabled=False)
+    disabled.record("SELECT 1", 0.5)
+    assert disabled.snapshot() == []
+    dump = tmp_path / "stats.json"
+    sqlite_db.dump_stats(str(dump), limit=1)
+    assert len(json.loads(dump.read_text())['queries']) == 1
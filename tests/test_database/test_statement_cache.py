@@ -0,0 +1,81 @@
+from app.database import sqlite_backend
+from app.database.db_handler import DBHandler
+from app.database.statement_cache import StatementCache, StatementStats
+from app.services.loan_service import LoanService
+
+
+class PreparedCursor:
+    def __init__(self, log):
+        self.log = log
+        self.executed = None
+        self.rowcount = 1
+
+    def execute(self, query, params=()):
+        # Like mysql.connector: anything but the string it prepared is prepared again
+        if query is not self.executed:
+            self.log.append(('prepare', query))
+            self.executed = query
+        self.log.append(('execute', params))
+
+    def close(self):
+        self.log.append(('close', self.executed))
+
+
+class PreparingConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self, prepared=False, dictionary=False):
+        assert prepared and dictionary
+        return PreparedCursor(self.log)
+
+
+def test_lru_keeps_one_prepared_statement_per_query():
+    connection, stats = PreparingConnection(), StatementStats()
+    cache = StatementCache(connection, 2, stats)
+    for query in ["SELECT 1", "".join(["SELECT ", "1"]), "SELECT 2", "SELECT 1", "SELECT 3"]:
+        text, cursor = cache.get(query)
+        cursor.execute(text, (0,))
+    assert [entry for entry in connection.log if entry[0] != 'execute'] == [
+        ('prepare', "SELECT 1"), ('prepare', "SELECT 2"), ('close', "SELECT 2"), ('prepare', "SELECT 3")]
+    assert stats.snapshot() == {'hits': 2, 'misses': 3, 'evictions': 1, 'hit_rate': 0.4}
+    cache.close()
+    assert len(cache) == 0 and sorted(connection.log[-2:]) == [('close', "SELECT 1"), ('close', "SELECT 3")]
+
+
+def test_point_lookups_reuse_statements_per_connection(tmp_path):
+    path = str(tmp_path / "library.sqlite")
+    sqlite_backend.create_schema(path)
+    handler = DBHandler(min_size=1, max_size=1, statement_cache_size=4,
+                        connection_factory=sqlite_backend.connection_factory(path))
+    handler.execute_query("INSERT INTO users (username, password, full_name) VALUES ('desk', 'x', 'Desk')")
+    query = "SELECT full_name FROM users WHERE user_id = %s"
+    for n in range(3):
+        assert handler.execute_query(query, (1,), fetch=True, prepared=True) == [{'full_name': "Desk"}]
+    with handler.transaction() as tx:
+        tx.execute("INSERT INTO users (username, password, full_name) VALUES (%s, 'x', 'Clerk')", ("clerk",),
+                   prepared=True)
+        assert tx.fetch_one(query, (tx.lastrowid,), prepared=True) == {'full_name': "Clerk"}
+    assert handler.statement_cache_stats() == {'hits': 3, 'misses': 2, 'evictions': 0, 'hit_rate': 0.6,
+                                               'capacity': 4}
+    assert handler.execute_query("SELECT * FROM no_such_table", fetch=True, prepared=True) is False
+    assert handler.dump_stats()['statements']['misses'] == 3
+
+    # Disabled: prepared=True runs on an ordinary cursor
+    handler.configure(min_size=1, max_size=1, statement_cache_size=0,
+                      connection_factory=sqlite_backend.connection_factory(path))
+    assert handler.execute_query(query, (1,), fetch=True, prepared=True) == [{'full_name': "Desk"}]
+    assert handler.statement_cache_stats()['misses'] == 3
+    handler.close()
+
+
+def test_issue_loan_records_the_loan_id_from_its_prepared_insert(sqlite_db):
+    sqlite_db.execute_query("INSERT INTO books (isbn, title, author, total_copies, available_copies)"
+                            " VALUES ('1', 'Dune', 'Herbert', 2, 2)")
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES ('Ada', 'Reader', '0', 'Street')")
+    assert LoanService.issue_loan(1, 1, 1) and LoanService.issue_loan(1, 1, 1)
+    assert [row['id'] for row in sqlite_db.execute_query(
+        "SELECT entity_id AS id FROM change_log WHERE entity = 'loan' ORDER BY change_id", fetch=True)] == [1, 2]
+    assert LoanService.get_loan_by_id(2)['title'] == "Dune"
+    assert sqlite_db.statement_cache_stats()['hits'] >= 2
@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+
+def _add_books(handler, count):
+    with handler.transaction() as tx:
+        tx.executemany("INSERT INTO books (isbn, title, author) VALUES (%s, %s, 'Author')",
+                       [(str(n), f"Book {n}") for n in range(count)])
+
+
+def test_row_factories(sqlite_db):
+    _add_books(sqlite_db, 5)
+    query = "SELECT book_id, title FROM books ORDER BY book_id"
+
+    assert [len(rows) for rows in sqlite_db.stream(query, batch_size=2)] == [2, 2, 1]
+    [dicts] = sqlite_db.stream(query + " LIMIT 1")
+    assert dicts == [{'book_id': 1, 'title': "Book 0"}]
+    [tuples] = sqlite_db.stream(query + " LIMIT 2", row_factory=tuple)
+    assert tuples == [(1, "Book 0"), (2, "Book 1")]
+    [named] = sqlite_db.stream(query + " LIMIT 1", row_factory=namedtuple)
+    assert (named[0].book_id, named[0].title) == (1, "Book 0")
+
+    columns = []
+
+    def titles(names):
+        columns.extend(names)
+        return lambda row: row[1].upper()
+
+    assert [title for rows in sqlite_db.stream(query, row_factory=titles) for title in rows][-1] == "BOOK 4"
+    assert columns == ['book_id', 'title']
+
+
+def test_stream_inside_transaction_allows_statements_between_batches(sqlite_db):
+    _add_books(sqlite_db, 4)
+    with sqlite_db.transaction() as tx:
+        for rows in sqlite_db.stream("SELECT book_id FROM books", batch_size=2, row_factory=tuple):
+            tx.executemany("UPDATE books SET total_copies = 3 WHERE book_id = %s", rows)
+    assert sqlite_db.execute_query("SELECT SUM(total_copies) AS copies FROM books", fetch=True)[0]['copies'] == 12
+    assert sqlite_db.pool_stats()['in_use'] == 0
@@ -0,0 +1,58 @@
+import pytest
+from app.database.db_handler import DBHandler
+
+
+@pytest.fixture
+def handler(factory):
+    return DBHandler(min_size=1, max_size=2, connection_factory=factory)
+
+
+def test_transaction_commits_once(handler, opened):
+    with handler.transaction() as tx:
+        tx.execute("INSERT INTO loans VALUES (1)")
+        tx.execute("UPDATE books SET available_copies = available_copies - 1")
+
+    assert opened[0].executed == [
+        "START TRANSACTION",
+        "INSERT INTO loans VALUES (1)",
+        "UPDATE books SET available_copies = available_copies - 1",
+        "COMMIT",
+    ]
+    assert handler.pool_stats()['in_use'] == 0
+
+
+def test_transaction_rolls_back_on_exception(handler, opened):
+    with pytest.raises(RuntimeError):
+        with handler.transaction() as tx:
+            tx.execute("INSERT INTO loans VALUES (1)")
+            raise RuntimeError("boom")
+
+    assert opened[0].executed[-1] == "ROLLBACK"
+    assert "COMMIT" not in opened[0].executed
+
+
+def test_execute_query_joins_open_transaction(handler, opened):
+    with handler.transaction():
+        assert handler.execute_query("UPDATE books SET title = title") is True
+
+    # One connection, one commit: the inner statement did not autocommit separately
+    assert opened[0].executed.count("COMMIT") == 1
+    assert handler.pool_stats()['checkouts'] == 1
+
+
+def test_nested_transaction_uses_savepoint(handler, opened):
+    with handler.transaction() as outer:
+        outer.execute("INSERT INTO loans VALUES (1)")
+        with pytest.raises(ValueError):
+            with handler.transaction() as inner:
+                inner.execute("INSERT INTO loans VALUES (2)")
+                raise ValueError("inner failure")
+
+    assert opened[0].executed == [
+        "START TRANSACTION",
+        "INSERT INTO loans VALUES (1)",
+        "SAVEPOINT sp_1",
+        "INSERT INTO loans VALUES (2)",
+        "ROLLBACK TO SAVEPOINT sp_1",
+        "COMMIT",
+    ]
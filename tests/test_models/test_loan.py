@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from app.models.loan import Loan
+from app.services.fine_policy import FinePolicy
 import pytest
 
 
@@ -62,7 +63,7 @@ def test_loan_fine_calculation():
     )
 
     # Should be 5 days overdue at $5/day = $25
-    assert loan.calculate_fine() == 25.0
+    assert loan.calculate_fine(FinePolicy(daily_rate=5.0)) == 25.0
 
 
 def test_no_fine_for_early_return():
@@ -74,7 +75,7 @@ def test_no_fine_for_early_return():
         return_date=datetime.now()
     )
 
-    assert loan.calculate_fine() == 0.0
+    assert loan.calculate_fine(FinePolicy(daily_rate=5.0)) == 0.0
 
 
 def test_loan_to_dict_includes_fine_fields():
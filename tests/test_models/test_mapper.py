@@ -0,0 +1,32 @@
+from app.models.book import Book
+from app.models.mapper import model_rows, row_mapper
+from app.models.member import Member
+from app.services.member_service import MemberService
+
+
+def test_row_mapper_builds_models_by_position():
+    build = row_mapper(Member, ('member_id', 'last_name', 'first_name', 'unknown_column'))
+    member = build((7, "Reader", "Ada", "ignored"))
+    assert (member.member_id, member.full_name) == (7, "Ada Reader")
+    # Slots missing from the row take the constructor defaults
+    assert (member.membership_status, member.membership_type, member.email) == ('active', 'standard', None)
+    assert row_mapper(Member, ['member_id', 'last_name', 'first_name', 'unknown_column']) is build
+    assert not hasattr(member, '__dict__')
+
+
+def test_book_to_dict_lists_every_field():
+    book = Book(1, '123456', 'Test Book', 'Author Name', 'Publisher', 2020, 'Fiction', 10, 9, 'Shelf1', 1)
+    assert book.to_dict() == dict(zip(Book.__slots__, (1, '123456', 'Test Book', 'Author Name', 'Publisher', 2020,
+                                                        'Fiction', 10, 9, 'Shelf1', 1, None, None)))
+    assert row_mapper(Book, tuple(book.to_dict()))(tuple(book.to_dict().values())).to_dict() == book.to_dict()
+
+
+def test_members_are_streamed_into_models(sqlite_db):
+    for first_name in ["Cy", "Ada", "Bo"]:
+        sqlite_db.execute_query(
+            "INSERT INTO members (first_name, last_name, phone, address) VALUES (%s, 'Reader', '0', 'Street')",
+            (first_name,))
+    [members] = sqlite_db.stream("SELECT * FROM members ORDER BY member_id", row_factory=model_rows(Member))
+    assert [member.first_name for member in members] == ["Cy", "Ada", "Bo"]
+    assert [member.full_name for member in MemberService.get_all_members()] == [
+        "Ada Reader", "Bo Reader", "Cy Reader"]
@@ -0,0 +1,101 @@
+import io
+import pytest
+from app.services.book_service import BookService
+from app.services.change_feed import ChangePoller
+from app.services.import_service import ImportService, read_marc21, read_marcxml
+from app.services.report_service import ReportService
+
+
+
+@pytest.fixture
+def library(sqlite_db):
+    assert BookService.add_book({'isbn': "111", 'title': "Dune", 'author': "Herbert", 'category': "Sci-Fi",
+                                 'total_copies': 2, 'available_copies': 2, 'added_by': 1})
+    yield sqlite_db
+
+
+def _marc21(fields):
+    """One ISO 2709 record from [(tag, indicators, [(code, value)])]"""
+    directory, data = b"", b""
+    for tag, indicators, subfields in fields:
+        value = (indicators + "".join(f"\x1f{code}{text}" for code, text in subfields) + "\x1e").encode()
+        directory += f"{tag}{len(value):04d}{len(data):05d}".encode()
+        data += value
+    base = 24 + len(directory) + 1
+    length = base + len(data) + 1
+    leader = f"{length:05d}nam a22{base:05d} a 4500".encode()
+    return leader + directory + b"\x1e" + data + b"\x1d"
+
+
+def test_csv_import_upserts_in_chunks_and_reports_bad_rows(library):
+    source = io.StringIO(
+        "ISBN,Title,Author,Year,Category,Copies\n"
+        "111,Dune,Herbert,1965,Sci-Fi,3\n"        # known ISBN: copies are added
+        "222,Emma,Austen,1815,Classics,2\n"
+        ",No ISBN,Nobody,,,1\n"
+        "333,Beloved,Morrison,nineteen,Classics,1\n"
+        "444,Persuasion,Austen,1817,Classics,1\n"
+        "222,Emma,Austen,1815,Classics,1\n"       # repeated within the file
+    )
+    poller = ChangePoller()
+    chunks = []
+    result = ImportService.import_books(source, fmt='csv', added_by=1, chunk_size=2,
+                                        progress=lambda result: chunks.append(result['read']))
+
+    assert (result['read'], result['added'], result['merged'], result['copies']) == (6, 2, 2, 7)
+    assert result['errors'] == [(4, "Isbn is required."), (5, "Publication year must be a valid number.")]
+    assert chunks == [2, 4, 6, 6]
+
+    books = {book.isbn: book for book in BookService.get_all_books()}
+    assert (books['111'].total_copies, books['111'].available_copies) == (5, 5)
+    assert (books['222'].total_copies, books['222'].category) == (3, "Classics")
+    assert {row['category']: (row['titles'], row['copies']) for row in ReportService.get_category_summary()} \
+        == {'Sci-Fi': (1, 5), 'Classics': (2, 4)}
+    assert ReportService.rebuild_summaries(verify_only=True)['category_summary'] == []
+    ids = {isbn: book.book_id for isbn, book in books.items()}
+    assert poller.poll() == {'book': {'insert': [ids['222'], ids['444']], 'update': [ids['111'], ids['222']]}}
+
+
+def test_marc21_and_marcxml_records_map_to_books(library):
+    record = _marc21([
+        ("001", "", []),
+        ("020", "  ", [("a", "0131103628 (pbk.)")]),
+        ("100", "1 ", [("a", "Kernighan, Brian W.,")]),
+        ("245", "14", [("a", "The C programming language :"), ("b", "ANSI C /")]),
+        ("264", " 1", [("b", "Prentice Hall,"), ("c", "c1988.")]),
+        ("650", " 0", [("a", "C (Computer program language).")]),
+        ("852", "  ", [("h", "QA76.73")]),
+        ("852", "  ", [("h", "QA76.73")]),
+    ])
+    [(position, book)] = read_marc21(io.BytesIO(record + b"\n"))
+    assert position == 1
+    assert book == {'isbn': "0131103628", 'title': "The C programming language: ANSI C",
+                    'author': "Kernighan, Brian W", 'publisher': "Prentice Hall", 'publication_year': "1988",
+                    'category': "C (Computer program language)", 'total_copies': 2, 'shelf_location': "QA76.73"}
+
+    xml = io.BytesIO(b"""<?xml version="1.0"?>
+        <collection xmlns="http://www.loc.gov/MARC21/slim">
+          <record><datafield tag="020" ind1=" " ind2=" "><subfield code="a">555</subfield></datafield>
+                  <datafield tag="245" ind1="0" ind2="0"><subfield code="a">Emma.</subfield></datafield>
+                  <datafield tag="100" ind1="1" ind2=" "><subfield code="a">Austen, Jane.</subfield></datafield>
+          </record>
+          <record><datafield tag="245" ind1="0" ind2="0"><subfield code="a">Untitled</subfield></datafield></record>
+        </collection>""")
+    assert [(position, book['isbn'], book['title']) for position, book in read_marcxml(xml)] \
+        == [(1, "555", "Emma"), (2, None, "Untitled")]
+
+    result = ImportService.import_books(io.BytesIO(record + record), fmt='marc', added_by=1)
+    assert (result['added'], result['copies'], result['errors']) == (1, 4, [])
+    assert BookService.get_book_by_id(2).total_copies == 4
+
+
+def test_rows_the_database_refuses_do_not_sink_their_chunk(library):
+    library.execute_query("CREATE TRIGGER no_drafts BEFORE INSERT ON books WHEN NEW.title = 'Draft' "
+                          "BEGIN SELECT RAISE(ABORT, 'drafts are not catalogued'); END")
+    source = io.StringIO("isbn,title,author\n222,Emma,Austen\n333,Draft,Nobody\n444,Persuasion,Austen\n")
+    result = ImportService.import_books(source, fmt='csv', added_by=1)
+
+    assert (result['added'], result['failed']) == (2, 1)
+    assert result['errors'][0][0] == 3 and "drafts are not catalogued" in result['errors'][0][1]
+    assert sorted(book.isbn for book in BookService.get_all_books()) == ["111", "222", "444"]
+    assert ReportService.rebuild_summaries(verify_only=True)['category_summary'] == []
@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import patch
+from app.services.book_service import BookService
+
+
+def _book_row(book_id, isbn, title):
+    return {
+        'book_id': book_id, 'isbn': isbn, 'title': title, 'author': 'Author',
+        'publisher': None, 'publication_year': None, 'category': None,
+        'total_copies': 1, 'available_copies': 1, 'shelf_location': None, 'added_by': 1
+    }
+
+
+@pytest.fixture
+def mock_db():
+    with patch('app.services.book_service.db') as mock:
+        yield mock
+
+
+def test_scanned_isbn_returns_exact_match_only(mock_db):
+    mock_db.execute_query.return_value = [_book_row(7, '9780141036144', '1984')]
+
+    books = BookService.search_books('9780141036144')
+
+    assert [b.book_id for b in books] == [7]
+    mock_db.execute_query.assert_called_once()
+    assert "b.isbn = %s OR b.book_id = %s" in mock_db.execute_query.call_args[0][0]
+
+
+def test_words_use_fulltext_with_prefix_terms(mock_db):
+    mock_db.execute_query.return_value = [_book_row(3, '111', 'The Lord of the Rings')]
+
+    books = BookService.search_books('lord of the rin', limit=20)
+
+    query, params = mock_db.execute_query.call_args[0][:2]
+    assert "MATCH(b.title, b.author, b.publisher, b.category) AGAINST (%s IN BOOLEAN MODE)" in query
+    assert params == ('+lord* +rin*', '+lord* +rin*', 20, 0)
+    assert books[0].title == 'The Lord of the Rings'
+
+
+def test_numeric_term_lists_id_match_before_fulltext_hits(mock_db):
+    mock_db.execute_query.side_effect = [
+        [_book_row(1984, '222', 'Some Atlas')],
+        [_book_row(5, '333', '1984'), _book_row(6, '444', '1984 Revisited')],
+    ]
+
+    books = BookService.search_books('1984', limit=3)
+
+    assert [b.book_id for b in books] == [1984, 5, 6]
+    query, params = mock_db.execute_query.call_args[0][:2]
+    assert "AND b.book_id NOT IN (%s)" in query
+    # The exact hit takes one slot of the first page
+    assert params == ('+1984*', 1984, '+1984*', 2, 0)
+
+
+def test_later_pages_continue_after_the_exact_hits(mock_db):
+    mock_db.execute_query.side_effect = [[_book_row(1984, '222', 'Some Atlas')], []]
+
+    BookService.search_books('1984', limit=3, offset=3)
+
+    query, params = mock_db.execute_query.call_args[0][:2]
+    assert "AND b.book_id NOT IN (%s)" in query
+    # Page two starts where page one's two ranked rows stopped, still without the exact hit
+    assert params == ('+1984*', 1984, '+1984*', 3, 2)
+
+
+def test_short_words_fall_back_to_title_prefix(mock_db):
+    mock_db.execute_query.return_value = []
+
+    BookService.search_books('it', available_only=True)
+
+    query, params = mock_db.execute_query.call_args[0][:2]
+    assert "b.title LIKE %s AND b.available_copies > 0" in query
+    assert params[0] == 'it%'
@@ -0,0 +1,92 @@
+import pytest
+from unittest.mock import patch
+from app.services.book_service import BookService
+from app.services import catalogue_cache
+from app.services.catalogue_cache import catalogue
+from app.services.loan_service import LoanService
+from app.services.report_service import ReportService
+
+
+
+@pytest.fixture
+def library(sqlite_db):
+    for n, (title, category) in enumerate([("Dune", "Sci-Fi"), ("Emma", "Classics"), ("Beloved", "Classics")]):
+        assert BookService.add_book({
+            'isbn': f"isbn-{n}", 'title': title, 'author': "Author", 'category': category,
+            'total_copies': 2, 'available_copies': 1, 'added_by': 1,
+        })
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES ('Ada', 'Reader', '0', 'Street')")
+    yield sqlite_db
+
+
+def _counts(before):
+    stats = catalogue.stats()
+    return stats['misses'] - before['misses'], stats['hits'] - before['hits']
+
+
+def test_reads_are_served_from_one_load(library):
+    before = catalogue.stats()
+    assert [book.title for book in BookService.get_all_books()] == ["Beloved", "Dune", "Emma"]
+    assert BookService.get_book_by_id(2).title == "Emma"
+    assert catalogue.book_by_isbn("isbn-0")['title'] == "Dune"
+    assert [row['title'] for row in ReportService.get_books_by_category("Classics")] == ["Beloved", "Emma"]
+    assert catalogue.stats()['size'] == 3
+    assert _counts(before) == (1, 3)
+
+
+def test_writes_patch_the_cache(library):
+    before = catalogue.stats()
+    BookService.get_all_books()
+    assert LoanService.issue_loan(1, 1, issued_by=1)
+    assert [book.title for book in BookService.get_available_books()] == ["Beloved", "Emma"]
+
+    book = BookService.get_book_by_id(2)
+    assert BookService.update_book({
+        'book_id': 2, 'isbn': book.isbn, 'title': "Emma (Annotated)", 'author': book.author,
+        'category': "Sci-Fi", 'total_copies': 2, 'available_copies': 1,
+    })
+    assert BookService.delete_book(3)
+    assert BookService.add_book({'isbn': "isbn-9", 'title': "Anathem", 'author': "Stephenson",
+                                 'category': "Sci-Fi", 'total_copies': 1, 'available_copies': 1, 'added_by': 1})
+    assert LoanService.return_loan(1)
+
+    cached = [(row['book_id'], row['title'], row['category'], row['available_copies'])
+              for row in ReportService.get_all_books()]
+    assert _counts(before)[0] == 1
+    catalogue.invalidate()
+    assert cached == [(row['book_id'], row['title'], row['category'], row['available_copies'])
+                      for row in ReportService.get_all_books()]
+    assert cached[0][1] == "Anathem" and cached[1][3] == 1
+
+
+def test_expired_snapshot_is_reloaded(library):
+    catalogue.configure(max_age=0)
+    try:
+        BookService.get_all_books()
+        library.execute_query("UPDATE books SET title = 'Dune Messiah' WHERE book_id = 1")
+        assert "Dune Messiah" in [book.title for book in BookService.get_all_books()]
+        assert catalogue.stats()['expired'] >= 1
+    finally:
+        catalogue.configure()
+
+
+def test_refresh_rereads_when_a_write_lands_during_its_query(library):
+    BookService.get_all_books()
+    query = catalogue_cache.db.execute_query
+    calls = []
+
+    def racing_query(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            # Another desk's issue lands between the row being read and being cached
+            query("UPDATE books SET available_copies = 0 WHERE book_id = 1")
+            catalogue.adjust_available({1: -1})
+        return query(*args, **kwargs)
+
+    library.execute_query("UPDATE books SET title = 'Dune Messiah' WHERE book_id = 1")
+    with patch.object(catalogue_cache.db, 'execute_query', side_effect=racing_query):
+        catalogue.refresh(1)
+
+    assert len(calls) == 2
+    assert (catalogue.book(1)['title'], catalogue.book(1)['available_copies']) == ("Dune Messiah", 0)
@@ -0,0 +1,65 @@
+from datetime import date
+from unittest.mock import patch
+from app.services.book_service import BookService
+from app.services.change_feed import ChangePoller
+from app.services.fine_service import FineService
+from app.services.loan_service import LoanService
+from app.services.member_service import MemberService
+
+
+def test_mutations_are_written_to_the_feed(sqlite_db):
+    poller = ChangePoller()
+    assert MemberService.register_member({'first_name': "Ada", 'last_name': "Reader", 'phone': "0",
+                                          'address': "Street", 'city': "Lahore", 'registered_by': 1})
+    for n in range(2):
+        assert BookService.add_book({'isbn': f"isbn-{n}", 'title': f"Book {n}", 'author': "Author",
+                                     'total_copies': 2, 'available_copies': 2, 'added_by': 1})
+    assert poller.poll() == {'member': {'insert': [1]}, 'book': {'insert': [1, 2]}}
+
+    assert LoanService.issue_loans(1, [1, 2], issued_by=1)['issued'] == [1, 2]
+    assert poller.poll() == {'book': {'update': [1, 2]}, 'loan': {'insert': [1, 2]}}
+
+    sqlite_db.execute_query("UPDATE loans SET due_date = %s", (date(2024, 5, 1),))
+    LoanService.sweep_overdue(as_of=date(2024, 5, 3))
+    assert LoanService.return_loans([1], return_date=date(2024, 5, 3))['total_fines'] == 10.0
+    assert FineService.pay_fine(1, 4)
+    assert BookService.delete_book(2) is False  # still on loan
+    assert poller.poll() == {'loan': {'update': [1, 2]}, 'book': {'update': [1]}}
+    assert poller.poll() == {}
+    assert ChangePoller().poll() == {}  # a new window starts from now
+
+
+def test_basket_checkout_reports_only_the_loans_it_made(sqlite_db):
+    assert MemberService.register_member({'first_name': "Ada", 'last_name': "Reader", 'phone': "0",
+                                          'address': "Street", 'city': "Lahore", 'registered_by': 1})
+    for n in range(2):
+        assert BookService.add_book({'isbn': f"isbn-{n}", 'title': f"Book {n}", 'author': "Author",
+                                     'total_copies': 2, 'available_copies': 2, 'added_by': 1})
+    assert LoanService.issue_loan(1, 1, issued_by=1)
+    poller = ChangePoller()
+
+    # The member already has book 1 out; only the second copy's loan is new
+    assert LoanService.issue_loans(1, [1, 2], issued_by=1)['issued'] == [1, 2]
+    assert poller.poll() == {'book': {'update': [1, 2]}, 'loan': {'insert': [2, 3]}}
+
+
+def test_poller_picks_up_ids_committed_out_of_order(sqlite_db):
+    poller = ChangePoller()
+    # A slow transaction took id 1 but commits after a faster one wrote id 2
+    sqlite_db.execute_query("INSERT INTO change_log (change_id, entity, entity_id, action) VALUES (2, 'book', 20, 'update')")
+    assert poller.poll() == {'book': {'update': [20]}}
+    sqlite_db.execute_query("INSERT INTO change_log (change_id, entity, entity_id, action) VALUES (1, 'book', 10, 'update')")
+    assert poller.poll() == {'book': {'update': [10]}}
+    assert poller.poll() == {}
+
+
+def test_quiet_polls_only_read_past_the_last_id(sqlite_db):
+    poller = ChangePoller(gap_seconds=0)
+    sqlite_db.execute_query("INSERT INTO change_log (change_id, entity, entity_id, action) VALUES (3, 'book', 30, 'update')")
+    assert poller.poll() == {'book': {'update': [30]}}
+    # Ids 1 and 2 were given up on at once; a rolled-back transaction's id never commits
+    assert poller._gaps == {}
+    sqlite_db.execute_query("INSERT INTO change_log (change_id, entity, entity_id, action) VALUES (1, 'book', 10, 'update')")
+    with patch('app.services.change_feed.ChangeFeed.changes_in') as changes_in:
+        assert poller.poll() == {}
+    changes_in.assert_not_called()
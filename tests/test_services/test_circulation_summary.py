@@ -0,0 +1,76 @@
+import pytest
+from datetime import date, datetime, timedelta
+from app.services.book_service import BookService
+from app.services.fine_service import FineService
+from app.services.loan_service import LoanService
+from app.services.report_service import ReportService
+
+
+
+@pytest.fixture
+def library(sqlite_db):
+    for n, (category, copies) in enumerate([("Fantasy", 3), ("Fantasy", 2), ("History", 4), (None, 1)]):
+        assert BookService.add_book({
+            'isbn': f"isbn-{n}", 'title': f"Book {n}", 'author': "Author", 'category': category,
+            'total_copies': copies, 'available_copies': copies, 'added_by': 1,
+        })
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES ('Ada', 'Reader', '0', 'Street')")
+    yield sqlite_db
+
+
+def _summary():
+    return {row['category']: (row['titles'], row['copies'], row['on_loan'], row['overdue'],
+                              float(row['pending_fines']))
+            for row in ReportService.get_category_summary()}
+
+
+def test_services_keep_summaries_in_step_with_raw_tables(library):
+    assert LoanService.issue_loan(1, 1, issued_by=1)
+    assert LoanService.issue_loans(1, [2, 3], issued_by=1)['issued'] == [2, 3]
+    # Backdate loan 1 so returning it assesses a $15 fine
+    library.execute_query("UPDATE loans SET due_date = %s WHERE loan_id = 1",
+                          (datetime.now() - timedelta(days=3),))
+    assert LoanService.return_loan(1)
+    assert LoanService.return_loans(book_ids=[3], return_date=date.today())['returned'] == [3]
+
+    assert _summary() == {
+        "Fantasy": (2, 5, 1, 0, 15.0),
+        "History": (1, 4, 0, 0, 0.0),
+        "": (1, 1, 0, 0, 0.0),
+    }
+    today = ReportService.get_daily_circulation(date.today(), date.today())
+    assert [(row['issued'], row['returned'], float(row['fines_assessed'])) for row in today] == [(3, 2, 15.0)]
+
+    # Moving a book carries its open loan over; paying clears the pending fine
+    book = BookService.get_book_by_id(2)
+    assert BookService.update_book({
+        'book_id': 2, 'isbn': book.isbn, 'title': book.title, 'author': book.author,
+        'category': "History", 'total_copies': 6, 'available_copies': 5,
+    })
+    assert FineService.mark_fine_as_paid(1)
+    assert FineService.get_total_pending_fines() == 0
+    assert BookService.delete_book(4)
+
+    assert _summary()["Fantasy"] == (1, 3, 0, 0, 0.0)
+    assert _summary()["History"] == (2, 10, 1, 0, 0.0)
+    assert ReportService.rebuild_summaries(verify_only=True) == {'category_summary': [], 'daily_circulation': [], 'library_totals': []}
+
+
+def test_rebuild_repairs_drift(library):
+    LoanService.issue_loan(3, 1, issued_by=1)
+    library.execute_query("UPDATE category_summary SET on_loan = 7 WHERE category = 'History'")
+    # Recent days are rolled up again from loans; an older day is only repaired by a rebuild
+    library.execute_query("INSERT INTO daily_circulation (day, issued) VALUES ('2020-01-01', 4)")
+    library.execute_query("UPDATE library_totals SET pending_fines = 12")
+
+    report = ReportService.rebuild_summaries(verify_only=True)
+    assert len(report['category_summary']) == 1
+    assert len(report['daily_circulation']) == 1
+    assert len(report['library_totals']) == 1
+    assert _summary()["History"][2] == 7
+
+    ReportService.rebuild_summaries()
+    assert _summary()["History"][2] == 1
+    assert FineService.get_total_pending_fines() == 0
+    assert ReportService.rebuild_summaries(verify_only=True) == {'category_summary': [], 'daily_circulation': [], 'library_totals': []}
@@ -0,0 +1,59 @@
+import pytest
+from datetime import date
+from app.services.fine_service import FineService
+from app.services.loan_service import LoanService
+from app.services.report_service import ReportService
+
+
+
+@pytest.fixture
+def ledger_db(sqlite_db):
+    for name in ['Ada', 'Bo']:
+        sqlite_db.execute_query(
+            "INSERT INTO members (first_name, last_name, phone, address) VALUES (%s, 'Reader', '0', 'Street')",
+            (name,))
+    sqlite_db.execute_query(
+        """INSERT INTO books (isbn, title, author, category, total_copies, available_copies, added_by)
+           VALUES ('1', 'Dune', 'Herbert', 'Sci-Fi', 5, 2, 1)""")
+    # Ada's loans come back 4 and 2 days late, Bo's 1 day late: $20, $10 and $5
+    for member_id, due_date in [(1, date(2024, 5, 6)), (1, date(2024, 5, 8)), (2, date(2024, 5, 9))]:
+        sqlite_db.execute_query(
+            "INSERT INTO loans (book_id, member_id, due_date, issued_by) VALUES (1, %s, %s, 1)",
+            (member_id, due_date))
+    ReportService.rebuild_summaries()
+    assert LoanService.return_loans([1, 2, 3], return_date=date(2024, 5, 10))['total_fines'] == 35.0
+    yield sqlite_db
+
+
+def test_returns_assess_fines_into_ledger_and_balances(ledger_db):
+    assert FineService.get_member_balance(1) == 30.0
+    assert FineService.get_member_balance(2) == 5.0
+    assert FineService.get_total_pending_fines() == 35.0
+    assert [row['txn_type'] for row in FineService.get_member_statement(1)] == ['assess', 'assess']
+
+
+def test_partial_and_batched_payments(ledger_db):
+    assert FineService.pay_fine(1, 8)
+    assert FineService.get_member_balance(1) == 22.0
+    assert [row['outstanding'] for row in FineService.query_fines(status='pending', search='1')] == [12.0]
+
+    result = FineService.post_payments([(1, None), (2, 4), (3, 6), (99, 1)])
+    assert result['posted'] == {1: 12.0, 2: 4.0}
+    assert set(result['rejected']) == {3, 99}
+    assert FineService.waive_fine(2)
+
+    statuses = ledger_db.execute_query("SELECT loan_id, fine_status FROM loans ORDER BY loan_id", fetch=True)
+    assert [row['fine_status'] for row in statuses] == ['paid', 'waived', 'pending']
+    assert sorted(row['loan_id'] for row in LoanService.get_loans_with_fines()) == [1, 2, 3]
+    assert FineService.get_member_balance(1) == 0.0
+    assert FineService.get_total_pending_fines() == 5.0
+    assert ReportService.rebuild_summaries(verify_only=True)['category_summary'] == []
+    assert FineService.reconcile_balances(verify_only=True) == {'member_balances': [], 'loans': []}
+
+
+def test_reconcile_rebuilds_member_balances_from_ledger(ledger_db):
+    ledger_db.execute_query("UPDATE member_balances SET balance = 0 WHERE member_id = 2")
+    report = FineService.reconcile_balances()
+    assert report['member_balances'] == ["member 2: stored 0.0, expected 5.0"]
+    assert FineService.get_member_balance(2) == 5.0
+    assert FineService.reconcile_balances(verify_only=True)['member_balances'] == []
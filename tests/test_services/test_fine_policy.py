@@ -0,0 +1,89 @@
+import random
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta
+from app.models.loan import Loan
+from app.services.fine_policy import FinePolicy, _to_day, _to_days
+from app.services.fine_service import FineService
+from app.services.loan_service import FINE_CONTEXT_SQL
+
+POLICY = FinePolicy(
+    daily_rate=5.0,
+    category_rates={"Reference": 10.0},
+    membership_rates={"staff": 0.0, "student": 2.5},
+    grace_days=2,
+    max_fine=60.0,
+    holidays=[date(2024, 3, 23), date(2024, 3, 25)],
+)
+
+
+def test_default_policy_charges_five_per_day():
+    fines = FineService.calculate_fines(
+        [date(2024, 3, 1), date(2024, 3, 1), '2024-03-01 00:00:00'],
+        [date(2024, 3, 6), date(2024, 2, 28), datetime(2024, 3, 4, 18, 30)])
+
+    assert fines.tolist() == [25.0, 0.0, 15.0]
+
+
+def test_dates_convert_the_same_in_bulk_and_one_by_one():
+    batches = [
+        [date(2024, 3, 1), None, datetime(2024, 3, 4, 18, 30)],
+        ['2024-03-01 00:00:00', None, '2024-03-04'],
+        [date(2024, 3, 1), '2024-03-02 10:00:00', None, datetime(2024, 3, 4, 23, 59)],
+    ]
+    for values in batches:
+        expected = [None if value is None else str(_to_day(value)) for value in values]
+        assert [None if np.isnat(day) else str(day) for day in _to_days(values)] == expected
+
+
+def test_policy_rules():
+    due = [date(2024, 3, 20)] * 5
+    returned = [date(2024, 3, 22), date(2024, 3, 26), date(2024, 3, 26), date(2024, 3, 26), date(2024, 4, 30)]
+
+    fines = POLICY.fines(due, returned,
+                         categories=["Fiction", "Fiction", "Reference", "Reference", "Fiction"],
+                         membership_types=["standard", "standard", "standard", "student", "standard"])
+
+    # 3/26 is 6 days late, minus two holidays and two grace days -> 2 chargeable days
+    assert fines.tolist() == [0.0, 10.0, 20.0, 5.0, 60.0]
+    assert POLICY.fine(date(2024, 3, 20), date(2024, 3, 26), "Reference", "staff") == 0.0
+
+
+def test_loan_model_applies_the_given_policy():
+    loan = Loan(due_date='2024-03-01 00:00:00', return_date='2024-03-04 09:00:00')
+
+    assert loan.calculate_fine(FineService.policy) == 15.0
+    assert loan.calculate_fine(FinePolicy(daily_rate=1.0)) == 3.0
+    assert loan.calculate_fine(POLICY, category="Reference") == 10.0
+
+
+def test_sql_expression_matches_vectorised_engine(sqlite_db):
+    sqlite_db.execute_query("INSERT INTO members (first_name, last_name, phone, address, membership_type) "
+                            "VALUES ('S', 'Staff', '0', 'x', 'staff'), ('T', 'Student', '0', 'x', 'student'), "
+                            "('P', 'Public', '0', 'x', 'standard')")
+    sqlite_db.execute_query("INSERT INTO books (isbn, title, author, category, added_by) "
+                            "VALUES ('1', 'A', 'a', 'Reference', 1), ('2', 'B', 'b', 'Fiction', 1), "
+                            "('3', 'C', 'c', NULL, 1)")
+    rng = random.Random(7)
+    loans = [(rng.randint(1, 3), rng.randint(1, 3), date(2024, 3, 1) + timedelta(days=rng.randint(0, 40)))
+             for _ in range(200)]
+    for book_id, member_id, due_date in loans:
+        sqlite_db.execute_query(
+            "INSERT INTO loans (book_id, member_id, due_date, issued_by) VALUES (%s, %s, %s, 1)",
+            (book_id, member_id, due_date))
+
+    until = date(2024, 4, 1)
+    fine_sql, params = POLICY.to_sql(until, *FINE_CONTEXT_SQL)
+    rows = sqlite_db.execute_query(f"""
+        SELECT loans.loan_id, {fine_sql} AS fine,
+               b.category, m.membership_type, loans.due_date
+        FROM loans
+        JOIN books b ON b.book_id = loans.book_id
+        JOIN members m ON m.member_id = loans.member_id
+        ORDER BY loans.loan_id
+    """, params, fetch=True)
+
+    expected = POLICY.fines([row['due_date'] for row in rows], [until] * len(rows),
+                            [row['category'] for row in rows], [row['membership_type'] for row in rows])
+    assert [pytest.approx(row['fine']) for row in rows] == expected.tolist()
+    assert any(fine > 0 for fine in expected) and any(fine == 0 for fine in expected)
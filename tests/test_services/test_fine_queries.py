@@ -0,0 +1,53 @@
+import pytest
+from datetime import date, timedelta
+from app.services.fine_service import FineService
+from app.views.base_view import keyset_source
+
+
+@pytest.fixture
+def fines_db(sqlite_db):
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES ('Ada', 'Reader', '0', 'Street')")
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES ('Bo', 'Lender', '0', 'Street')")
+    for title in ['Dune', 'Emma']:
+        sqlite_db.execute_query(
+            """INSERT INTO books (isbn, title, author, total_copies, available_copies, added_by)
+               VALUES (%s, %s, 'Author', 5, 5, 1)""", (title, title))
+    # Repeated due dates make the loan_id tie-breaker matter at page edges
+    for n in range(45):
+        status = ['pending', 'paid', 'none'][n % 3]
+        amount = 0 if status == 'none' else 5 + n
+        sqlite_db.execute_query(
+            """INSERT INTO loans (book_id, member_id, due_date, return_date, fine_amount, fine_status, issued_by)
+               VALUES (%s, %s, %s, %s, %s, %s, 1)""",
+            (n % 2 + 1, n % 2 + 1, date(2024, 1, 1) + timedelta(days=n // 4), date(2024, 3, 1), amount, status))
+    yield sqlite_db
+
+
+def _walk(status=None, search=None, limit=4):
+    fetch_page = keyset_source(
+        lambda after_key, limit: FineService.query_fines(status, search, limit, after_key), FineService.page_key)
+    rows, after_key = [], None
+    while True:
+        page, after_key = fetch_page(after_key, limit)
+        rows.extend(page)
+        if after_key is None:
+            return rows
+
+
+def test_query_fines_pages_every_fine_once_in_order(fines_db):
+    rows = _walk()
+    assert len(rows) == 30
+    assert len({row['loan_id'] for row in rows}) == 30
+    assert [FineService.page_key(row) for row in rows] == sorted(FineService.page_key(row) for row in rows)
+
+
+def test_query_fines_filters_by_status_and_search(fines_db):
+    pending = _walk("Pending")
+    assert len(pending) == 15 and {row['fine_status'] for row in pending} == {'pending'}
+
+    dune = _walk("Paid", search="Dune")
+    assert dune and all(row['book_title'] == 'Dune' and row['fine_status'] == 'paid' for row in dune)
+    assert {row['member_name'] for row in _walk(search="Lender")} == {'Bo Lender'}
+    assert [row['loan_id'] for row in FineService.query_fines(search="4")] == [4]
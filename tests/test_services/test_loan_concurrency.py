@@ -0,0 +1,179 @@
+import random
+import threading
+import time
+import pytest
+from datetime import date
+from app.services.loan_service import LoanService
+from app.services.report_service import ReportService
+
+BOOKS = 20
+COPIES_PER_BOOK = 25
+MEMBERS = 50
+THREADS = 16
+CHECKOUTS = 2000
+
+
+def _stock(handler):
+    """Members and books for the desks; returns (book ids, member ids, user id)"""
+    user = handler.execute_query("SELECT MIN(user_id) AS user_id FROM users", fetch=True)[0]['user_id']
+    if user is None:
+        handler.execute_query("INSERT INTO users (username, password, full_name, role) VALUES (%s, %s, %s, %s)",
+                              ("desk", "x", "Desk Librarian", "librarian"))
+        user = handler.execute_query("SELECT MIN(user_id) AS user_id FROM users", fetch=True)[0]['user_id']
+    for n in range(MEMBERS):
+        handler.execute_query(
+            "INSERT INTO members (first_name, last_name, phone, address) VALUES (%s, %s, %s, %s)",
+            (f"Member{n}", "Test", "000", "Street")
+        )
+    for n in range(BOOKS):
+        handler.execute_query(
+            """INSERT INTO books (isbn, title, author, total_copies, available_copies, added_by)
+               VALUES (%s, %s, %s, %s, %s, %s)""",
+            (f"isbn-{n}", f"Book {n}", "Author", COPIES_PER_BOOK, COPIES_PER_BOOK, user)
+        )
+    book_ids = [row['book_id'] for row in handler.execute_query("SELECT book_id FROM books ORDER BY book_id",
+                                                                 fetch=True)]
+    member_ids = [row['member_id'] for row in handler.execute_query(
+        "SELECT member_id FROM members ORDER BY member_id", fetch=True)]
+    return book_ids, member_ids, user
+
+
+@pytest.fixture
+def stand_in_db(sqlite_db):
+    _stock(sqlite_db)
+    yield sqlite_db
+
+
+def test_concurrent_checkouts_never_oversell(mysql_db):
+    """Thousands of racing checkouts lend exactly the copies on the shelf.
+
+    Runs on MySQL only: the SQLite stand-in takes its write lock at BEGIN,
+    so its desks run one after another and even an unguarded read-then-
+    decrement checkout would pass. InnoDB lets the desks interleave.
+    """
+    book_ids, member_ids, user = _stock(mysql_db)
+    rng = random.Random(42)
+    requests = [(rng.choice(book_ids), rng.choice(member_ids)) for _ in range(CHECKOUTS)]
+    chunks = [requests[i::THREADS] for i in range(THREADS)]
+    successes = [0] * THREADS
+    start_line = threading.Barrier(THREADS)
+
+    def desk(index):
+        start_line.wait()
+        for book_id, member_id in chunks[index]:
+            if LoanService.issue_loan(book_id, member_id, issued_by=user):
+                successes[index] += 1
+
+    threads = [threading.Thread(target=desk, args=(i,)) for i in range(THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{CHECKOUTS} checkouts on {THREADS} threads in {elapsed:.2f}s "
+          f"({CHECKOUTS / elapsed:.0f} checkouts/s)")
+
+    books = mysql_db.execute_query("SELECT book_id, available_copies FROM books", fetch=True)
+    loans = mysql_db.execute_query(
+        "SELECT book_id, COUNT(*) AS n FROM loans GROUP BY book_id", fetch=True
+    )
+    loans_by_book = {row['book_id']: row['n'] for row in loans}
+
+    assert all(book['available_copies'] >= 0 for book in books)
+    for book in books:
+        # Every copy that left the shelf has exactly one loan row behind it
+        assert book['available_copies'] + loans_by_book.get(book['book_id'], 0) == COPIES_PER_BOOK
+    assert sum(successes) == sum(loans_by_book.values())
+    # Demand (~100 requests per title) exceeds supply, so every copy goes out exactly once
+    assert sum(successes) == BOOKS * COPIES_PER_BOOK
+
+
+@pytest.mark.parametrize("backend", ["sqlite_db", "mysql_db"])
+def test_concurrent_returns_are_all_counted_in_daily_circulation(backend, request):
+    """Roll-ups racing the desks neither lose nor double-count a return"""
+    handler = request.getfixturevalue(backend)
+    book_ids, member_ids, user = _stock(handler)
+    for n, member_id in enumerate(member_ids):
+        basket = [book_ids[(n * 4 + k) % len(book_ids)] for k in range(4)]
+        assert len(LoanService.issue_loans(member_id, basket, issued_by=user)['issued']) == 4
+    ReportService.roll_up_circulation()
+    loan_ids = [row['loan_id'] for row in handler.execute_query("SELECT loan_id FROM loans", fetch=True)]
+    chunks = [loan_ids[i::THREADS] for i in range(THREADS)]
+    desks_done = threading.Event()
+    start_line = threading.Barrier(THREADS + 1)
+    returned = [0] * THREADS
+
+    def desk(index):
+        start_line.wait()
+        for loan_id in chunks[index]:
+            returned[index] += LoanService.return_loan(loan_id)
+
+    def roll_up():
+        start_line.wait()
+        while not desks_done.wait(0.005):
+            ReportService.roll_up_circulation()
+
+    threads = [threading.Thread(target=desk, args=(i,)) for i in range(THREADS)]
+    roller = threading.Thread(target=roll_up)
+    for thread in threads + [roller]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    desks_done.set()
+    roller.join()
+
+    assert sum(returned) == len(loan_ids)
+    today = ReportService.get_daily_circulation(date.today(), date.today())
+    assert [(row['issued'], row['returned']) for row in today] == [(len(loan_ids), len(loan_ids))]
+    assert ReportService.rebuild_summaries(verify_only=True)['daily_circulation'] == []
+
+
+def test_issue_loans_lends_basket_atomically(stand_in_db):
+    """Bulk checkout lends what it can and reports the rest per book"""
+    stand_in_db.execute_query("UPDATE books SET available_copies = 0 WHERE book_id = 3")
+
+    result = LoanService.issue_loans(member_id=1, book_ids=[1, 2, 3, 999], issued_by=1)
+
+    assert result['issued'] == [1, 2]
+    assert result['failed'] == {3: "No copies available", 999: "Book not found"}
+    books = stand_in_db.execute_query(
+        "SELECT book_id, available_copies FROM books WHERE book_id IN (1, 2, 3) ORDER BY book_id", fetch=True
+    )
+    assert [book['available_copies'] for book in books] == [COPIES_PER_BOOK - 1, COPIES_PER_BOOK - 1, 0]
+    loans = stand_in_db.execute_query("SELECT book_id FROM loans WHERE member_id = 1 ORDER BY book_id", fetch=True)
+    assert [loan['book_id'] for loan in loans] == [1, 2]
+
+
+def test_return_loans_batch_by_scanned_book(stand_in_db):
+    """Book-drop batch: fines from DATEDIFF, copies restored per title"""
+    loans = [
+        (1, 1, date(2024, 1, 1)),   # 10 days late on 2024-01-11
+        (1, 2, date(2024, 1, 1)),   # second copy of book 1 out to another member
+        (2, 3, date(2024, 1, 20)),  # on time
+    ]
+    for book_id, member_id, due_date in loans:
+        stand_in_db.execute_query(
+            "INSERT INTO loans (book_id, member_id, due_date, issued_by) VALUES (%s, %s, %s, 1)",
+            (book_id, member_id, due_date)
+        )
+        stand_in_db.execute_query(
+            "UPDATE books SET available_copies = available_copies - 1 WHERE book_id = %s", (book_id,)
+        )
+
+    summary = LoanService.return_loans(book_ids=[1, 1, 2, 5], return_date=date(2024, 1, 11))
+
+    assert summary['returned'] == [1, 2, 3]
+    assert summary['not_found'] == [5]
+    assert summary['fines'] == {1: 50.0, 2: 50.0}
+    assert summary['total_fines'] == 100.0
+    copies = stand_in_db.execute_query(
+        "SELECT available_copies FROM books WHERE book_id IN (1, 2) ORDER BY book_id", fetch=True
+    )
+    assert [row['available_copies'] for row in copies] == [COPIES_PER_BOOK, COPIES_PER_BOOK]
+
+    # Re-scanning the same copies finds nothing left to return
+    again = LoanService.return_loans(loan_ids=[1, 2, 3], return_date=date(2024, 1, 12))
+    assert again['returned'] == []
+    assert again['not_found'] == [1, 2, 3]
@@ -4,18 +4,24 @@ from datetime import datetime, timedelta
 from app.services.loan_service import LoanService
 
 @pytest.fixture
-def mock_db():
-    with patch('app.services.loan_service.db') as mock:
-        mock.execute_query.side_effect = [
-            [{'available_copies': 1}],  # First call - book check
-            None,  # Second call - loan creation
-            None  # Third call - book update
-        ]
+def mock_summary():
+    with patch('app.services.loan_service.ReportService') as mock, \
+            patch('app.services.loan_service.ChangeFeed'):
         yield mock
 
 
-def test_issue_loan_success(mock_db):
+@pytest.fixture
+def mock_tx(mock_summary):
+    with patch('app.services.loan_service.db') as mock:
+        tx = MagicMock()
+        mock.transaction.return_value.__enter__.return_value = tx
+        yield tx
+
+
+def test_issue_loan_success(mock_tx):
     """Test successful book loan issuance"""
+    mock_tx.execute.return_value = 1
+
     # Mock the datetime.now() call
     with patch('app.services.loan_service.datetime') as mock_datetime:
         test_now = datetime(2023, 1, 1)
@@ -24,38 +30,76 @@ def test_issue_loan_success(mock_db):
         result = LoanService.issue_loan(book_id=1, member_id=1, issued_by=1)
 
         assert result is True
-        # Verify transaction was used
-        mock_db.execute_query.assert_any_call("START TRANSACTION")
-        mock_db.execute_query.assert_any_call("COMMIT")
+
+        # Verify the conditional inventory claim comes first
+        update_query = mock_tx.execute.call_args_list[0][0][0]
+        assert "UPDATE books SET available_copies" in update_query
+        assert "available_copies > 0" in update_query
 
         # Verify the loan query
-        loan_query = mock_db.execute_query.call_args_list[2][0][0]
+        loan_query = mock_tx.execute.call_args_list[1][0][0]
         assert "INSERT INTO loans" in loan_query
         assert "(book_id, member_id, issue_date, due_date, issued_by)" in loan_query
 
-        # Verify the book update query
-        update_query = mock_db.execute_query.call_args_list[3][0][0]
-        assert "UPDATE books SET available_copies" in update_query
-
 
-def test_issue_loan_no_available_copies():
+def test_issue_loan_no_available_copies(mock_tx):
     """Test loan issuance when no copies available"""
+    mock_tx.execute.return_value = 0  # Conditional UPDATE matched no row
+
+    result = LoanService.issue_loan(book_id=1, member_id=1, issued_by=1)
+    assert result is False
+    mock_tx.execute.assert_called_once()
+
+
+def test_issue_loan_rolls_back_on_error(mock_summary):
+    """A failing statement propagates out of the transaction block"""
     with patch('app.services.loan_service.db') as mock_db:
-        mock_db.execute_query.return_value = [{'available_copies': 0}]
+        tx = MagicMock()
+        tx.execute.side_effect = [1, Exception("deadlock")]
+        mock_db.transaction.return_value.__enter__.return_value = tx
+        mock_db.transaction.return_value.__exit__.return_value = False
 
         result = LoanService.issue_loan(book_id=1, member_id=1, issued_by=1)
         assert result is False
-        mock_db.execute_query.assert_called_once()
+        exc_type = mock_db.transaction.return_value.__exit__.call_args[0][0]
+        assert exc_type is Exception
 
 
-def test_return_loan_success():
-    """Test successful book return"""
-    with patch('app.services.loan_service.db') as mock_db:
-        mock_db.execute_query.return_value = True
+def test_issue_loans_batches_basket(mock_tx):
+    """Bulk checkout validates, inserts and decrements with one statement each"""
+    mock_tx.fetch.return_value = [
+        {'book_id': 1, 'available_copies': 2},
+        {'book_id': 2, 'available_copies': 0},
+    ]
+    mock_tx.execute.return_value = 1
 
-        result = LoanService.return_loan(loan_id=1)
-        assert result is True
-        mock_db.execute_query.assert_called_once()
+    result = LoanService.issue_loans(member_id=7, book_ids=[1, 2, 3], issued_by=1)
+
+    assert result['issued'] == [1]
+    assert result['failed'] == {2: "No copies available", 3: "Book not found"}
+    mock_tx.fetch.assert_called_once()
+    assert "WHERE book_id IN (%s, %s, %s)" in mock_tx.fetch.call_args[0][0]
+    inserted_rows = mock_tx.executemany.call_args[0][1]
+    assert [row[0] for row in inserted_rows] == [1]
+    mock_tx.execute.assert_called_once()
+
+
+def test_return_loan_success(mock_tx):
+    """Test successful book return"""
+    mock_tx.fetch_one.return_value = {
+        'loan_id': 1,
+        'book_id': 101,
+        'member_id': 201,
+        'loan_status': 'issued',
+        'category': 'Fiction',
+        'membership_type': 'standard',
+        'due_date': datetime.now() + timedelta(days=1)
+    }
+
+    result = LoanService.return_loan(loan_id=1)
+    assert result is True
+    mock_tx.fetch_one.assert_called_once()
+    assert mock_tx.execute.call_count == 2
 
 
 def test_get_active_loans():
@@ -85,40 +129,59 @@ def mock_db():
         yield mock
 
 
-def test_return_loan_with_fine(mock_db):
+def test_return_loan_with_fine(mock_tx):
     """Test returning an overdue loan calculates fine"""
-    # Mock database responses
-    mock_db.execute_query.side_effect = [
-        [{
-            'loan_id': 1,
-            'book_id': 101,
-            'due_date': datetime.now() - timedelta(days=3)
-        }],  # Loan query
-        None,  # Update loan
-        None  # Update book
-    ]
+    mock_tx.fetch_one.return_value = {
+        'loan_id': 1,
+        'book_id': 101,
+        'member_id': 201,
+        'loan_status': 'issued',
+        'category': 'Fiction',
+        'membership_type': 'standard',
+        'due_date': datetime.now() - timedelta(days=3)
+    }
 
     result = LoanService.return_loan(1)
     assert result is True
     # Verify fine amount was calculated (3 days * $5 = $15)
-    assert "fine_amount = 15.0" in mock_db.execute_query.call_args_list[1][0][0]
+    update_params = mock_tx.execute.call_args_list[0][0][1]
+    assert update_params[1] == 15.0
+
+
+def test_return_loan_updates_summaries(mock_tx, mock_summary):
+    """The category summary changes in the same transaction; the daily one is rolled up later"""
+    mock_tx.fetch_one.return_value = {
+        'loan_id': 1,
+        'book_id': 101,
+        'member_id': 201,
+        'loan_status': 'overdue',
+        'category': 'Fiction',
+        'membership_type': 'standard',
+        'due_date': datetime.now() - timedelta(days=2)
+    }
+
+    assert LoanService.return_loan(1) is True
+    mock_summary.adjust_books_summary.assert_called_once_with(
+        mock_tx, {101: {'on_loan': -1, 'pending_fines': 10.0, 'overdue': -1}})
+    assert [call[0] for call in mock_summary.method_calls] == ['adjust_books_summary']
 
 
-def test_return_loan_no_fine(mock_db):
+def test_return_loan_no_fine(mock_tx):
     """Test returning a loan on time has no fine"""
-    mock_db.execute_query.side_effect = [
-        [{
-            'loan_id': 1,
-            'book_id': 101,
-            'due_date': datetime.now() + timedelta(days=1)
-        }],
-        None,
-        None
-    ]
+    mock_tx.fetch_one.return_value = {
+        'loan_id': 1,
+        'book_id': 101,
+        'member_id': 201,
+        'loan_status': 'issued',
+        'category': 'Fiction',
+        'membership_type': 'standard',
+        'due_date': datetime.now() + timedelta(days=1)
+    }
 
     result = LoanService.return_loan(1)
     assert result is True
-    assert "fine_amount = 0.0" in mock_db.execute_query.call_args_list[1][0][0]
+    update_params = mock_tx.execute.call_args_list[0][0][1]
+    assert update_params[1] == 0.0
 
 
 def test_get_loans_with_fines(mock_db):
@@ -12,7 +12,7 @@ def mock_db():
 
 def test_register_member_success(mock_db):
     """Test successful member registration"""
-    mock_db.execute_query.return_value = True
+    tx = mock_db.transaction.return_value.__enter__.return_value
 
     member_data = {
         'first_name': 'John',
@@ -25,7 +25,7 @@ def test_register_member_success(mock_db):
 
     result = MemberService.register_member(member_data)
     assert result is True
-    mock_db.execute_query.assert_called_once()
+    assert "INSERT INTO members" in tx.execute.call_args[0][0]
 
 
 def test_get_member_by_id(mock_db):
@@ -61,4 +61,15 @@ def test_search_members(mock_db):
 
     members = MemberService.search_members("John")
     assert len(members) == 1
-    assert members[0].first_name == "John"
\ No newline at end of file
+    assert members[0].first_name == "John"
+
+def test_membership_type_is_saved(sqlite_db):
+    """The membership type picks the member's rate in the fine policy, so it must be stored"""
+    member_data = {'first_name': 'Sara', 'last_name': 'Ali', 'phone': '0300', 'address': 'Street',
+                   'city': 'Lahore', 'registered_by': 1, 'membership_type': 'student'}
+    assert MemberService.register_member(member_data)
+    member = MemberService.search_members('Sara')[0]
+    assert member.membership_type == 'student'
+
+    assert MemberService.update_member(member.member_id, dict(member_data, membership_type='staff'))
+    assert MemberService.get_member_by_id(member.member_id).membership_type == 'staff'
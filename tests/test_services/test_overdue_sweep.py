@@ -0,0 +1,67 @@
+import pytest
+from datetime import date
+from app.services.loan_service import LoanService
+from app.services.report_service import ReportService
+
+AS_OF = date(2024, 5, 10)
+
+
+@pytest.fixture
+def loans_db(sqlite_db):
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES ('Ada', 'Reader', '0', 'Street')")
+    sqlite_db.execute_query(
+        """INSERT INTO books (isbn, title, author, category, total_copies, available_copies, added_by)
+           VALUES ('1', 'Dune', 'Herbert', 'Sci-Fi', 5, 1, 1)""")
+    for due_date, return_date in [
+        (date(2024, 5, 1), None),            # 9 days late
+        (date(2024, 5, 8), None),            # 2 days late
+        (date(2024, 5, 10), None),           # due today, not late
+        (date(2024, 6, 1), None),            # not due yet
+        (date(2024, 4, 1), date(2024, 4, 2)),  # returned, never swept
+    ]:
+        sqlite_db.execute_query(
+            "INSERT INTO loans (book_id, member_id, due_date, return_date, issued_by) VALUES (1, 1, %s, %s, 1)",
+            (due_date, return_date))
+    ReportService.rebuild_summaries()
+    yield sqlite_db
+
+
+def _loans(db):
+    rows = db.execute_query("SELECT loan_id, loan_status, fine_amount FROM loans ORDER BY loan_id", fetch=True)
+    return [(row['loan_status'], float(row['fine_amount'])) for row in rows]
+
+
+def test_sweep_marks_overdue_and_accrues_fines(loans_db):
+    result = LoanService.sweep_overdue(AS_OF)
+
+    assert result['marked_overdue'] == 2
+    assert result['accrued'] == 2
+    assert _loans(loans_db) == [
+        ('overdue', 45.0), ('overdue', 10.0), ('issued', 0.0), ('issued', 0.0), ('issued', 0.0),
+    ]
+    assert ReportService.get_category_summary()[0]['overdue'] == 2
+    assert ReportService.rebuild_summaries(verify_only=True)['category_summary'] == []
+
+
+def test_sweep_is_idempotent_and_accrues_day_by_day(loans_db):
+    LoanService.sweep_overdue(AS_OF)
+
+    again = LoanService.sweep_overdue(AS_OF)
+    assert (again['marked_overdue'], again['accrued']) == (0, 0)
+
+    next_day = LoanService.sweep_overdue(date(2024, 5, 11))
+    assert (next_day['marked_overdue'], next_day['accrued']) == (1, 3)
+    assert [fine for _, fine in _loans(loans_db)[:3]] == [50.0, 15.0, 5.0]
+    assert ReportService.get_category_summary()[0]['overdue'] == 3
+
+
+def test_returning_swept_loan_clears_overdue_count(loans_db):
+    LoanService.sweep_overdue(AS_OF)
+
+    summary = LoanService.return_loans(loan_ids=[1], return_date=AS_OF)
+
+    assert summary['fines'] == {1: 45.0}
+    category = ReportService.get_category_summary()[0]
+    assert (category['overdue'], category['on_loan'], float(category['pending_fines'])) == (1, 3, 45.0)
+    assert ReportService.rebuild_summaries(verify_only=True)['category_summary'] == []
@@ -0,0 +1,130 @@
+import pytest
+from unittest.mock import patch
+from datetime import date, timedelta
+from app.services.book_service import BookService
+from app.services.loan_service import LoanService
+from app.services.member_service import MemberService
+from app.views.base_view import keyset_source, offset_source
+
+
+@pytest.fixture
+def catalogue(sqlite_db):
+    # Duplicate titles make the book_id tie-breaker matter at page edges
+    for n in range(250):
+        sqlite_db.execute_query(
+            """INSERT INTO books (isbn, title, author, total_copies, available_copies, added_by)
+               VALUES (%s, %s, %s, 1, %s, 1)""",
+            (f"isbn-{n}", f"Title {n % 40:02d}", "Author", n % 3)
+        )
+    for n in range(90):
+        sqlite_db.execute_query(
+            """INSERT INTO members (first_name, last_name, phone, address, membership_status)
+               VALUES (%s, %s, %s, %s, %s)""",
+            (f"First{n % 7}", f"Last{n % 5}", "000", "Street", 'active' if n % 4 else 'suspended')
+        )
+    yield sqlite_db
+
+
+def _walk(fetch_page, limit):
+    rows, after_key, pages = [], None, 0
+    while True:
+        page, after_key = fetch_page(after_key, limit)
+        rows.extend(page)
+        pages += 1
+        if after_key is None:
+            return rows, pages
+
+
+def test_book_pages_cover_catalogue_once_in_title_order(catalogue):
+    books, pages = _walk(keyset_source(BookService.get_books_page, BookService.page_key), 30)
+
+    assert pages == 9
+    assert len(books) == 250
+    assert len({b.book_id for b in books}) == 250
+    assert [BookService.page_key(b) for b in books] == sorted(BookService.page_key(b) for b in books)
+    assert books[0].added_by_name == "Desk Librarian"
+
+
+def test_available_book_pages_skip_empty_shelves(catalogue):
+    source = keyset_source(
+        lambda after_key, limit: BookService.get_books_page(after_key, limit, available_only=True),
+        BookService.page_key)
+
+    books, _ = _walk(source, 25)
+
+    expected = catalogue.execute_query(
+        "SELECT COUNT(*) AS n FROM books WHERE available_copies > 0", fetch=True)[0]['n']
+    assert len(books) == expected
+    assert all(b.available_copies > 0 for b in books)
+
+
+def test_member_pages_follow_name_order(catalogue):
+    members, _ = _walk(keyset_source(MemberService.get_members_page, MemberService.page_key), 20)
+    active, _ = _walk(keyset_source(
+        lambda after_key, limit: MemberService.get_members_page(after_key, limit, status='active'),
+        MemberService.page_key), 20)
+
+    assert len(members) == 90
+    assert [MemberService.page_key(m) for m in members] == sorted(MemberService.page_key(m) for m in members)
+    assert len(active) == 67
+    assert {m.membership_status for m in active} == {'active'}
+
+
+def test_offset_source_pages_search_results(catalogue):
+    source = offset_source(
+        lambda limit, offset: MemberService.search_members("Last1", limit=limit, offset=offset))
+
+    members, pages = _walk(source, 5)
+
+    assert len(members) == 18
+    assert pages == 4
+    assert len({m.member_id for m in members}) == 18
+
+    active, _ = _walk(offset_source(
+        lambda limit, offset: MemberService.search_members("Last1", limit=limit, offset=offset, status='active')), 5)
+    assert [m.member_id for m in active] == [m.member_id for m in members if m.membership_status == 'active']
+
+
+def test_offset_source_pages_book_search_with_duplicate_titles(catalogue):
+    for term in ("", "Ti"):  # the whole catalogue, and a title prefix too short for FULLTEXT
+        books, _ = _walk(offset_source(
+            lambda limit, offset: BookService.search_books(term, limit=limit, offset=offset)), 30)
+
+        assert len({b.book_id for b in books}) == 250
+        assert [(b.title, b.book_id) for b in books] == sorted((b.title, b.book_id) for b in books)
+
+
+def test_active_loan_pages_soonest_due_first(catalogue):
+    for n in range(45):
+        catalogue.execute_query(
+            "INSERT INTO loans (book_id, member_id, due_date, return_date, issued_by) VALUES (%s, %s, %s, %s, 1)",
+            (n + 1, n % 90 + 1, date(2024, 3, 1) + timedelta(days=n % 6), date(2024, 3, 2) if n % 9 == 0 else None)
+        )
+
+    loans, _ = _walk(keyset_source(LoanService.get_active_loans_page, LoanService.page_key), 10)
+
+    assert len(loans) == 40
+    assert [LoanService.page_key(l) for l in loans] == sorted(LoanService.page_key(l) for l in loans)
+    assert all(l['member_name'] for l in loans)
+
+    found, _ = _walk(keyset_source(
+        lambda after_key, limit: LoanService.get_active_loans_page(after_key, limit, search="Title 07"),
+        LoanService.page_key), 10)
+    assert sorted(l['book_id'] for l in found) == [8]
+    by_id, _ = _walk(keyset_source(
+        lambda after_key, limit: LoanService.get_active_loans_page(after_key, limit, search="12"),
+        LoanService.page_key), 10)
+    assert 12 in {l['loan_id'] for l in by_id}
+
+
+def test_books_page_query_seeks_past_key():
+    with patch('app.services.book_service.db') as mock_db:
+        mock_db.execute_query.return_value = []
+
+        BookService.get_books_page(after_key=("Dune", 12), limit=50)
+
+    query, params = mock_db.execute_query.call_args[0][:2]
+    assert "(b.title > %s OR (b.title = %s AND b.book_id > %s))" in query
+    assert "ORDER BY b.title, b.book_id LIMIT %s" in query
+    assert "OFFSET" not in query
+    assert params == ("Dune", "Dune", 12, 50)
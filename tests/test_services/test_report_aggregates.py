@@ -0,0 +1,49 @@
+import pytest
+from app.services.report_service import ReportService
+
+BOOKS = [
+    # isbn, author, category, total, available
+    ("1", "Tolkien", "Fantasy", 4, 1),
+    ("2", "Tolkien", "Fantasy", 2, 2),
+    ("3", "Herbert", "Sci-Fi", 3, 0),
+    ("4", "Austen", "", 1, 1),
+    ("5", "", None, 5, 5),
+]
+
+
+@pytest.fixture
+def stocked_db(sqlite_db):
+    for isbn, author, category, total, available in BOOKS:
+        sqlite_db.execute_query(
+            """INSERT INTO books (isbn, title, author, category, total_copies, available_copies, added_by)
+               VALUES (%s, %s, %s, %s, %s, %s, 1)""",
+            (isbn, f"Book {isbn}", author, category, total, available)
+        )
+    ReportService.rebuild_summaries()  # rows above bypassed BookService
+    yield sqlite_db
+
+
+def test_inventory_summary_matches_catalogue(stocked_db):
+    assert ReportService.get_inventory_summary() == {
+        'total_unique_books': 5,
+        'total_copies_all': 15,
+        'total_available_copies': 9,
+        'total_authors': 3,
+        'total_categories': 2,
+        'books_on_loan': 6,
+    }
+
+
+def test_category_counts_sum_copies_largest_first(stocked_db):
+    counts = ReportService.get_category_counts()
+
+    assert list(counts.items()) == [("Fantasy", 6), ("Sci-Fi", 3)]
+
+
+def test_summary_of_empty_catalogue(sqlite_db):
+    summary = ReportService.get_inventory_summary()
+    counts = ReportService.get_category_counts()
+
+    assert summary['total_unique_books'] == 0
+    assert summary['books_on_loan'] == 0
+    assert counts == {}
@@ -0,0 +1,79 @@
+import csv
+import pytest
+from datetime import date
+from unittest.mock import patch
+from app.services.fine_service import FineService
+from app.services.loan_service import LoanService
+from app.services.report_service import EXPORT_REPORTS, ReportService
+
+
+
+@pytest.fixture
+def library(sqlite_db):
+    sqlite_db.execute_query(
+        "INSERT INTO members (first_name, last_name, phone, address) VALUES ('Ada', 'Reader', '0', 'Street')")
+    sqlite_db.execute_query(
+        """INSERT INTO books (isbn, title, author, category, total_copies, available_copies, added_by)
+           VALUES ('1', 'Dune', 'Herbert', 'Sci-Fi', 5, 0, 1)""")
+    for due_date in [date(2024, 5, 8), date(2024, 5, 9), date(2024, 5, 6), date(2024, 5, 7), date(2024, 5, 20)]:
+        sqlite_db.execute_query(
+            "INSERT INTO loans (book_id, member_id, due_date, issued_by) VALUES (1, 1, %s, 1)", (due_date,))
+    ReportService.rebuild_summaries()
+    assert LoanService.return_loans([1], return_date=date(2024, 5, 10))['total_fines'] == 10.0
+    assert FineService.pay_fine(1, 4, recorded_by=1)
+    yield sqlite_db
+
+
+def test_reports_stream_to_csv_in_batches(library, tmp_path):
+    written = []
+    path = tmp_path / "loans.csv"
+    result = ReportService.export('active_loans', None, str(path), progress=written.append, batch_size=2)
+
+    assert (result['rows'], written) == (4, [2, 4])
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == [name for name, kind in EXPORT_REPORTS['active_loans'][2]]
+    assert [(row['loan_id'], row['due_date'], row['member_name']) for row in rows] == [
+        ('3', '2024-05-06', 'Ada Reader'), ('4', '2024-05-07', 'Ada Reader'),
+        ('2', '2024-05-09', 'Ada Reader'), ('5', '2024-05-20', 'Ada Reader')]
+
+    ReportService.export('fine_history', 'csv', str(tmp_path / "fines.txt"))
+    with open(tmp_path / "fines.txt", newline='') as f:
+        assert [(row['txn_type'], row['amount'], row['recorded_by']) for row in csv.DictReader(f)] == [
+            ('assess', '10.0', ''), ('payment', '-4.0', 'Desk Librarian')]
+
+
+def test_failed_export_leaves_no_file(library, tmp_path):
+    path = tmp_path / "exports" / "broken.csv"
+    path.parent.mkdir()
+    with patch.dict(EXPORT_REPORTS, {'broken': ("Broken", "SELECT no_such_column FROM books", [('x', 'str')])}):
+        result = ReportService.export('broken', 'csv', str(path))
+    assert 'error' in result
+    assert list(path.parent.iterdir()) == []
+    with pytest.raises(ValueError):
+        ReportService.export('catalogue', None, str(tmp_path / "books.pdf"))
+
+
+def test_abandoned_stream_does_not_return_its_connection(library):
+    before = library.pool_stats()['discarded']
+    assert [len(rows) for rows in library.stream("SELECT * FROM loans", batch_size=4)] == [4, 1]
+    stream = library.stream("SELECT * FROM loans", batch_size=4)
+    assert len(next(stream)) == 4
+    stream.close()
+    assert library.pool_stats()['discarded'] == before + 1
+    assert library.pool_stats()['in_use'] == 0
+
+
+@pytest.mark.parametrize("fmt, module", [('xlsx', 'openpyxl'), ('parquet', 'pyarrow')])
+def test_binary_formats(library, tmp_path, fmt, module):
+    pytest.importorskip(module)
+    path = tmp_path / f"history.{fmt}"
+    assert ReportService.export('member_history', None, str(path))['rows'] == 5
+    if fmt == 'xlsx':
+        from openpyxl import load_workbook
+        rows = list(load_workbook(path, read_only=True)["Member History"].values)
+        assert (len(rows), rows[0][:3]) == (6, ('member_id', 'member_name', 'loan_id'))
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        assert (table.num_rows, table.column('fine_amount').to_pylist()[0]) == (5, 10.0)
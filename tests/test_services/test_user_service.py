@@ -0,0 +1,33 @@
+import pytest
+from unittest.mock import patch
+from app.services import user_service
+from app.services.user_service import UserService
+
+
+@pytest.fixture
+def mock_db():
+    user_service._user_names.invalidate()
+    with patch('app.services.user_service.db') as mock:
+        yield mock
+    user_service._user_names.invalidate()
+
+
+def test_get_user_names_batches_misses_into_one_query(mock_db):
+    mock_db.execute_query.return_value = [
+        {'user_id': 1, 'full_name': 'Ayesha Khan'},
+        {'user_id': 2, 'full_name': 'Bilal Ahmed'},
+    ]
+
+    names = UserService.get_user_names([1, 2, 1, None])
+
+    assert names == {1: 'Ayesha Khan', 2: 'Bilal Ahmed'}
+    mock_db.execute_query.assert_called_once()
+    assert mock_db.execute_query.call_args[0][1] == (1, 2)
+
+
+def test_get_user_name_served_from_cache(mock_db):
+    mock_db.execute_query.return_value = [{'user_id': 1, 'full_name': 'Ayesha Khan'}]
+
+    assert UserService.get_user_name(1) == 'Ayesha Khan'
+    assert UserService.get_user_name(1) == 'Ayesha Khan'
+    mock_db.execute_query.assert_called_once()
@@ -0,0 +1,32 @@
+from app.views.base_view import BackgroundTask
+from tests.test_views.test_search_controller import FakeWidget
+
+
+def test_progress_and_result_come_back_on_the_tk_thread():
+    widget = FakeWidget()
+    seen = []
+
+    def task(progress):
+        for rows in (100, 200):
+            progress(rows)
+        return {'rows': 200}
+
+    BackgroundTask(widget, task, on_done=lambda result: seen.append(('done', result)),
+                   on_error=lambda message: seen.append(('error', message)),
+                   on_progress=lambda rows: seen.append(('progress', rows)))
+    widget.run_timers()
+
+    assert seen == [('progress', 100), ('progress', 200), ('done', {'rows': 200})]
+
+
+def test_failures_are_reported_as_messages():
+    widget = FakeWidget()
+    seen = []
+
+    def task(progress):
+        raise ValueError("disk full")
+
+    BackgroundTask(widget, task, on_done=seen.append, on_error=lambda message: seen.append(message))
+    widget.run_timers()
+
+    assert seen == ["disk full"]
@@ -0,0 +1,131 @@
+from app.services.member_service import MemberService
+from app.views import base_view
+from app.views.base_view import ChangeWatcher, follow_changes
+from tests.test_views.test_search_controller import FakeWidget
+
+
+class FakePoller:
+    def __init__(self, changes):
+        self.changes = changes
+
+    def poll(self):
+        return self.changes
+
+
+class FakeList:
+    """Stands in for a VirtualTreeview holding rows keyed by id"""
+
+    def __init__(self, rows, row_key=lambda row: row['id']):
+        self.row_key = row_key
+        self.rows = {row_key(row): row for row in rows}
+        self.reloads = 0
+        self.root = FakeWidget()
+
+    def patch_rows(self, rows):
+        for row in rows:
+            if self.row_key(row) in self.rows:
+                self.rows[self.row_key(row)] = row
+
+    def insert_rows(self, rows):
+        for row in rows:
+            self.rows.setdefault(self.row_key(row), row)
+
+    def remove_rows(self, keys):
+        for key in keys:
+            self.rows.pop(key, None)
+
+    def reload(self):
+        self.reloads += 1
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def _root(self):
+        return self.root
+
+
+def _run(watcher):
+    watcher._work(list(watcher._lists))
+    watcher._running = True
+    watcher._collect()
+
+
+def test_changed_rows_are_patched_and_vanished_ones_removed():
+    watcher = ChangeWatcher(FakeWidget())
+    loans = FakeList([{'id': 1, 'fine': 0}, {'id': 2, 'fine': 0}, {'id': 3, 'fine': 0}])
+    fetched = []
+
+    def fetch(ids):
+        fetched.append(ids)
+        return [{'id': 1, 'fine': 5}]  # loan 2 was returned, so it is no longer active
+
+    watcher.follow(loans, 'loan', fetch)
+    watcher.poller = FakePoller({'loan': {'update': [1, 2]}, 'member': {'update': [4]}})
+    _run(watcher)
+
+    assert fetched == [[1, 2]]
+    assert loans.rows == {1: {'id': 1, 'fine': 5}, 3: {'id': 3, 'fine': 0}}
+
+
+def test_rows_that_start_belonging_are_inserted():
+    watcher = ChangeWatcher(FakeWidget())
+    books = FakeList([{'id': 1, 'copies': 2}])
+
+    def fetch(ids):
+        # Book 7 came back at another desk and is available again; book 8 is still out
+        return [{'id': book_id, 'copies': 1} for book_id in ids if book_id in (7, 9)]
+
+    watcher.follow(books, 'book', fetch)
+    watcher.poller = FakePoller({'book': {'insert': [9], 'update': [7, 8]}})
+    _run(watcher)
+
+    assert books.rows == {1: {'id': 1, 'copies': 2}, 7: {'id': 7, 'copies': 1}, 9: {'id': 9, 'copies': 1}}
+
+
+def test_large_bursts_reload_instead_of_patching():
+    watcher = ChangeWatcher(FakeWidget())
+    loans = FakeList([])
+    watcher.follow(loans, 'loan', lambda ids: [])
+    watcher.poller = FakePoller({'loan': {'update': list(range(watcher.max_rows + 1))}})
+    _run(watcher)
+    assert loans.reloads == 1
+
+
+def test_a_failing_fetch_reloads_its_list_and_spares_the_others():
+    watcher = ChangeWatcher(FakeWidget())
+    books = FakeList([{'id': 1, 'copies': 0}])
+    loans = FakeList([{'id': 5, 'fine': 0}])
+
+    def broken(ids):
+        raise RuntimeError("connection lost")
+
+    watcher.follow(books, 'book', broken)
+    watcher.follow(loans, 'loan', lambda ids: [{'id': 5, 'fine': 5}])
+    watcher.poller = FakePoller({'book': {'update': [1]}, 'loan': {'update': [5]}})
+    watcher._refresh_catalogue = lambda books: None
+    _run(watcher)
+
+    assert books.reloads == 1
+    assert loans.rows == {5: {'id': 5, 'fine': 5}}
+
+
+def _member(first_name):
+    return {'first_name': first_name, 'last_name': "Reader", 'phone': "0", 'address': "Street",
+            'city': "Lahore", 'registered_by': 1}
+
+
+def test_member_changes_reach_a_followed_list(sqlite_db, monkeypatch):
+    monkeypatch.setattr(base_view, '_watcher', None)
+    for name in ("Ada", "Bea"):
+        assert MemberService.register_member(_member(name))
+    members = FakeList(MemberService.get_members_page(), row_key=lambda member: member.member_id)
+    watcher = follow_changes(members, 'member', MemberService.get_members_by_ids)
+    _run(watcher)  # the poller starts from the current end of the feed
+
+    assert MemberService.update_member(1, dict(_member("Ada"), city="Karachi"))
+    assert MemberService.delete_member(2)
+    assert MemberService.register_member(_member("Cem"))
+    _run(watcher)
+
+    assert {key: member.city for key, member in members.rows.items()} == {1: "Karachi", 3: "Lahore"}
+    assert MemberService.update_member(2, _member("Bea")) is False  # gone, so nothing to update
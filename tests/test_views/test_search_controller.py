@@ -0,0 +1,113 @@
+import threading
+from unittest.mock import MagicMock
+from app.views.base_view import SearchController, bind_search
+
+
+class FakeWidget:
+    """Stands in for a Tk widget: after() callbacks run when run_timers() is called"""
+
+    def __init__(self):
+        self.timers = {}
+        self._next_id = 0
+
+    def after(self, ms, func, *args):
+        self._next_id += 1
+        self.timers[self._next_id] = (func, args)
+        return self._next_id
+
+    def after_cancel(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def winfo_exists(self):
+        return True
+
+    def run_timers(self):
+        while self.timers:
+            timer_id = min(self.timers)
+            func, args = self.timers.pop(timer_id)
+            func(*args)
+
+
+def test_burst_of_keystrokes_runs_one_query():
+    widget, queries, shown = FakeWidget(), [], []
+
+    def search(term):
+        queries.append(term)
+        return [term.upper()]
+
+    controller = SearchController(widget, search, lambda term, rows: shown.append(rows))
+    name = "Fyodor Dosto"
+    for n in range(1, len(name) + 1):
+        controller.schedule(name[:n])
+    widget.run_timers()
+
+    assert queries == [name]
+    assert shown == [[name.upper()]]
+
+
+def test_results_overtaken_by_newer_keystroke_are_dropped():
+    widget, shown = FakeWidget(), []
+    release = threading.Event()
+
+    def search(term):
+        if term == "dun":
+            release.wait(5)  # the slow, stale query
+        return [term]
+
+    controller = SearchController(widget, search, lambda term, rows: shown.append(term))
+    controller.schedule("dun")
+    func, args = widget.timers.pop(min(widget.timers))
+    func(*args)  # debounce fires, "dun" is now running on a worker
+
+    controller.schedule("dune")
+    release.set()
+    widget.run_timers()
+
+    assert shown == ["dune"]
+
+
+def test_unchanged_term_does_not_search_again():
+    widget, queries = FakeWidget(), []
+    controller = SearchController(widget, lambda term: queries.append(term) or [], lambda term, rows: None)
+
+    controller.schedule("dune")
+    widget.run_timers()
+    controller.schedule("dune")  # e.g. an arrow key release
+    widget.run_timers()
+
+    assert queries == ["dune"]
+
+
+class FakeEntry(FakeWidget):
+    def __init__(self, text):
+        super().__init__()
+        self.text = text
+        self.bindings = {}
+
+    def get(self):
+        return self.text
+
+    def bind(self, sequence, func, add=None):
+        self.bindings[sequence] = func
+
+
+def test_bound_search_reads_its_filters_on_the_tk_thread():
+    entry, reads, sources, shown = FakeEntry(" dune "), [], [], []
+
+    def status():
+        reads.append(threading.current_thread())
+        return "Pending"
+
+    def source_for(term, state):
+        sources.append((term, state))
+        return lambda after_key, limit: [term]
+
+    tree_list = MagicMock(page_size=50)
+    tree_list.set_source.side_effect = lambda source, first_page: shown.append(first_page)
+    bind_search(entry, tree_list, source_for, filters=status)
+    entry.bindings['<KeyRelease>'](None)
+    entry.run_timers()
+
+    assert reads == [threading.main_thread()]
+    assert sources == [("dune", "Pending")]
+    assert shown == [["dune"]]